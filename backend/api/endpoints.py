@@ -1,26 +1,40 @@
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from datetime import datetime, date
 import json
-from services.hdfs_service import HDFSService
-from database import get_db
-from models import StockMetadata, StockPrice, AnalysisResult
+import os
+from services.hdfs_service import HDFSService, get_hdfs_service
+from database import get_db, get_async_db
+from models import StockPrice, AnalysisResult
 from services.stock_service import StockService
+from services.cache_service import analytics_cache, get_cache_stats
+from services.metadata_cache import metadata_cache
+from services.stock_listing import stock_listing
+from services import price_history
+
+ANALYTICS_SUMMARY_TTL = int(os.getenv('ANALYTICS_SUMMARY_TTL', '600'))
+ANALYTICS_TOP_GAINERS_TTL = int(os.getenv('ANALYTICS_TOP_GAINERS_TTL', '300'))
+ANALYTICS_HIGH_VOLUME_TTL = int(os.getenv('ANALYTICS_HIGH_VOLUME_TTL', '300'))
+PRICE_HISTORY_MAX_SYMBOLS = int(os.getenv('PRICE_HISTORY_MAX_SYMBOLS', '20'))
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 @router.get("/hdfs/files", response_model=List[Dict[str, Any]])
-async def list_hdfs_files(path: str = Query("/stock_data", description="HDFS path to list")):
+async def list_hdfs_files(
+    path: str = Query("/stock_data", description="HDFS path to list"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
     """List files in HDFS directory"""
     try:
         logger.info(f"API: Listing HDFS files in {path}")
         
-        hdfs_service = HDFSService()
-        
         # Test connection first
         if not hdfs_service.client:
             logger.error("HDFS client not available")
@@ -35,86 +49,130 @@ async def list_hdfs_files(path: str = Query("/stock_data", description="HDFS pat
     except Exception as e:
         logger.error(f"Error listing HDFS files: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+def _parse_range_header(range_header: str, file_size: int):
+    """Parse a single 'bytes=start-end' range; returns (start, end) inclusive or None if unsatisfiable"""
+    units, _, spec = range_header.partition("=")
+    if units.strip() != "bytes" or "," in spec:
+        return None
+    
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if not start_str:
+            # Suffix range: last N bytes
+            suffix = int(end_str)
+            if suffix <= 0:
+                return None
+            return max(0, file_size - suffix), file_size - 1
+        
+        start = int(start_str)
+        end = int(end_str) if end_str else file_size - 1
+    except ValueError:
+        return None
+    
+    if start >= file_size or end < start:
+        return None
+    return start, min(end, file_size - 1)
+
 @router.get("/hdfs/download")
-async def download_hdfs_file(file_path: str = Query(..., description="HDFS file path")):
-    """Download file from HDFS"""
+async def download_hdfs_file(
+    file_path: str = Query(..., description="HDFS file path"),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
+    """Download file from HDFS (streamed, supports Range requests)"""
     try:
         logger.info(f"API: Downloading HDFS file {file_path}")
         
-        hdfs_service = HDFSService()
+        status = hdfs_service.get_file_status(file_path)
+        if not status:
+            raise HTTPException(status_code=404, detail=f"File not found: {file_path}")
+        if status.get("type") == "DIRECTORY":
+            raise HTTPException(status_code=400, detail=f"Not a file: {file_path}")
         
         # Get filename
         filename = file_path.split('/')[-1]
+        file_size = status.get("length", 0)
         
-        # Read file as bytes
-        with hdfs_service.client.read(file_path) as reader:
-            file_content = reader.read()
-        
-        # Return as downloadable response
-        return Response(
-            content=file_content,
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Accept-Ranges": "bytes"
+        }
+        status_code = 200
+        start, end = 0, file_size - 1
+        
+        if range_header:
+            byte_range = _parse_range_header(range_header, file_size)
+            if byte_range is None:
+                raise HTTPException(
+                    status_code=416,
+                    detail="Requested range not satisfiable",
+                    headers={"Content-Range": f"bytes */{file_size}"}
+                )
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        
+        length = max(0, end - start + 1)
+        headers["Content-Length"] = str(length)
+        
+        # Pipe WebHDFS chunks straight through to the client
+        return StreamingResponse(
+            hdfs_service.stream_file(file_path, offset=start, length=length) if length else iter(()),
+            status_code=status_code,
             media_type="application/octet-stream",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "application/octet-stream"
-            }
+            headers=headers
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error downloading HDFS file: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 @router.get("/hdfs/read")
-async def read_hdfs_file(
+def read_hdfs_file(
     file_path: str = Query(..., description="HDFS file path"),
-    limit: int = Query(50, description="Maximum lines to return")
+    limit: int = Query(50, ge=1, le=5000, description="Lines per page"),
+    page: Optional[int] = Query(None, ge=1, description="1-based page number (uses the cached line index)"),
+    offset: Optional[int] = Query(None, ge=0, description="Byte offset to read from (next_offset of the previous page)"),
+    format: str = Query("lines", regex="^(lines|rows)$", description="'lines' for raw lines, 'rows' for typed CSV rows"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
 ):
-    """Read file from HDFS"""
+    """Read one page of a file from HDFS
+
+    Plain def: FastAPI runs it in the threadpool, so building a line index
+    (a full pass over the file) does not block the event loop.
+    """
     try:
-        logger.info(f"API: Reading HDFS file {file_path}")
+        logger.info(f"API: Reading HDFS file {file_path} (page={page}, offset={offset}, limit={limit})")
         
-        hdfs_service = HDFSService()
-        content_lines = hdfs_service.read_file(file_path, limit)
+        result = hdfs_service.read_page(
+            file_path, page=page, offset=offset, page_size=limit, typed=(format == "rows")
+        )
         
-        # Nếu read_file trả về list, convert thành string
-        if isinstance(content_lines, list):
-            # Nếu là list of dicts (CSV rows đã parse)
-            if content_lines and isinstance(content_lines[0], dict):
-                # Convert back to CSV string
-                import csv
-                import io
-                
-                output = io.StringIO()
-                if content_lines:
-                    writer = csv.DictWriter(output, fieldnames=content_lines[0].keys())
-                    writer.writeheader()
-                    writer.writerows(content_lines)
-                    content = output.getvalue()
-                else:
-                    content = ""
-            else:
-                # Nếu là list of strings
-                content = '\n'.join(str(line) for line in content_lines)
-        else:
-            # Nếu đã là string
-            content = content_lines
+        if "lines" in result:
+            # Raw text of the page (header first for CSV files)
+            header_line = [",".join(result["header"])] if result["header"] else []
+            result["content"] = "\n".join(header_line + result["lines"])
         
-        return {
-            "file_path": file_path,
-            "lines": len(content.split('\n')),
-            "content": content
-        }
+        return result
         
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IsADirectoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error reading HDFS file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/hdfs/dir-info")
-async def get_directory_info(path: str = Query("/stock_data", description="HDFS directory path")):
+async def get_directory_info(
+    path: str = Query("/stock_data", description="HDFS directory path"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
     """Get directory information"""
     try:
         logger.info(f"API: Getting directory info for {path}")
         
-        hdfs_service = HDFSService()
         info = hdfs_service.get_directory_info(path)
         
         return info
@@ -124,12 +182,11 @@ async def get_directory_info(path: str = Query("/stock_data", description="HDFS
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/hdfs/test")
-async def test_hdfs_connection():
+async def test_hdfs_connection(hdfs_service: HDFSService = Depends(get_hdfs_service)):
     """Test HDFS connection"""
     try:
         logger.info("API: Testing HDFS connection")
         
-        hdfs_service = HDFSService()
         success = hdfs_service.test_connection()
         
         return {
@@ -143,53 +200,30 @@ async def test_hdfs_connection():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/hdfs/explore")
-async def explore_hdfs(path: str = Query("/", description="Starting path")):
-    """Explore HDFS with recursive listing (limited depth)"""
+async def explore_hdfs(
+    path: str = Query("/", description="Starting path"),
+    depth: int = Query(3, ge=1, le=6, description="Levels to expand"),
+    limit: int = Query(200, ge=1, le=5000, description="Maximum children per directory"),
+    offset: int = Query(0, ge=0, description="Offset into the starting directory's children"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
+    """Explore HDFS with recursive listing (limited depth, paginated)"""
     try:
         logger.info(f"API: Exploring HDFS from {path}")
         
-        hdfs_service = HDFSService()
-        
-        def explore_dir(current_path: str, depth: int = 0, max_depth: int = 3):
-            if depth >= max_depth:
-                return []
-            
-            items = hdfs_service.list_files(current_path)
-            result = []
-            
-            for item in items:
-                item_info = {
-                    "name": item["name"],
-                    "path": item["path"],
-                    "type": item["type"],
-                    "size": item["size"],
-                    "modification_time": item["modification_time"]
-                }
-                
-                if item["type"] == "directory":
-                    # Add children for directories
-                    item_info["children"] = explore_dir(item["path"], depth + 1, max_depth)
-                
-                result.append(item_info)
-            
-            return result
-        
-        tree = explore_dir(path)
-        return {
-            "path": path,
-            "tree": tree
-        }
+        return hdfs_service.explore_tree(path, max_depth=depth, limit=limit, offset=offset)
         
     except Exception as e:
         logger.error(f"Error exploring HDFS: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))@router.get("/hdfs/files", response_model=List[Dict[str, Any]])
-async def list_hdfs_files(path: str = Query("/stock_data", description="HDFS path to list")):
+async def list_hdfs_files(
+    path: str = Query("/stock_data", description="HDFS path to list"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
     """List files in HDFS directory"""
     try:
         logger.info(f"API: Listing HDFS files in {path}")
         
-        hdfs_service = HDFSService()
-        
         # Test connection first
         if not hdfs_service.client:
             logger.error("HDFS client not available")
@@ -208,13 +242,13 @@ async def list_hdfs_files(path: str = Query("/stock_data", description="HDFS pat
 @router.get("/hdfs/read")
 async def read_hdfs_file(
     file_path: str = Query(..., description="HDFS file path"),
-    limit: int = Query(50, description="Maximum lines to return")
+    limit: int = Query(50, description="Maximum lines to return"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
 ):
     """Read file from HDFS"""
     try:
         logger.info(f"API: Reading HDFS file {file_path}")
         
-        hdfs_service = HDFSService()
         content = hdfs_service.read_file(file_path, limit)
         
         return {
@@ -228,12 +262,14 @@ async def read_hdfs_file(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/hdfs/dir-info")
-async def get_directory_info(path: str = Query("/stock_data", description="HDFS directory path")):
+async def get_directory_info(
+    path: str = Query("/stock_data", description="HDFS directory path"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
     """Get directory information"""
     try:
         logger.info(f"API: Getting directory info for {path}")
         
-        hdfs_service = HDFSService()
         info = hdfs_service.get_directory_info(path)
         
         return info
@@ -243,12 +279,11 @@ async def get_directory_info(path: str = Query("/stock_data", description="HDFS
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/hdfs/test")
-async def test_hdfs_connection():
+async def test_hdfs_connection(hdfs_service: HDFSService = Depends(get_hdfs_service)):
     """Test HDFS connection"""
     try:
         logger.info("API: Testing HDFS connection")
         
-        hdfs_service = HDFSService()
         success = hdfs_service.test_connection()
         
         return {
@@ -262,13 +297,14 @@ async def test_hdfs_connection():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/hdfs/explore")
-async def explore_hdfs(path: str = Query("/", description="Starting path")):
+async def explore_hdfs(
+    path: str = Query("/", description="Starting path"),
+    hdfs_service: HDFSService = Depends(get_hdfs_service)
+):
     """Explore HDFS with recursive listing (limited depth)"""
     try:
         logger.info(f"API: Exploring HDFS from {path}")
         
-        hdfs_service = HDFSService()
-        
         def explore_dir(current_path: str, depth: int = 0, max_depth: int = 3):
             if depth >= max_depth:
                 return []
@@ -302,44 +338,97 @@ async def explore_hdfs(path: str = Query("/", description="Starting path")):
     except Exception as e:
         logger.error(f"Error exploring HDFS: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+# Hot read routes use the async (asyncpg) session so queries never block the event loop
 @router.get("/stocks")
-async def get_stocks(db: Session = Depends(get_db)):
-    """Get list of stocks"""
+async def get_stocks(
+    exchange: Optional[str] = Query(None, description="Exact exchange code"),
+    sector: Optional[str] = Query(None),
+    industry: Optional[str] = Query(None),
+    q: Optional[str] = Query(None, min_length=1, max_length=50, description="Symbol or company name prefix"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    include_total: bool = Query(False, description="Also return the (possibly estimated) match count"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a page of stocks ordered by (exchange, symbol)"""
     try:
-        stocks = db.query(StockMetadata).limit(100).all()
-        return [
-            {
-                "symbol": stock.symbol,
-                "name": stock.company_name,
-                "exchange": stock.exchange,
-                "sector": stock.sector,
-                "industry": stock.industry
-            }
-            for stock in stocks
-        ]
+        return await stock_listing.list(
+            db, exchange=exchange, sector=sector, industry=industry, q=q,
+            cursor=cursor, limit=limit, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Declared before /stocks/{symbol} so "history" is not taken as a symbol
+@router.get("/stocks/history")
+async def get_price_history(
+    symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,MSFT"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(365, ge=1, le=10000, description="Most recent rows per symbol"),
+    format: str = Query("json", regex="^(json|arrow)$", description="'json' (columnar) or 'arrow' (IPC stream)"),
+    accept_encoding: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get columnar OHLCV history for one or more symbols in one round trip"""
+    try:
+        symbol_list = price_history.parse_symbols(symbols, PRICE_HISTORY_MAX_SYMBOLS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if format == "arrow" and price_history.pa is None:
+        raise HTTPException(status_code=501, detail="Arrow output is not available (pyarrow not installed)")
+    
+    try:
+        history = await price_history.get_price_history(
+            db, symbol_list, start_date=start_date, end_date=end_date, limit=limit
+        )
+        
+        if format == "arrow":
+            body, media_type = price_history.to_arrow_bytes(history), price_history.ARROW_MEDIA_TYPE
+        else:
+            body, media_type = price_history.to_json_bytes(history), "application/json"
+        
+        body, encoding = price_history.compress(body, accept_encoding)
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=media_type, headers=headers)
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stocks/{symbol}")
-async def get_stock(symbol: str, db: Session = Depends(get_db)):
+async def get_stock(symbol: str, db: AsyncSession = Depends(get_async_db)):
     """Get stock details and latest price"""
     try:
         # Get stock metadata
-        stock = db.query(StockMetadata).filter(StockMetadata.symbol == symbol).first()
+        stock = await metadata_cache.get_async(db, symbol)
         if not stock:
             raise HTTPException(status_code=404, detail="Stock not found")
         
-        # Get latest price
-        latest_price = db.query(StockPrice).filter(
-            StockPrice.symbol == symbol
-        ).order_by(StockPrice.date.desc()).first()
+        # Get latest price (covered by uq_stock_prices_symbol_exchange_date)
+        result = await db.execute(
+            select(
+                StockPrice.date,
+                StockPrice.open,
+                StockPrice.close,
+                StockPrice.volume
+            ).where(
+                StockPrice.symbol == symbol,
+                StockPrice.exchange == stock["exchange"]
+            ).order_by(StockPrice.date.desc()).limit(1)
+        )
+        latest_price = result.first()
         
         response = {
-            "symbol": stock.symbol,
-            "name": stock.company_name,
-            "exchange": stock.exchange,
-            "sector": stock.sector,
-            "industry": stock.industry
+            "symbol": stock["symbol"],
+            "name": stock["company_name"],
+            "exchange": stock["exchange"],
+            "sector": stock["sector"],
+            "industry": stock["industry"]
         }
         
         if latest_price:
@@ -363,18 +452,39 @@ async def get_stock_prices(
     start_date: date = None,
     end_date: date = None,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    exchange: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get historical prices for a stock"""
+    """Get historical prices for a stock
+
+    Prices come from one exchange: the given one, else the one
+    /stocks/{symbol} reports, so dual-listed series are not interleaved.
+    """
     try:
-        query = db.query(StockPrice).filter(StockPrice.symbol == symbol)
+        if exchange is None:
+            stock = await metadata_cache.get_async(db, symbol)
+            exchange = stock["exchange"] if stock else None
+        
+        # Equality on (symbol, exchange) lets uq_stock_prices_symbol_exchange_date
+        # return rows already in date DESC order (no sort step)
+        query = select(
+            StockPrice.date,
+            StockPrice.open,
+            StockPrice.high,
+            StockPrice.low,
+            StockPrice.close,
+            StockPrice.volume
+        ).where(StockPrice.symbol == symbol)
+        if exchange is not None:
+            query = query.where(StockPrice.exchange == exchange)
         
         if start_date:
-            query = query.filter(StockPrice.date >= start_date)
+            query = query.where(StockPrice.date >= start_date)
         if end_date:
-            query = query.filter(StockPrice.date <= end_date)
+            query = query.where(StockPrice.date <= end_date)
         
-        prices = query.order_by(StockPrice.date.desc()).limit(limit).all()
+        result = await db.execute(query.order_by(StockPrice.date.desc()).limit(limit))
+        prices = result.all()
         
         return [
             {
@@ -391,39 +501,120 @@ async def get_stock_prices(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Cached analytics routes are sync so they run in the threadpool: a request
+# waiting on a coalesced cache miss must not block the event loop
 @router.get("/analytics/summary")
-async def get_analytics_summary(db: Session = Depends(get_db)):
+def get_analytics_summary(db: Session = Depends(get_db)):
     """Get analytics summary"""
     try:
         stock_service = StockService(db)
-        return stock_service.get_analytics_summary()
+        return analytics_cache.get_or_compute(
+            "summary", {}, ANALYTICS_SUMMARY_TTL, stock_service.get_analytics_summary
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analytics/top-gainers")
-async def get_top_gainers(days: int = 7, db: Session = Depends(get_db)):
+def get_top_gainers(days: int = 7, db: Session = Depends(get_db)):
     """Get top gaining stocks"""
     try:
         stock_service = StockService(db)
-        return stock_service.get_top_gainers(days)
+        return analytics_cache.get_or_compute(
+            "top-gainers", {"days": days}, ANALYTICS_TOP_GAINERS_TTL,
+            lambda: stock_service.get_top_gainers(days)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/top-movers")
+def get_top_movers(
+    days: int = Query(7, ge=1, le=3650),
+    exchange: Optional[str] = Query(None, description="Restrict to one exchange"),
+    limit: int = Query(10, ge=1, le=100),
+    end_date: Optional[date] = Query(None, description="Window end (default: today)"),
+    db: Session = Depends(get_db)
+):
+    """Get top gainers and losers over a window"""
+    try:
+        stock_service = StockService(db)
+        return analytics_cache.get_or_compute(
+            "top-movers",
+            {"days": days, "exchange": exchange, "limit": limit, "end_date": end_date},
+            ANALYTICS_TOP_GAINERS_TTL,
+            lambda: stock_service.get_top_movers(days=days, exchange=exchange, limit=limit, end_date=end_date)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analytics/high-volume")
-async def get_high_volume_stocks(days: int = 7, db: Session = Depends(get_db)):
+def get_high_volume_stocks(days: int = 7, db: Session = Depends(get_db)):
     """Get high volume stocks"""
     try:
         stock_service = StockService(db)
-        return stock_service.get_high_volume_stocks(days)
+        return analytics_cache.get_or_compute(
+            "high-volume", {"days": days}, ANALYTICS_HIGH_VOLUME_TTL,
+            lambda: stock_service.get_high_volume_stocks(days)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Spark-published snapshots: primary-key / index lookups, no response cache needed
+@router.get("/analytics/aggregations")
+def get_precomputed_aggregations(
+    exchange: Optional[str] = Query(None, description="Restrict to one exchange"),
+    sort: str = Query("avg_volume", regex="^(avg_volume|volatility|avg_daily_return|symbol)$"),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Get per-symbol rollups computed by the Spark processing job"""
+    try:
+        stock_service = StockService(db)
+        return stock_service.get_precomputed_aggregations(exchange=exchange, sort=sort, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/indicators")
+def get_indicator_snapshot(
+    signal: Optional[str] = Query(None, description="Filter by combined signal, e.g. BUY"),
+    exchange: Optional[str] = Query(None, description="Restrict to one exchange"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get the latest technical indicators computed by the Spark analysis job"""
+    try:
+        stock_service = StockService(db)
+        return stock_service.get_indicator_snapshot(signal=signal, exchange=exchange, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/indicators/{symbol}")
+def get_symbol_indicators(symbol: str, db: Session = Depends(get_db)):
+    """Get the latest technical indicators for one symbol"""
+    try:
+        stock_service = StockService(db)
+        rows = stock_service.get_symbol_indicators(symbol)
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"No indicators for {symbol}")
+        return rows
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/analytics/cache/stats")
+async def get_analytics_cache_stats():
+    """Cache hit/miss counters"""
+    return get_cache_stats()
+
+@router.post("/analytics/cache/invalidate")
+async def invalidate_analytics_cache():
+    """Drop all cached analytics responses"""
+    return {"invalidated": analytics_cache.invalidate()}
+
 @router.get("/hdfs/files")
-async def list_hdfs_files(path: str = "/stock_data"):
+async def list_hdfs_files(path: str = "/stock_data", hdfs_service: HDFSService = Depends(get_hdfs_service)):
     """List files in HDFS"""
     try:
-        from services.hdfs_service import HDFSService
-        hdfs_service = HDFSService()
         return hdfs_service.list_files(path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,11 +1,13 @@
 import logging
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, List
 import psutil
 import requests
 from datetime import datetime
-from database import get_db
+from database import get_async_db
+from services.hdfs_service import get_hdfs_service
 import redis
 
 logger = logging.getLogger(__name__)
@@ -15,7 +17,7 @@ router = APIRouter()
 PROMETHEUS_URL = "http://localhost:9090"
 
 @router.get("/monitoring/health")
-async def monitoring_health_check(db: Session = Depends(get_db)):
+async def monitoring_health_check(db: AsyncSession = Depends(get_async_db)):
     """Enhanced health check for monitoring dashboard"""
     try:
         health_status = {
@@ -28,17 +30,17 @@ async def monitoring_health_check(db: Session = Depends(get_db)):
         # Check PostgreSQL
         try:
             start_time = datetime.now()
-            db.execute("SELECT 1")
+            await db.execute(text("SELECT 1"))
             latency = (datetime.now() - start_time).total_seconds() * 1000
             
             # Get additional PostgreSQL stats
-            result = db.execute("""
+            result = (await db.execute(text("""
                 SELECT 
                     COUNT(*) as total_stocks,
                     MAX(date) as latest_date,
                     MIN(date) as earliest_date
                 FROM stock_prices
-            """).first()
+            """))).first()
             
             health_status["services"]["postgresql"] = "healthy"
             health_status["checks"].append({
@@ -93,8 +95,7 @@ async def monitoring_health_check(db: Session = Depends(get_db)):
         # Check HDFS
         try:
             start_time = datetime.now()
-            from services.hdfs_service import HDFSService
-            hdfs = HDFSService()
+            hdfs = get_hdfs_service()
             
             if hdfs.test_connection():
                 latency = (datetime.now() - start_time).total_seconds() * 1000
@@ -273,7 +274,7 @@ async def get_system_metrics():
         }
 
 @router.get("/monitoring/metrics/services")
-async def get_service_metrics(db: Session = Depends(get_db)):
+async def get_service_metrics(db: AsyncSession = Depends(get_async_db)):
     """Get service-specific metrics"""
     try:
         services = []
@@ -281,21 +282,21 @@ async def get_service_metrics(db: Session = Depends(get_db)):
         # PostgreSQL metrics
         try:
             # Get connection count
-            result = db.execute("SELECT count(*) FROM pg_stat_activity").scalar()
+            result = (await db.execute(text("SELECT count(*) FROM pg_stat_activity"))).scalar()
             connections = result if result else 0
             
             # Get database size
-            result = db.execute("SELECT pg_database_size('stockdb')").scalar()
+            result = (await db.execute(text("SELECT pg_database_size('stockdb')"))).scalar()
             db_size_mb = result / 1024 / 1024 if result else 0
             
             # Get table statistics
-            result = db.execute("""
+            result = (await db.execute(text("""
                 SELECT 
                     COUNT(DISTINCT symbol) as unique_symbols,
                     COUNT(*) as total_records,
                     MAX(date) as latest_record
                 FROM stock_prices
-            """).first()
+            """))).first()
             
             services.append({
                 "name": "PostgreSQL",
@@ -345,10 +346,9 @@ async def get_service_metrics(db: Session = Depends(get_db)):
         
         # HDFS metrics
         try:
-            from services.hdfs_service import HDFSService
-            hdfs = HDFSService()
+            hdfs = get_hdfs_service()
             
-            if hdfs.test_connection():
+            if hdfs.is_healthy():
                 dir_info = hdfs.get_directory_info("/stock_data")
                 
                 services.append({
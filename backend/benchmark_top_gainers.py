@@ -0,0 +1,85 @@
+"""
+Compare the original top-gainers query with the window-function top-movers query.
+
+Usage:
+  python benchmark_top_gainers.py                 # 7, 30 and 90 day windows, 5 runs each
+  python benchmark_top_gainers.py --days 30 --runs 10 --explain
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import text
+
+from database import SessionLocal
+from services.stock_service import StockService
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def time_runs(fn, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[0], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark top gainers implementations")
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 90])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--explain", action="store_true",
+                        help="Print EXPLAIN ANALYZE for the window-function query")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    db.bind.echo = False
+    service = StockService(db)
+
+    try:
+        rows = db.execute(text("SELECT COUNT(*) FROM stock_prices")).scalar()
+
+        print("=" * 72)
+        print(f"TOP GAINERS BENCHMARK (stock_prices: {rows:,} rows, {args.runs} runs, median/best)")
+        print("=" * 72)
+
+        for days in args.days:
+            legacy_median, legacy_best, legacy = time_runs(
+                lambda: service._get_top_gainers_legacy(days), args.runs
+            )
+            window_median, window_best, movers = time_runs(
+                lambda: service.get_top_movers(days=days, limit=10), args.runs
+            )
+
+            same = [g["symbol"] for g in legacy] == [g["symbol"] for g in movers["gainers"]]
+            print(f"{days:>4}d  legacy {legacy_median * 1000:9.1f} ms ({legacy_best * 1000:8.1f})  "
+                  f"window {window_median * 1000:9.1f} ms ({window_best * 1000:8.1f})  "
+                  f"speedup {legacy_median / max(window_median, 1e-9):5.1f}x  "
+                  f"same gainers: {'yes' if same else 'no'}")
+
+            if args.explain:
+                plan = db.execute(
+                    text("EXPLAIN (ANALYZE, BUFFERS) " + str(StockService.TOP_MOVERS_SQL)),
+                    {"start_date": movers["start_date"], "end_date": movers["end_date"],
+                     "exchange": None, "limit": 10}
+                ).fetchall()
+                print("\n".join(row[0] for row in plan))
+                print("-" * 72)
+
+        print("Note: the legacy query returns one row per symbol/first-date match, so symbols")
+        print("listed on several exchanges can appear twice there; the window query cannot.")
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@
 -- DROP TABLE IF EXISTS stock_metadata CASCADE;
 -- DROP TABLE IF EXISTS exchanges CASCADE;
 
+-- Trigram operator classes for the stock name search index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create tables
 CREATE TABLE IF NOT EXISTS stock_metadata (
     id SERIAL PRIMARY KEY,
@@ -30,9 +33,67 @@ CREATE TABLE IF NOT EXISTS stock_prices (
     low DECIMAL(10, 4),
     close DECIMAL(10, 4),
     volume BIGINT,
-    exchange VARCHAR(10),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    UNIQUE(symbol, date, exchange)
+    exchange VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per (symbol, exchange) row count and date range, kept current by a trigger on
+-- stock_prices so the analytics summary never has to scan the price table
+CREATE TABLE IF NOT EXISTS stock_price_stats (
+    symbol VARCHAR(20) NOT NULL,
+    exchange VARCHAR(10) NOT NULL,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    min_date DATE,
+    max_date DATE,
+    PRIMARY KEY (symbol, exchange)
+);
+
+-- Snapshots published by the Spark jobs (spark-jobs/pg_publisher.py): all-time
+-- per-symbol rollups and the latest technical indicators. Each run replaces the
+-- table contents in one transaction.
+CREATE TABLE IF NOT EXISTS stock_aggregations (
+    symbol VARCHAR(20) NOT NULL,
+    exchange VARCHAR(10) NOT NULL,
+    record_count BIGINT,
+    first_date DATE,
+    last_date DATE,
+    avg_price DOUBLE PRECISION,
+    price_volatility DOUBLE PRECISION,
+    avg_volume DOUBLE PRECISION,
+    max_volume BIGINT,
+    min_volume BIGINT,
+    avg_daily_return DOUBLE PRECISION,
+    data_span_days INT,
+    price_range_ratio DOUBLE PRECISION,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (symbol, exchange)
+);
+
+CREATE TABLE IF NOT EXISTS stock_indicator_snapshot (
+    symbol VARCHAR(20) NOT NULL,
+    exchange VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    close DOUBLE PRECISION,
+    volume BIGINT,
+    ma_5 DOUBLE PRECISION,
+    ma_10 DOUBLE PRECISION,
+    ma_20 DOUBLE PRECISION,
+    ma_50 DOUBLE PRECISION,
+    rsi DOUBLE PRECISION,
+    bb_upper DOUBLE PRECISION,
+    bb_lower DOUBLE PRECISION,
+    bb_position DOUBLE PRECISION,
+    macd DOUBLE PRECISION,
+    volume_ratio DOUBLE PRECISION,
+    ma_crossover VARCHAR(20),
+    rsi_signal VARCHAR(20),
+    bb_signal VARCHAR(20),
+    volume_signal VARCHAR(20),
+    combined_signal VARCHAR(20),
+    anomaly_score INT,
+    has_anomaly BOOLEAN,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (symbol, exchange)
 );
 
 CREATE TABLE IF NOT EXISTS analysis_results (
@@ -51,9 +112,23 @@ CREATE TABLE IF NOT EXISTS exchanges (
 );
 
 -- Create indexes
-CREATE INDEX IF NOT EXISTS idx_stock_prices_symbol_date ON stock_prices(symbol, date);
+-- Composite unique index: one row per (symbol, exchange, date). OHLCV columns are
+-- included so symbol history / latest price lookups are index-only scans.
+-- Also serves as the arbiter for ON CONFLICT (symbol, date, exchange).
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_prices_symbol_exchange_date
+    ON stock_prices(symbol, exchange, date DESC)
+    INCLUDE (open, high, low, close, volume);
 CREATE INDEX IF NOT EXISTS idx_stock_prices_date ON stock_prices(date);
 CREATE INDEX IF NOT EXISTS idx_stock_metadata_symbol ON stock_metadata(symbol);
+-- /stocks listing: keyset order, symbol prefix search (LIKE 'AB%' in any collation)
+-- and company name prefix search
+CREATE INDEX IF NOT EXISTS idx_stock_metadata_exchange_symbol ON stock_metadata(exchange, symbol);
+CREATE INDEX IF NOT EXISTS idx_stock_metadata_symbol_prefix ON stock_metadata(symbol text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_stock_metadata_company_name_trgm
+    ON stock_metadata USING gin (lower(company_name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_stock_aggregations_avg_volume ON stock_aggregations(avg_volume DESC);
+CREATE INDEX IF NOT EXISTS idx_stock_aggregations_volatility ON stock_aggregations(price_range_ratio DESC);
+CREATE INDEX IF NOT EXISTS idx_stock_indicator_snapshot_signal ON stock_indicator_snapshot(combined_signal);
 
 -- ============================================
 -- INSERT EXCHANGES DATA
@@ -103,12 +178,40 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+CREATE OR REPLACE FUNCTION maintain_stock_price_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO stock_price_stats (symbol, exchange, row_count, min_date, max_date)
+        VALUES (NEW.symbol, NEW.exchange, 1, NEW.date, NEW.date)
+        ON CONFLICT (symbol, exchange) DO UPDATE SET
+            row_count = stock_price_stats.row_count + 1,
+            min_date = LEAST(stock_price_stats.min_date, EXCLUDED.min_date),
+            max_date = GREATEST(stock_price_stats.max_date, EXCLUDED.max_date);
+        RETURN NEW;
+    END IF;
+
+    -- DELETE: recompute the date range from the unique index only if a boundary row went away
+    UPDATE stock_price_stats s
+    SET row_count = s.row_count - 1,
+        min_date = CASE WHEN OLD.date = s.min_date THEN
+            (SELECT MIN(date) FROM stock_prices WHERE symbol = OLD.symbol AND exchange = OLD.exchange)
+            ELSE s.min_date END,
+        max_date = CASE WHEN OLD.date = s.max_date THEN
+            (SELECT MAX(date) FROM stock_prices WHERE symbol = OLD.symbol AND exchange = OLD.exchange)
+            ELSE s.max_date END
+    WHERE s.symbol = OLD.symbol AND s.exchange = OLD.exchange;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================
 -- CLEAN AND INSERT DATA
 -- ============================================
 
 -- First, disable or drop existing trigger
 DROP TRIGGER IF EXISTS trg_stock_prices_to_metadata ON stock_prices;
+DROP TRIGGER IF EXISTS trg_stock_prices_stats ON stock_prices;
 
 -- Clear existing data (optional - careful!)
 -- TRUNCATE TABLE analysis_results CASCADE;
@@ -214,6 +317,21 @@ AFTER INSERT ON stock_prices
 FOR EACH ROW
 EXECUTE FUNCTION sync_stock_metadata();
 
+-- Rebuild summary stats for the rows inserted above, then keep them current
+INSERT INTO stock_price_stats (symbol, exchange, row_count, min_date, max_date)
+SELECT symbol, exchange, COUNT(*), MIN(date), MAX(date)
+FROM stock_prices
+GROUP BY symbol, exchange
+ON CONFLICT (symbol, exchange) DO UPDATE SET
+    row_count = EXCLUDED.row_count,
+    min_date = EXCLUDED.min_date,
+    max_date = EXCLUDED.max_date;
+
+CREATE TRIGGER trg_stock_prices_stats
+AFTER INSERT OR DELETE ON stock_prices
+FOR EACH ROW
+EXECUTE FUNCTION maintain_stock_price_stats();
+
 -- ============================================
 -- VERIFICATION QUERIES
 -- ============================================
@@ -0,0 +1,152 @@
+"""
+Concurrent load test for the dashboard read routes.
+
+Replays the dashboard's request mix with N concurrent clients for a fixed
+duration and reports throughput and latency percentiles per route. Save a
+run with --output, then run again on another build with --compare to see the
+difference (e.g. before/after moving routes to the async session).
+
+Usage:
+  python load_test.py                                   # 50 clients, 30 s, default mix
+  python load_test.py --concurrency 200 --duration 60 --output async.json
+  python load_test.py --compare sync.json
+  python load_test.py --symbols AAPL MSFT --paths /stocks /monitoring/health
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "META", "NVDA", "JPM"]
+
+# (path template, weight): roughly what the dashboard pages request
+DEFAULT_MIX = [
+    ("/stocks", 2),
+    ("/stocks/{symbol}", 4),
+    ("/stocks/{symbol}/prices?limit=100", 4),
+    ("/analytics/summary", 1),
+    ("/analytics/top-gainers", 1),
+    ("/monitoring/health", 1),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def client_loop(client: httpx.AsyncClient, mix, symbols, deadline: float, results: Dict[str, Dict]):
+    paths = [path for path, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    while time.perf_counter() < deadline:
+        template = random.choices(paths, weights)[0]
+        url = template.format(symbol=random.choice(symbols))
+        stats = results.setdefault(template, {"latencies": [], "errors": 0})
+
+        start = time.perf_counter()
+        try:
+            response = await client.get(url)
+            if response.status_code >= 500:
+                stats["errors"] += 1
+        except httpx.HTTPError:
+            stats["errors"] += 1
+        stats["latencies"].append(time.perf_counter() - start)
+
+
+async def run(base_url: str, concurrency: int, duration: float, warmup: float, mix, symbols) -> Dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        if warmup > 0:
+            await asyncio.gather(*[
+                client_loop(client, mix, symbols, time.perf_counter() + warmup, {})
+                for _ in range(concurrency)
+            ])
+
+        results: Dict[str, Dict] = {}
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client_loop(client, mix, symbols, start + duration, results)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    summary = {"concurrency": concurrency, "duration": round(elapsed, 2), "routes": {}}
+    all_latencies = []
+    total_errors = 0
+    for template, stats in sorted(results.items()):
+        latencies = sorted(stats["latencies"])
+        all_latencies.extend(latencies)
+        total_errors += stats["errors"]
+        summary["routes"][template] = summarize(latencies, stats["errors"], elapsed)
+
+    summary["total"] = summarize(sorted(all_latencies), total_errors, elapsed)
+    return summary
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def print_summary(summary: Dict, baseline: Optional[Dict] = None):
+    print("=" * 96)
+    print(f"LOAD TEST ({summary['concurrency']} clients, {summary['duration']} s)")
+    print("=" * 96)
+    print(f"{'route':<40} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    rows = list(summary["routes"].items()) + [("TOTAL", summary["total"])]
+    for name, stats in rows:
+        print(f"{name:<40} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+        if baseline is not None:
+            base = baseline["total"] if name == "TOTAL" else baseline["routes"].get(name)
+            if base and base["rps"] and stats["p99_ms"]:
+                print(f"{'  vs baseline':<40} {'':>7} {'':>5} {stats['rps'] / base['rps']:>7.2f}x "
+                      f"{'':>8} {'':>8} {base['p99_ms'] / stats['p99_ms']:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard read routes")
+    parser.add_argument("--base-url", default="http://localhost:8000/api/v1")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before the run")
+    parser.add_argument("--symbols", nargs="+", default=DEFAULT_SYMBOLS)
+    parser.add_argument("--paths", nargs="+", help="Route templates to hit with equal weight "
+                                                    "(default: dashboard mix)")
+    parser.add_argument("--output", help="Write the summary as JSON")
+    parser.add_argument("--compare", help="Baseline JSON from a previous --output run")
+    args = parser.parse_args()
+
+    mix = [(path, 1) for path in args.paths] if args.paths else DEFAULT_MIX
+    summary = asyncio.run(run(args.base_url, args.concurrency, args.duration, args.warmup, mix, args.symbols))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    print_summary(summary, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 import logging
 from datetime import datetime
 
-from database import engine, Base, get_db
+from database import engine, async_engine, Base, get_db
 from api.endpoints import router as api_router
 from api.monitoring import router as monitoring_router
+from services.hdfs_service import init_hdfs_service, close_hdfs_service
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,11 +35,11 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Database connection failed: {e}")
 
-    # Optional: test HDFS connection if needed
+    # Shared HDFS client for all routes (pooled session, reconnects on failure)
     try:
-        from services.hdfs_service import HDFSService
-        hdfs_service = HDFSService()
-        if hdfs_service.test_connection():
+        hdfs_service = init_hdfs_service()
+        app.state.hdfs = hdfs_service
+        if hdfs_service.is_healthy():
             logger.info("✅ HDFS connection successful")
         else:
             logger.warning("⚠️ HDFS connection failed")
@@ -49,6 +50,8 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down Stock Data API...")
+    close_hdfs_service()
+    await async_engine.dispose()
 
 # Create FastAPI app
 app = FastAPI(
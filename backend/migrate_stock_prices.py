@@ -0,0 +1,361 @@
+"""
+Schema upgrade for stock_prices.
+
+Steps:
+  1. Backfill NULL exchange values from stock_metadata
+  2. Delete duplicate (symbol, exchange, date) rows, keeping the newest one
+  3. Create the composite unique covering index and drop the redundant ones
+  4. (optional) Rebuild stock_prices as a table range-partitioned by month
+  5. Create and backfill stock_price_stats (summary table kept by a trigger)
+  6. Create the stock_metadata listing/search indexes used by /stocks
+
+Usage:
+  python migrate_stock_prices.py                    # backfill, dedupe, index upgrade
+  python migrate_stock_prices.py --partition        # ... and convert to monthly partitions
+  python migrate_stock_prices.py --add-partitions 6 # create partitions for the next 6 months
+  python migrate_stock_prices.py --rebuild-stats    # only rebuild stock_price_stats
+"""
+import argparse
+import logging
+from datetime import date
+
+from sqlalchemy import text
+
+from database import engine
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+UNIQUE_INDEX = "uq_stock_prices_symbol_exchange_date"
+
+CREATE_UNIQUE_INDEX_SQL = f"""
+    CREATE UNIQUE INDEX {{concurrently}} IF NOT EXISTS {UNIQUE_INDEX}
+    ON stock_prices (symbol, exchange, date DESC)
+    INCLUDE (open, high, low, close, volume)
+"""
+
+STATS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS stock_price_stats (
+        symbol VARCHAR(20) NOT NULL,
+        exchange VARCHAR(10) NOT NULL,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        min_date DATE,
+        max_date DATE,
+        PRIMARY KEY (symbol, exchange)
+    )
+"""
+
+# Same function as init.sql
+STATS_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION maintain_stock_price_stats()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO stock_price_stats (symbol, exchange, row_count, min_date, max_date)
+            VALUES (NEW.symbol, NEW.exchange, 1, NEW.date, NEW.date)
+            ON CONFLICT (symbol, exchange) DO UPDATE SET
+                row_count = stock_price_stats.row_count + 1,
+                min_date = LEAST(stock_price_stats.min_date, EXCLUDED.min_date),
+                max_date = GREATEST(stock_price_stats.max_date, EXCLUDED.max_date);
+            RETURN NEW;
+        END IF;
+
+        UPDATE stock_price_stats s
+        SET row_count = s.row_count - 1,
+            min_date = CASE WHEN OLD.date = s.min_date THEN
+                (SELECT MIN(date) FROM stock_prices WHERE symbol = OLD.symbol AND exchange = OLD.exchange)
+                ELSE s.min_date END,
+            max_date = CASE WHEN OLD.date = s.max_date THEN
+                (SELECT MAX(date) FROM stock_prices WHERE symbol = OLD.symbol AND exchange = OLD.exchange)
+                ELSE s.max_date END
+        WHERE s.symbol = OLD.symbol AND s.exchange = OLD.exchange;
+        RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+STATS_TRIGGER_SQL = """
+    CREATE TRIGGER trg_stock_prices_stats
+    AFTER INSERT OR DELETE ON stock_prices
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_stock_price_stats()
+"""
+
+# Indexes made redundant by the composite index (leading "symbol" column)
+REDUNDANT_INDEXES = [
+    "idx_stock_prices_symbol_date",
+    "ix_stock_prices_symbol",
+]
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def backfill_exchange(conn):
+    """Fill missing exchange codes so the unique index covers every row"""
+    result = conn.execute(text("""
+        UPDATE stock_prices sp
+        SET exchange = sm.exchange
+        FROM (
+            SELECT symbol, MIN(exchange) AS exchange
+            FROM stock_metadata
+            GROUP BY symbol
+            HAVING COUNT(*) = 1
+        ) sm
+        WHERE sp.exchange IS NULL AND sp.symbol = sm.symbol
+    """))
+    logger.info(f"Backfilled exchange from stock_metadata: {result.rowcount} rows")
+
+    result = conn.execute(text("UPDATE stock_prices SET exchange = 'UNKNOWN' WHERE exchange IS NULL"))
+    logger.info(f"Marked exchange as UNKNOWN: {result.rowcount} rows")
+
+    conn.execute(text("ALTER TABLE stock_prices ALTER COLUMN exchange SET NOT NULL"))
+
+
+def deduplicate(conn):
+    """Keep only the most recently written row per (symbol, exchange, date)"""
+    result = conn.execute(text("""
+        DELETE FROM stock_prices sp
+        USING (
+            SELECT id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY symbol, exchange, date
+                       ORDER BY created_at DESC NULLS LAST, id DESC
+                   ) AS rn
+            FROM stock_prices
+        ) d
+        WHERE sp.id = d.id AND d.rn > 1
+    """))
+    logger.info(f"Removed duplicate rows: {result.rowcount}")
+
+
+def upgrade_indexes():
+    """Build the composite index without blocking writers, then drop old indexes"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        logger.info(f"Creating {UNIQUE_INDEX}...")
+        conn.execute(text(CREATE_UNIQUE_INDEX_SQL.format(concurrently="CONCURRENTLY")))
+
+        # The old UNIQUE(symbol, date, exchange) constraint from init.sql is now redundant
+        conn.execute(text(
+            "ALTER TABLE stock_prices DROP CONSTRAINT IF EXISTS stock_prices_symbol_date_exchange_key"
+        ))
+        for index_name in REDUNDANT_INDEXES:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+            logger.info(f"Dropped redundant index {index_name} (if present)")
+
+        # Index-only scans need an up-to-date visibility map
+        conn.execute(text("VACUUM ANALYZE stock_prices"))
+        logger.info("VACUUM ANALYZE stock_prices completed")
+
+
+LISTING_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stock_metadata_exchange_symbol "
+    "ON stock_metadata (exchange, symbol)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stock_metadata_symbol_prefix "
+    "ON stock_metadata (symbol text_pattern_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stock_metadata_company_name_trgm "
+    "ON stock_metadata USING gin (lower(company_name) gin_trgm_ops)",
+]
+
+
+def create_listing_indexes():
+    """Keyset order and prefix search indexes for the /stocks listing"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in LISTING_INDEX_SQL:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE stock_metadata"))
+        logger.info("stock_metadata listing indexes created")
+
+
+def install_price_stats(conn):
+    """Create stock_price_stats, rebuild it from stock_prices and attach the trigger"""
+    conn.execute(text(STATS_TABLE_SQL))
+    conn.execute(text(STATS_FUNCTION_SQL))
+
+    # Block writers while rebuilding so no insert slips between backfill and trigger
+    conn.execute(text("LOCK TABLE stock_prices IN SHARE ROW EXCLUSIVE MODE"))
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_stock_prices_stats ON stock_prices"))
+    conn.execute(text("TRUNCATE stock_price_stats"))
+    result = conn.execute(text("""
+        INSERT INTO stock_price_stats (symbol, exchange, row_count, min_date, max_date)
+        SELECT symbol, exchange, COUNT(*), MIN(date), MAX(date)
+        FROM stock_prices
+        GROUP BY symbol, exchange
+    """))
+    conn.execute(text(STATS_TRIGGER_SQL))
+    logger.info(f"stock_price_stats rebuilt: {result.rowcount} (symbol, exchange) rows")
+
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = 'stock_prices'
+    """)).scalar())
+
+
+def create_month_partitions(conn, parent: str, start: date, end: date):
+    """Create one partition per month in [start, end)"""
+    month = _month_start(start)
+    created = 0
+    while month < end:
+        upper = _next_month(month)
+        name = f"stock_prices_y{month.year}m{month.month:02d}"
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent}
+            FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')
+        """))
+        created += 1
+        month = upper
+    return created
+
+
+def partition_table(months_ahead: int = 3, drop_old: bool = False):
+    """Rebuild stock_prices as a table range-partitioned by month on date"""
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            logger.info("stock_prices is already partitioned")
+            return
+
+        conn.execute(text("LOCK TABLE stock_prices IN ACCESS EXCLUSIVE MODE"))
+
+        bounds = conn.execute(text("SELECT MIN(date), MAX(date) FROM stock_prices")).first()
+        first_month = bounds[0] or date.today()
+        last_month = max(bounds[1] or date.today(), date.today())
+        end = last_month
+        for _ in range(months_ahead + 1):
+            end = _next_month(end)
+
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('stock_prices', 'id')")).scalar()
+
+        conn.execute(text("""
+            CREATE TABLE stock_prices_partitioned
+                (LIKE stock_prices INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE (date)
+        """))
+        # The partition key must be part of every unique constraint
+        conn.execute(text("ALTER TABLE stock_prices_partitioned ADD PRIMARY KEY (id, date)"))
+
+        created = create_month_partitions(conn, "stock_prices_partitioned", first_month, end)
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS stock_prices_default PARTITION OF stock_prices_partitioned DEFAULT"
+        ))
+        logger.info(f"Created {created} monthly partitions ({first_month:%Y-%m} .. {end:%Y-%m})")
+
+        result = conn.execute(text("INSERT INTO stock_prices_partitioned SELECT * FROM stock_prices"))
+        logger.info(f"Copied {result.rowcount} rows into the partitioned table")
+
+        # Swap tables; keep the old one around until --drop-old
+        conn.execute(text("ALTER TABLE stock_prices RENAME TO stock_prices_unpartitioned"))
+        conn.execute(text(f"ALTER INDEX IF EXISTS {UNIQUE_INDEX} RENAME TO {UNIQUE_INDEX}_old"))
+        conn.execute(text("ALTER INDEX IF EXISTS idx_stock_prices_date RENAME TO idx_stock_prices_date_old"))
+        conn.execute(text("ALTER INDEX IF EXISTS ix_stock_prices_date RENAME TO ix_stock_prices_date_old"))
+        conn.execute(text("ALTER TABLE stock_prices_partitioned RENAME TO stock_prices"))
+
+        conn.execute(text(CREATE_UNIQUE_INDEX_SQL.format(concurrently="")))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_stock_prices_date ON stock_prices (date)"))
+
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY stock_prices.id"))
+
+        # Re-attach the metadata sync trigger from init.sql if it exists
+        has_trigger_fn = conn.execute(text(
+            "SELECT 1 FROM pg_proc WHERE proname = 'sync_stock_metadata'"
+        )).scalar()
+        if has_trigger_fn:
+            conn.execute(text("DROP TRIGGER IF EXISTS trg_stock_prices_to_metadata ON stock_prices_unpartitioned"))
+            conn.execute(text("""
+                CREATE TRIGGER trg_stock_prices_to_metadata
+                AFTER INSERT ON stock_prices
+                FOR EACH ROW
+                EXECUTE FUNCTION sync_stock_metadata()
+            """))
+
+        has_stats_fn = conn.execute(text(
+            "SELECT 1 FROM pg_proc WHERE proname = 'maintain_stock_price_stats'"
+        )).scalar()
+        if has_stats_fn:
+            conn.execute(text("DROP TRIGGER IF EXISTS trg_stock_prices_stats ON stock_prices_unpartitioned"))
+            conn.execute(text(STATS_TRIGGER_SQL))
+
+        if drop_old:
+            conn.execute(text("DROP TABLE stock_prices_unpartitioned"))
+            logger.info("Dropped stock_prices_unpartitioned")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE stock_prices"))
+
+    logger.info("stock_prices is now partitioned by month")
+
+
+def add_future_partitions(months_ahead: int):
+    """Create partitions for upcoming months (run periodically, e.g. monthly)"""
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            logger.warning("stock_prices is not partitioned; nothing to do")
+            return
+
+        start = _month_start(date.today())
+        end = start
+        for _ in range(months_ahead + 1):
+            end = _next_month(end)
+
+        created = create_month_partitions(conn, "stock_prices", start, end)
+        logger.info(f"Ensured {created} monthly partitions up to {end:%Y-%m}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade the stock_prices schema")
+    parser.add_argument("--partition", action="store_true",
+                        help="Convert stock_prices to monthly range partitions")
+    parser.add_argument("--months-ahead", type=int, default=3,
+                        help="Future monthly partitions to pre-create")
+    parser.add_argument("--drop-old", action="store_true",
+                        help="Drop the unpartitioned copy after --partition")
+    parser.add_argument("--add-partitions", type=int, metavar="MONTHS",
+                        help="Only create partitions for the next MONTHS months")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Only rebuild stock_price_stats and its trigger")
+    args = parser.parse_args()
+
+    if args.rebuild_stats:
+        with engine.begin() as conn:
+            install_price_stats(conn)
+        return
+
+    if args.add_partitions is not None:
+        add_future_partitions(args.add_partitions)
+        return
+
+    logger.info("=" * 60)
+    logger.info("STOCK_PRICES SCHEMA UPGRADE")
+    logger.info("=" * 60)
+
+    with engine.begin() as conn:
+        backfill_exchange(conn)
+        deduplicate(conn)
+
+    if args.partition:
+        partition_table(months_ahead=args.months_ahead, drop_old=args.drop_old)
+    else:
+        upgrade_indexes()
+
+    with engine.begin() as conn:
+        install_price_stats(conn)
+
+    create_listing_indexes()
+
+    logger.info("Schema upgrade completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Text, BigInteger, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Text, BigInteger, Boolean, ForeignKey, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from database import Base  # QUAN TRỌNG: import Base từ database.py
 
 class StockMetadata(Base):
     __tablename__ = "stock_metadata"
+    __table_args__ = (
+        # Keyset order and symbol prefix search for /stocks; the trigram name
+        # index needs pg_trgm and is created by init.sql / migrate_stock_prices.py
+        Index("idx_stock_metadata_exchange_symbol", "exchange", "symbol"),
+        Index(
+            "idx_stock_metadata_symbol_prefix", "symbol",
+            postgresql_ops={"symbol": "text_pattern_ops"}
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String(20), nullable=False, index=True)
@@ -17,18 +26,92 @@ class StockMetadata(Base):
 
 class StockPrice(Base):
     __tablename__ = "stock_prices"
+    __table_args__ = (
+        # One row per (symbol, exchange, date); OHLCV is INCLUDEd so history and
+        # latest-price lookups are index-only scans in date order
+        Index(
+            "uq_stock_prices_symbol_exchange_date",
+            "symbol", "exchange", text("date DESC"),
+            unique=True,
+            postgresql_include=["open", "high", "low", "close", "volume"]
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    symbol = Column(String(20), nullable=False, index=True)
+    symbol = Column(String(20), nullable=False)
     date = Column(Date, nullable=False, index=True)
     open = Column(Float(precision=4))
     high = Column(Float(precision=4))
     low = Column(Float(precision=4))
     close = Column(Float(precision=4))
     volume = Column(BigInteger)
-    exchange = Column(String(10))
+    exchange = Column(String(10), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
+class StockPriceStats(Base):
+    """Row count and date range per (symbol, exchange), maintained by a trigger on stock_prices"""
+    __tablename__ = "stock_price_stats"
+    
+    symbol = Column(String(20), primary_key=True)
+    exchange = Column(String(10), primary_key=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
+    min_date = Column(Date)
+    max_date = Column(Date)
+
+class StockAggregation(Base):
+    """All-time rollup per (symbol, exchange), published by spark-jobs/data_processor.py"""
+    __tablename__ = "stock_aggregations"
+    __table_args__ = (
+        Index("idx_stock_aggregations_avg_volume", text("avg_volume DESC")),
+        Index("idx_stock_aggregations_volatility", text("price_range_ratio DESC")),
+    )
+    
+    symbol = Column(String(20), primary_key=True)
+    exchange = Column(String(10), primary_key=True)
+    record_count = Column(BigInteger)
+    first_date = Column(Date)
+    last_date = Column(Date)
+    avg_price = Column(Float)
+    price_volatility = Column(Float)
+    avg_volume = Column(Float)
+    max_volume = Column(BigInteger)
+    min_volume = Column(BigInteger)
+    avg_daily_return = Column(Float)
+    data_span_days = Column(Integer)
+    price_range_ratio = Column(Float)
+    computed_at = Column(DateTime, server_default=func.now())
+
+class StockIndicatorSnapshot(Base):
+    """Latest technical indicators per (symbol, exchange), published by spark-jobs/stock_analysis.py"""
+    __tablename__ = "stock_indicator_snapshot"
+    __table_args__ = (
+        Index("idx_stock_indicator_snapshot_signal", "combined_signal"),
+    )
+    
+    symbol = Column(String(20), primary_key=True)
+    exchange = Column(String(10), primary_key=True)
+    date = Column(Date, nullable=False)
+    close = Column(Float)
+    volume = Column(BigInteger)
+    ma_5 = Column(Float)
+    ma_10 = Column(Float)
+    ma_20 = Column(Float)
+    ma_50 = Column(Float)
+    rsi = Column(Float)
+    bb_upper = Column(Float)
+    bb_lower = Column(Float)
+    bb_position = Column(Float)
+    macd = Column(Float)
+    volume_ratio = Column(Float)
+    ma_crossover = Column(String(20))
+    rsi_signal = Column(String(20))
+    bb_signal = Column(String(20))
+    volume_signal = Column(String(20))
+    combined_signal = Column(String(20))
+    anomaly_score = Column(Integer)
+    has_anomaly = Column(Boolean)
+    computed_at = Column(DateTime, server_default=func.now())
+
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
     
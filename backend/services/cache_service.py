@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+
+# Keys bumped by data-ingestion (see data-ingestion/cache_invalidation.py)
+HDFS_LISTING_VERSION_KEY = "hdfs:listing:version"
+ANALYTICS_VERSION_KEY = "analytics:version"
+
+CACHE_STATS_KEY = "cache:stats"
+# How long a miss may hold the compute lock before others stop waiting for it
+COMPUTE_LOCK_TIMEOUT_SECONDS = 30
+
+_redis_client: Optional[redis.Redis] = None
+_redis_lock = threading.Lock()
+
+
+def _normalize(result: Any) -> Any:
+    """The value a cache hit would return for result"""
+    return json.loads(json.dumps(result, default=str))
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Shared Redis client (connection pool), or None if Redis is unreachable"""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                try:
+                    _redis_client = redis.Redis.from_url(
+                        REDIS_URL,
+                        socket_connect_timeout=2,
+                        socket_timeout=2,
+                        decode_responses=True
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to create Redis client: {e}")
+                    return None
+    return _redis_client
+
+
+def get_version(key: str) -> Optional[str]:
+    """Current value of an invalidation counter, or None if Redis is unavailable"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        return client.get(key) or "0"
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, cannot read {key}: {e}")
+        return None
+
+
+def bump_version(key: str) -> bool:
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        client.incr(key)
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, cannot bump {key}: {e}")
+        return False
+
+
+class ResponseCache:
+    """Redis-backed JSON response cache with per-key request coalescing
+
+    Keys embed the current value of a version counter, so bumping the counter
+    (on ingestion) invalidates every entry at once; stale keys age out by TTL.
+    Concurrent misses for the same key compute once: threads in this process
+    wait on a local lock, other processes wait on a Redis SET NX lock.
+    """
+
+    def __init__(self, namespace: str, version_key: str):
+        self.namespace = namespace
+        self.version_key = version_key
+        self._local_locks: Dict[str, threading.Lock] = {}
+        self._local_locks_guard = threading.Lock()
+
+    def _key(self, name: str, version: str, params: Dict[str, Any]) -> str:
+        param_str = json.dumps(params, sort_keys=True, default=str)
+        return f"cache:{self.namespace}:v{version}:{name}:{param_str}"
+
+    def _local_lock(self, key: str) -> threading.Lock:
+        with self._local_locks_guard:
+            return self._local_locks.setdefault(key, threading.Lock())
+
+    def _record(self, client: redis.Redis, name: str, outcome: str):
+        try:
+            client.hincrby(CACHE_STATS_KEY, f"{self.namespace}:{name}:{outcome}", 1)
+        except redis.RedisError:
+            pass
+
+    def _get_cached(self, client: redis.Redis, key: str):
+        value = client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def get_or_compute(self, name: str, params: Dict[str, Any], ttl: int, compute: Callable[[], Any]) -> Any:
+        client = get_redis()
+        version = get_version(self.version_key)
+        if client is None or version is None:
+            # Redis down: serve uncached rather than fail
+            return _normalize(compute())
+
+        key = self._key(name, version, params)
+        try:
+            cached = self._get_cached(client, key)
+            if cached is not None:
+                self._record(client, name, "hits")
+                return cached
+
+            with self._local_lock(key):
+                # Another thread may have filled it while we waited
+                cached = self._get_cached(client, key)
+                if cached is not None:
+                    self._record(client, name, "hits")
+                    return cached
+
+                lock_key = f"lock:{key}"
+                deadline = time.monotonic() + COMPUTE_LOCK_TIMEOUT_SECONDS
+                while not client.set(lock_key, "1", nx=True, ex=COMPUTE_LOCK_TIMEOUT_SECONDS):
+                    # Another process is computing this key
+                    time.sleep(0.05)
+                    cached = self._get_cached(client, key)
+                    if cached is not None:
+                        self._record(client, name, "hits")
+                        return cached
+                    if time.monotonic() > deadline:
+                        break
+
+                try:
+                    self._record(client, name, "misses")
+                    body = json.dumps(compute(), default=str)
+                    client.set(key, body, ex=ttl)
+                    # Same shape as a hit (Decimal/date already turned into str)
+                    return json.loads(body)
+                finally:
+                    client.delete(lock_key)
+                    with self._local_locks_guard:
+                        self._local_locks.pop(key, None)
+
+        except redis.RedisError as e:
+            logger.warning(f"Cache unavailable for {name}: {e}")
+            return _normalize(compute())
+
+    def invalidate(self) -> bool:
+        return bump_version(self.version_key)
+
+
+analytics_cache = ResponseCache("analytics", ANALYTICS_VERSION_KEY)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters per cached endpoint"""
+    client = get_redis()
+    if client is None:
+        return {"available": False}
+
+    try:
+        raw = client.hgetall(CACHE_STATS_KEY)
+    except redis.RedisError as e:
+        return {"available": False, "error": str(e)}
+
+    endpoints: Dict[str, Dict[str, Any]] = {}
+    for field, value in raw.items():
+        endpoint, _, outcome = field.rpartition(":")
+        endpoints.setdefault(endpoint, {"hits": 0, "misses": 0})[outcome] = int(value)
+
+    for counters in endpoints.values():
+        total = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = round(counters["hits"] / total, 4) if total else None
+
+    return {
+        "available": True,
+        "analytics_version": get_version(ANALYTICS_VERSION_KEY),
+        "endpoints": endpoints
+    }
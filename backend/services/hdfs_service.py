@@ -1,12 +1,34 @@
+import csv
 import json
 import logging
-from typing import List, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional
 from hdfs import InsecureClient
 from datetime import datetime
 import os
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.cache_service import HDFS_LISTING_VERSION_KEY, get_version
+
 logger = logging.getLogger(__name__)
 
+HEALTH_CHECK_TTL_SECONDS = int(os.getenv('HDFS_HEALTH_CHECK_TTL', '30'))
+HTTP_POOL_SIZE = int(os.getenv('HDFS_HTTP_POOL_SIZE', '20'))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+# Byte offset of every Nth data line is kept, so a page read skips < N lines
+LINE_INDEX_STRIDE = 500
+LINE_INDEX_CACHE_SIZE = int(os.getenv('HDFS_LINE_INDEX_CACHE_SIZE', '32'))
+LISTING_CACHE_TTL_SECONDS = int(os.getenv('HDFS_LISTING_CACHE_TTL', '30'))
+LISTING_CACHE_SIZE = 2048
+LIST_WORKERS = int(os.getenv('HDFS_LIST_WORKERS', '8'))
+
 class HDFSService:
     def __init__(self):
         # Sửa: Dùng port 9870 (WebHDFS) thay vì port mặc định
@@ -14,57 +36,168 @@ class HDFSService:
         self.hdfs_user = os.getenv('HDFS_USER', 'root')  # Sử dụng root để có quyền
         
         # URL WebHDFS đúng
-        webhdfs_url = f"http://{self.hdfs_namenode}"
+        self.webhdfs_url = f"http://{self.hdfs_namenode}"
+        
+        self.session = None
+        self.client = None
+        self._lock = threading.Lock()
+        self._healthy = None
+        self._checked_at = 0.0
+        
+        # Line-offset indexes for paged reads, keyed by path (LRU)
+        self._line_indexes = OrderedDict()
+        self._index_lock = threading.Lock()
         
-        logger.info(f"Connecting to HDFS: {webhdfs_url} as user: {self.hdfs_user}")
+        # Directory listings: path -> (cached_at, version, files); dropped when the
+        # uploader bumps the listing version in Redis or after the TTL
+        self._listings = OrderedDict()
+        self._listings_lock = threading.Lock()
+        self._listing_version = None
+        self._listing_version_checked_at = 0.0
+        self._list_executor = ThreadPoolExecutor(max_workers=LIST_WORKERS, thread_name_prefix="hdfs-list")
+        
+        # No round trip here: health is checked lazily (see is_healthy)
+        self._connect()
+    
+    def _connect(self):
+        """(Re)create the pooled HTTP session and WebHDFS client"""
+        logger.info(f"Connecting to HDFS: {self.webhdfs_url} as user: {self.hdfs_user}")
         
         try:
-            self.client = InsecureClient(
-                webhdfs_url,
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            
+            client = InsecureClient(
+                self.webhdfs_url,
                 user=self.hdfs_user,
-                timeout=30
+                timeout=30,
+                session=session
             )
-            # Test connection
-            if self.test_connection():
-                logger.info("✅ HDFS service initialized successfully")
-            else:
-                logger.error("❌ HDFS connection failed")
         except Exception as e:
             logger.error(f"❌ Failed to initialize HDFS client: {e}")
+            return
+        
+        old_session = self.session
+        self.session, self.client = session, client
+        self._checked_at = 0.0
+        if old_session is not None:
+            old_session.close()
+    
+    def reconnect(self):
+        with self._lock:
+            self._connect()
+    
+    def call(self, operation: Callable[[InsecureClient], Any]) -> Any:
+        """Run operation(client), reconnecting once if the connection is broken"""
+        if not self.client:
+            self.reconnect()
+        if not self.client:
+            raise ConnectionError("HDFS client not initialized")
+        
+        try:
+            return operation(self.client)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            logger.warning(f"HDFS connection error ({e}), reconnecting...")
+            self._healthy = False
+            self.reconnect()
+            return operation(self.client)
+    
+    @contextmanager
+    def open_reader(self, file_path: str, **kwargs):
+        """client.read() opened through call(), so opening gets the same reconnect-and-retry
+
+        Only the open (where a stale session or restarted NameNode/DataNode
+        fails) is retried; an error after data has been yielded propagates.
+        """
+        def open_file(client):
+            stack = ExitStack()
+            reader = stack.enter_context(client.read(file_path, **kwargs))
+            return stack, reader
+        
+        stack, reader = self.call(open_file)
+        with stack:
+            yield reader
+    
+    def close(self):
+        self._list_executor.shutdown(wait=False)
+        with self._lock:
+            if self.session is not None:
+                self.session.close()
+            self.session = None
             self.client = None
     
     def test_connection(self) -> bool:
         """Test HDFS connection"""
         try:
-            if not self.client:
-                return False
-            
-            status = self.client.status("/", strict=False)
+            self.call(lambda client: client.status("/", strict=False))
+            self._healthy = True
             logger.info(f"HDFS connection successful")
-            return True
         except Exception as e:
+            self._healthy = False
             logger.error(f"HDFS connection failed: {str(e)}")
-            return False
+        
+        self._checked_at = time.monotonic()
+        return self._healthy
+    
+    def is_healthy(self, max_age: float = HEALTH_CHECK_TTL_SECONDS) -> bool:
+        """Cached connectivity check; only hits the NameNode when the result is stale"""
+        if self._healthy is None or time.monotonic() - self._checked_at > max_age:
+            return self.test_connection()
+        return self._healthy
+    
+    def _current_listing_version(self) -> Optional[str]:
+        """Listing version from Redis, re-read at most once per second"""
+        now = time.monotonic()
+        if now - self._listing_version_checked_at > 1.0:
+            self._listing_version = get_version(HDFS_LISTING_VERSION_KEY)
+            self._listing_version_checked_at = now
+        return self._listing_version
+    
+    def _cached_listing(self, path: str, version: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        with self._listings_lock:
+            entry = self._listings.get(path)
+            if not entry:
+                return None
+            cached_at, cached_version, files = entry
+            if cached_version != version or time.monotonic() - cached_at > LISTING_CACHE_TTL_SECONDS:
+                del self._listings[path]
+                return None
+            self._listings.move_to_end(path)
+            return files
+    
+    def _store_listing(self, path: str, version: Optional[str], files: List[Dict[str, Any]]):
+        with self._listings_lock:
+            self._listings[path] = (time.monotonic(), version, files)
+            self._listings.move_to_end(path)
+            while len(self._listings) > LISTING_CACHE_SIZE:
+                self._listings.popitem(last=False)
+    
+    def invalidate_listings(self):
+        with self._listings_lock:
+            self._listings.clear()
     
-    def list_files(self, path: str = "/stock_data") -> List[Dict[str, Any]]:
+    def list_files(self, path: str = "/stock_data", use_cache: bool = True) -> List[Dict[str, Any]]:
         """List files in HDFS directory"""
         try:
             if not self.client:
                 logger.error("HDFS client not initialized")
                 return []
             
+            version = self._current_listing_version()
+            if use_cache:
+                cached = self._cached_listing(path, version)
+                if cached is not None:
+                    return list(cached)
+            
             files = []
             
             logger.info(f"Listing files in: {path}")
             
             try:
-                # Check if path exists
-                if not self.client.status(path, strict=False):
-                    logger.warning(f"Path does not exist: {path}")
-                    return files
-                
-                # List files
-                items = self.client.list(path, status=True)
+                # LISTSTATUS fails for missing paths, so no separate existence check
+                items = self.call(lambda client: client.list(path, status=True))
                 logger.info(f"Found {len(items)} items in {path}")
                 
                 for item in items:
@@ -96,13 +229,249 @@ class HDFSService:
                 return files
             
             logger.info(f"Successfully listed {len(files)} files")
-            return files
+            self._store_listing(path, version, files)
+            return list(files)
             
         except Exception as e:
             logger.error(f"Error listing files in {path}: {str(e)}")
             # Return empty list instead of raising exception
             return []
     
+    def explore_tree(self, path: str = "/", max_depth: int = 3, limit: int = 200,
+                     offset: int = 0) -> Dict[str, Any]:
+        """Directory tree from path, listing each level's directories concurrently
+        
+        At most `limit` children are returned per directory (`truncated` marks
+        the rest; page them with path=<dir>&offset=N). Directories below
+        max_depth come back with children=None and `expandable` set, to be
+        fetched lazily.
+        """
+        def node(item):
+            return {
+                "name": item["name"],
+                "path": item["path"],
+                "type": item["type"],
+                "size": item["size"],
+                "modification_time": item["modification_time"]
+            }
+        
+        items = self.list_files(path)
+        total = len(items)
+        tree = [node(item) for item in items[offset:offset + limit]]
+        
+        frontier = [n for n in tree if n["type"] == "directory"]
+        depth = 1
+        while frontier and depth < max_depth:
+            listings = list(self._list_executor.map(lambda n: self.list_files(n["path"]), frontier))
+            
+            next_frontier = []
+            for directory, children in zip(frontier, listings):
+                directory["children"] = [node(child) for child in children[:limit]]
+                directory["children_count"] = len(children)
+                directory["truncated"] = len(children) > limit
+                next_frontier.extend(c for c in directory["children"] if c["type"] == "directory")
+            
+            frontier = next_frontier
+            depth += 1
+        
+        for directory in frontier:
+            directory["children"] = None
+            directory["expandable"] = True
+        
+        return {
+            "path": path,
+            "tree": tree,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < total else None
+        }
+    
+    def get_file_status(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """WebHDFS FileStatus of a path, or None if it does not exist"""
+        return self.call(lambda client: client.status(file_path, strict=False))
+    
+    def stream_file(self, file_path: str, offset: int = 0, length: Optional[int] = None,
+                    chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield a byte range of an HDFS file in chunks (constant memory)"""
+        with self.open_reader(file_path, offset=offset, length=length, chunk_size=chunk_size) as reader:
+            for chunk in reader:
+                yield chunk
+    
+    def _read_lines(self, file_path: str, offset: int, max_lines: int, file_size: int):
+        """Read up to max_lines lines starting at a byte offset; returns (lines, next_offset)"""
+        lines = []
+        pos = offset
+        buffer = b""
+        
+        if max_lines <= 0 or offset >= file_size:
+            return lines, None
+        
+        with self.open_reader(file_path, offset=offset, chunk_size=READ_CHUNK_SIZE) as reader:
+            for chunk in reader:
+                buffer += chunk
+                start = 0
+                while len(lines) < max_lines:
+                    newline = buffer.find(b"\n", start)
+                    if newline < 0:
+                        break
+                    lines.append(buffer[start:newline])
+                    pos += newline + 1 - start
+                    start = newline + 1
+                buffer = buffer[start:]
+                if len(lines) >= max_lines:
+                    break
+            else:
+                # End of file without a trailing newline
+                if buffer and len(lines) < max_lines:
+                    lines.append(buffer)
+                    pos += len(buffer)
+        
+        decoded = [line.decode("utf-8", errors="replace").rstrip("\r") for line in lines]
+        return decoded, (pos if pos < file_size else None)
+    
+    def _build_line_index(self, file_path: str, status: Dict[str, Any], has_header: bool) -> Dict[str, Any]:
+        """One streaming pass recording the byte offset of every LINE_INDEX_STRIDE-th data line"""
+        file_size = status.get("length", 0)
+        offsets = []
+        line_count = 0
+        skip = 1 if has_header else 0
+        
+        def register(line_start):
+            data_line = line_count - skip
+            if data_line >= 0 and data_line % LINE_INDEX_STRIDE == 0:
+                offsets.append(line_start)
+        
+        if file_size > 0:
+            register(0)
+            line_count = 1
+        
+        pos = 0
+        with self.open_reader(file_path, chunk_size=DOWNLOAD_CHUNK_SIZE) as reader:
+            for chunk in reader:
+                newline = chunk.find(b"\n")
+                while newline != -1:
+                    line_start = pos + newline + 1
+                    if line_start < file_size:
+                        register(line_start)
+                        line_count += 1
+                    newline = chunk.find(b"\n", newline + 1)
+                pos += len(chunk)
+        
+        header = None
+        if has_header and file_size > 0:
+            header_lines, _ = self._read_lines(file_path, 0, 1, file_size)
+            header = header_lines[0] if header_lines else None
+        
+        logger.info(f"Indexed {file_path}: {line_count} lines, {len(offsets)} offsets")
+        return {
+            "length": file_size,
+            "modification_time": status.get("modificationTime"),
+            "header": header,
+            "offsets": offsets,
+            "total_lines": max(0, line_count - skip)
+        }
+    
+    def get_line_index(self, file_path: str, status: Dict[str, Any], has_header: bool) -> Dict[str, Any]:
+        """Cached line index, rebuilt when the file's length or mtime changes"""
+        with self._index_lock:
+            index = self._line_indexes.get(file_path)
+            if (index and index["length"] == status.get("length")
+                    and index["modification_time"] == status.get("modificationTime")):
+                self._line_indexes.move_to_end(file_path)
+                return index
+        
+        index = self._build_line_index(file_path, status, has_header)
+        
+        with self._index_lock:
+            self._line_indexes[file_path] = index
+            self._line_indexes.move_to_end(file_path)
+            while len(self._line_indexes) > LINE_INDEX_CACHE_SIZE:
+                self._line_indexes.popitem(last=False)
+        return index
+    
+    @staticmethod
+    def _coerce(value: str):
+        if value == "":
+            return None
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                continue
+        return value
+    
+    def read_page(self, file_path: str, page: Optional[int] = None, offset: Optional[int] = None,
+                  page_size: int = 100, typed: bool = False) -> Dict[str, Any]:
+        """Read one page of a text/CSV file without re-reading what comes before it
+        
+        - offset: byte cursor (use next_offset from the previous page), no index needed
+        - page: 1-based page number, resolved through the cached line index
+        Returns raw lines, or typed rows (dicts keyed by the CSV header) when typed=True.
+        """
+        status = self.get_file_status(file_path)
+        if not status:
+            raise FileNotFoundError(f"File not found: {file_path}")
+        if status.get("type") == "DIRECTORY":
+            raise IsADirectoryError(f"Not a file: {file_path}")
+        
+        file_size = status.get("length", 0)
+        has_header = file_path.lower().endswith(".csv")
+        header = None
+        total_lines = None
+        
+        if page is not None:
+            index = self.get_line_index(file_path, status, has_header)
+            header = index["header"]
+            total_lines = index["total_lines"]
+            
+            first_line = (page - 1) * page_size
+            if first_line >= total_lines:
+                lines, next_offset = [], None
+            else:
+                block = first_line // LINE_INDEX_STRIDE
+                skip = first_line - block * LINE_INDEX_STRIDE
+                lines, next_offset = self._read_lines(
+                    file_path, index["offsets"][block], skip + page_size, file_size
+                )
+                lines = lines[skip:]
+            offset = None
+        elif not offset:
+            # First page: header and data in one read
+            lines, next_offset = self._read_lines(file_path, 0, page_size + (1 if has_header else 0), file_size)
+            if has_header and lines:
+                header = lines.pop(0)
+            offset = 0
+        else:
+            if has_header:
+                header_lines, _ = self._read_lines(file_path, 0, 1, file_size)
+                header = header_lines[0] if header_lines else None
+            lines, next_offset = self._read_lines(file_path, offset, page_size, file_size)
+        
+        columns = next(csv.reader([header])) if header else None
+        
+        result = {
+            "file_path": file_path,
+            "file_size": file_size,
+            "header": columns,
+            "page": page,
+            "page_size": page_size,
+            "offset": offset,
+            "next_offset": next_offset,
+            "total_lines": total_lines,
+            "total_pages": (total_lines + page_size - 1) // page_size if total_lines is not None else None
+        }
+        
+        if typed and columns:
+            result["rows"] = [
+                dict(zip(columns, (self._coerce(value) for value in values)))
+                for values in csv.reader(lines) if values
+            ]
+        else:
+            result["lines"] = lines
+        
+        return result
+    
     def read_file(self, file_path: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Read file from HDFS (CSV format)"""
         try:
@@ -112,7 +481,7 @@ class HDFSService:
             
             logger.info(f"Reading file: {file_path}")
             
-            with self.client.read(file_path, encoding='utf-8') as reader:
+            with self.open_reader(file_path, encoding='utf-8') as reader:
                 lines = []
                 headers = []
                 
@@ -154,7 +523,7 @@ class HDFSService:
             
             # Check if path exists
             try:
-                status = self.client.status(path, strict=False)
+                status = self.call(lambda client: client.status(path, strict=False))
                 if not status:
                     return {
                         "path": path,
@@ -183,7 +552,7 @@ class HDFSService:
             
             # Count files and directories
             try:
-                items = self.client.list(path, status=True)
+                items = self.call(lambda client: client.list(path, status=True))
                 dir_count = 0
                 file_count = 0
                 total_size = 0
@@ -215,4 +584,27 @@ class HDFSService:
                 "path": path,
                 "exists": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+
+# Application-scoped instance, created in the FastAPI lifespan (main.py)
+_hdfs_service: Optional[HDFSService] = None
+_hdfs_service_lock = threading.Lock()
+
+def init_hdfs_service() -> HDFSService:
+    global _hdfs_service
+    with _hdfs_service_lock:
+        if _hdfs_service is None:
+            _hdfs_service = HDFSService()
+        return _hdfs_service
+
+def get_hdfs_service() -> HDFSService:
+    """FastAPI dependency returning the shared HDFS service"""
+    return _hdfs_service or init_hdfs_service()
+
+def close_hdfs_service():
+    global _hdfs_service
+    with _hdfs_service_lock:
+        if _hdfs_service is not None:
+            _hdfs_service.close()
+        _hdfs_service = None
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# How often the (cheap) change check against stock_metadata may run
+CHECK_INTERVAL_SECONDS = int(os.getenv('METADATA_CACHE_CHECK_SECONDS', '30'))
+
+
+class MetadataCache:
+    """In-process symbol -> stock_metadata dictionary
+
+    The table is small, so it is loaded whole. At most every
+    CHECK_INTERVAL_SECONDS a one-row signature query (row count, max id,
+    max updated_at) detects inserts and ORM updates and triggers a reload.
+    """
+
+    SIGNATURE_SQL = text("SELECT COUNT(*), MAX(id), MAX(updated_at) FROM stock_metadata")
+    LOAD_SQL = text("""
+        SELECT id, symbol, exchange, company_name, sector, industry
+        FROM stock_metadata
+        ORDER BY id
+    """)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._rows: List[Dict[str, Any]] = []
+        self._by_key: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._by_symbol: Dict[str, Dict[str, Any]] = {}
+
+    def _refresh(self, db: Session, force: bool = False):
+        now = time.monotonic()
+        if not force and self._signature is not None and now - self._checked_at < CHECK_INTERVAL_SECONDS:
+            return
+
+        with self._lock:
+            if not force and self._signature is not None and now - self._checked_at < CHECK_INTERVAL_SECONDS:
+                return
+
+            signature = tuple(db.execute(self.SIGNATURE_SQL).fetchone())
+            self._checked_at = now
+            if signature == self._signature and not force:
+                return
+
+            rows = [dict(row._mapping) for row in db.execute(self.LOAD_SQL)]
+            self._install(rows, signature)
+
+    async def _refresh_async(self, db: AsyncSession):
+        """Same check as _refresh on an async session; never blocks the event loop
+
+        Concurrent coroutines may both reload after a change, which is harmless.
+        """
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < CHECK_INTERVAL_SECONDS:
+            return
+
+        signature = tuple((await db.execute(self.SIGNATURE_SQL)).fetchone())
+        self._checked_at = now
+        if signature == self._signature:
+            return
+
+        # No self._lock here: a sync refresh may hold it across a query. The
+        # swap in _install is a single tuple assignment, so readers stay consistent.
+        rows = [dict(row._mapping) for row in await db.execute(self.LOAD_SQL)]
+        self._install(rows, signature)
+
+    def _install(self, rows: List[Dict[str, Any]], signature):
+        by_key = {(row["symbol"], row["exchange"]): row for row in rows}
+        by_symbol = {}
+        for row in rows:
+            # Lowest id wins for symbols listed on several exchanges
+            by_symbol.setdefault(row["symbol"], row)
+
+        self._rows, self._by_key, self._by_symbol = rows, by_key, by_symbol
+        self._signature = signature
+        logger.info(f"Loaded {len(rows)} stock_metadata rows into cache")
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+    def all(self, db: Session) -> List[Dict[str, Any]]:
+        self._refresh(db)
+        return self._rows
+
+    def get(self, db: Session, symbol: str, exchange: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        self._refresh(db)
+        return self._lookup(symbol, exchange)
+
+    def _lookup(self, symbol: str, exchange: Optional[str]) -> Optional[Dict[str, Any]]:
+        if exchange is not None:
+            row = self._by_key.get((symbol, exchange))
+            if row is not None:
+                return row
+        return self._by_symbol.get(symbol)
+
+    async def all_async(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        await self._refresh_async(db)
+        return self._rows
+
+    async def get_async(self, db: AsyncSession, symbol: str, exchange: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        await self._refresh_async(db)
+        return self._lookup(symbol, exchange)
+
+
+metadata_cache = MetadataCache()
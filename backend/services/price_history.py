@@ -0,0 +1,162 @@
+import gzip
+import io
+import json
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.metadata_cache import metadata_cache
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# Smaller bodies are sent uncompressed; the framing overhead is not worth it
+MIN_COMPRESS_BYTES = 1024
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# One LATERAL index range scan per (symbol, exchange) on
+# uq_stock_prices_symbol_exchange_date; only the covered columns are read
+HISTORY_SQL = text("""
+    SELECT s.symbol, s.exchange, p.date, p.open, p.high, p.low, p.close, p.volume
+    FROM unnest(CAST(:symbols AS VARCHAR[]), CAST(:exchanges AS VARCHAR[])) AS s(symbol, exchange)
+    CROSS JOIN LATERAL (
+        SELECT date, open, high, low, close, volume
+        FROM stock_prices
+        WHERE stock_prices.symbol = s.symbol
+          AND stock_prices.exchange = s.exchange
+          AND (CAST(:start_date AS DATE) IS NULL OR date >= :start_date)
+          AND (CAST(:end_date AS DATE) IS NULL OR date <= :end_date)
+        ORDER BY date DESC
+        LIMIT :limit
+    ) p
+    ORDER BY s.symbol, s.exchange, p.date
+""")
+
+
+def parse_symbols(raw: str, max_symbols: int) -> List[str]:
+    """Split a comma-separated symbol list, dropping blanks and duplicates (order kept)"""
+    symbols = []
+    for symbol in raw.split(","):
+        symbol = symbol.strip().upper()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+    if not symbols:
+        raise ValueError("No symbols given")
+    if len(symbols) > max_symbols:
+        raise ValueError(f"At most {max_symbols} symbols per request")
+    return symbols
+
+
+async def _resolve_exchanges(db: AsyncSession, symbols: List[str]) -> Tuple[List[str], List[str], List[str]]:
+    """Exchange per symbol from the metadata cache (same choice as /stocks/{symbol})"""
+    found_symbols, exchanges, missing = [], [], []
+    for symbol in symbols:
+        metadata = await metadata_cache.get_async(db, symbol)
+        if metadata is None:
+            missing.append(symbol)
+        else:
+            found_symbols.append(symbol)
+            exchanges.append(metadata["exchange"])
+    return found_symbols, exchanges, missing
+
+
+def _number(value):
+    # DECIMAL columns arrive as Decimal
+    return float(value) if value is not None else None
+
+
+async def get_price_history(db: AsyncSession, symbols: List[str], start_date: Optional[date] = None,
+                            end_date: Optional[date] = None, limit: int = 365) -> Dict[str, Any]:
+    """Columnar OHLCV history for several symbols: one parallel array per column, dates ascending"""
+    found_symbols, exchanges, missing = await _resolve_exchanges(db, symbols)
+
+    series: Dict[str, Dict[str, Any]] = {}
+    if found_symbols:
+        result = await db.execute(HISTORY_SQL, {
+            "symbols": found_symbols,
+            "exchanges": exchanges,
+            "start_date": start_date,
+            "end_date": end_date,
+            "limit": limit
+        })
+        for symbol, exchange in zip(found_symbols, exchanges):
+            series[symbol] = {"exchange": exchange, "date": [], **{c: [] for c in PRICE_COLUMNS}}
+
+        for row in result:
+            columns = series[row.symbol]
+            columns["date"].append(row.date.isoformat())
+            columns["open"].append(_number(row.open))
+            columns["high"].append(_number(row.high))
+            columns["low"].append(_number(row.low))
+            columns["close"].append(_number(row.close))
+            columns["volume"].append(row.volume)
+
+    return {
+        "start_date": start_date.isoformat() if start_date else None,
+        "end_date": end_date.isoformat() if end_date else None,
+        "series": series,
+        "missing": missing
+    }
+
+
+def to_json_bytes(history: Dict[str, Any]) -> bytes:
+    return json.dumps(history, separators=(",", ":")).encode()
+
+
+def to_arrow_bytes(history: Dict[str, Any]) -> bytes:
+    """Arrow IPC stream, one row per (symbol, date); symbol/exchange are dictionary-encoded"""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+
+    symbols, exchanges, dates = [], [], []
+    columns = {c: [] for c in PRICE_COLUMNS}
+    for symbol, data in history["series"].items():
+        n = len(data["date"])
+        symbols.extend([symbol] * n)
+        exchanges.extend([data["exchange"]] * n)
+        dates.extend(date.fromisoformat(d) for d in data["date"])
+        for c in PRICE_COLUMNS:
+            columns[c].extend(data[c])
+
+    table = pa.table({
+        "symbol": pa.array(symbols, pa.string()).dictionary_encode(),
+        "exchange": pa.array(exchanges, pa.string()).dictionary_encode(),
+        "date": pa.array(dates, pa.date32()),
+        "open": pa.array(columns["open"], pa.float64()),
+        "high": pa.array(columns["high"], pa.float64()),
+        "low": pa.array(columns["low"], pa.float64()),
+        "close": pa.array(columns["close"], pa.float64()),
+        "volume": pa.array(columns["volume"], pa.int64()),
+    })
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compress with brotli or gzip if the client accepts it; returns (body, content-encoding)"""
+    if not accept_encoding or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+    if "br" in accepted and brotli is not None:
+        return brotli.compress(body, quality=5), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
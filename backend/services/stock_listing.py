@@ -0,0 +1,137 @@
+import base64
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Filtered totals are exact counts, cached per filter set for this long
+COUNT_CACHE_TTL = int(os.getenv('STOCKS_COUNT_CACHE_TTL', '300'))
+COUNT_CACHE_SIZE = 256
+
+# Unfiltered totals come from pg_class.reltuples (kept current by autovacuum/ANALYZE)
+ESTIMATE_SQL = text("SELECT reltuples::BIGINT FROM pg_class WHERE oid = 'stock_metadata'::regclass")
+
+
+def encode_cursor(exchange: str, symbol: str) -> str:
+    raw = json.dumps([exchange, symbol], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        exchange, symbol = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(exchange), str(symbol)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class StockListing:
+    """Keyset-paginated, filterable stock_metadata listing
+
+    Pages are ordered by (exchange, symbol) and continue from the last row
+    of the previous page, so every page costs one index range scan no matter
+    how deep. Prefix search uses idx_stock_metadata_symbol_prefix for symbols
+    and the trigram index idx_stock_metadata_company_name_trgm for names.
+    """
+
+    def __init__(self):
+        self._counts: "OrderedDict[Tuple, Tuple[float, int]]" = OrderedDict()
+
+    def _where(self, exchange: Optional[str], sector: Optional[str], industry: Optional[str],
+               q: Optional[str]) -> Tuple[List[str], Dict[str, Any]]:
+        clauses, params = [], {}
+        if exchange:
+            clauses.append("exchange = :exchange")
+            params["exchange"] = exchange
+        if sector:
+            clauses.append("sector = :sector")
+            params["sector"] = sector
+        if industry:
+            clauses.append("industry = :industry")
+            params["industry"] = industry
+        if q:
+            clauses.append("(symbol LIKE :symbol_prefix OR lower(company_name) LIKE :name_prefix)")
+            params["symbol_prefix"] = _escape_like(q.upper()) + "%"
+            params["name_prefix"] = _escape_like(q.lower()) + "%"
+        return clauses, params
+
+    async def list(self, db: AsyncSession, exchange: Optional[str] = None, sector: Optional[str] = None,
+                   industry: Optional[str] = None, q: Optional[str] = None, cursor: Optional[str] = None,
+                   limit: int = 50, include_total: bool = False) -> Dict[str, Any]:
+        clauses, params = self._where(exchange, sector, industry, q)
+        page_clauses = list(clauses)
+        if cursor:
+            params["after_exchange"], params["after_symbol"] = decode_cursor(cursor)
+            page_clauses.append("(exchange, symbol) > (:after_exchange, :after_symbol)")
+
+        where = f"WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+        result = await db.execute(text(f"""
+            SELECT symbol, exchange, company_name, sector, industry
+            FROM stock_metadata
+            {where}
+            ORDER BY exchange, symbol
+            LIMIT :limit
+        """), {**params, "limit": limit + 1})
+        rows = result.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        response = {
+            "items": [
+                {
+                    "symbol": row.symbol,
+                    "name": row.company_name,
+                    "exchange": row.exchange,
+                    "sector": row.sector,
+                    "industry": row.industry
+                }
+                for row in rows
+            ],
+            "next_cursor": encode_cursor(rows[-1].exchange, rows[-1].symbol) if has_more else None,
+            "total": None,
+            "total_is_estimate": False
+        }
+
+        if include_total:
+            response["total"], response["total_is_estimate"] = await self.total(db, clauses, params)
+
+        return response
+
+    async def total(self, db: AsyncSession, clauses: List[str], params: Dict[str, Any]) -> Tuple[int, bool]:
+        if not clauses:
+            estimate = (await db.execute(ESTIMATE_SQL)).scalar()
+            # reltuples is -1 until the table has been vacuumed or analyzed
+            if estimate is not None and estimate >= 0:
+                return int(estimate), True
+
+        filters = {k: v for k, v in params.items() if not k.startswith("after_")}
+        key = tuple(sorted(filters.items()))
+        cached = self._counts.get(key)
+        if cached is not None and time.monotonic() - cached[0] < COUNT_CACHE_TTL:
+            self._counts.move_to_end(key)
+            return cached[1], False
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        count = (await db.execute(text(f"SELECT COUNT(*) FROM stock_metadata {where}"), filters)).scalar()
+
+        self._counts[key] = (time.monotonic(), count)
+        self._counts.move_to_end(key)
+        while len(self._counts) > COUNT_CACHE_SIZE:
+            self._counts.popitem(last=False)
+        return count, False
+
+
+stock_listing = StockListing()
@@ -1,10 +1,12 @@
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, text
+from sqlalchemy.exc import ProgrammingError
 
-from models import StockPrice, StockMetadata
+from models import StockPrice
+from services.metadata_cache import metadata_cache
 
 logger = logging.getLogger(__name__)
 
@@ -12,34 +14,62 @@ class StockService:
     def __init__(self, db: Session):
         self.db = db
     
+    # One pass: per-exchange rows plus the grand total (GROUPING(exchange) = 1)
+    SUMMARY_FROM_STATS_SQL = text("""
+        SELECT exchange,
+               GROUPING(exchange) AS is_total,
+               COUNT(DISTINCT symbol) AS stocks,
+               SUM(row_count) AS records,
+               MIN(min_date) AS min_date,
+               MAX(max_date) AS max_date
+        FROM stock_price_stats
+        WHERE row_count > 0
+        GROUP BY GROUPING SETS ((exchange), ())
+    """)
+    
+    SUMMARY_FROM_PRICES_SQL = text("""
+        SELECT exchange,
+               GROUPING(exchange) AS is_total,
+               COUNT(DISTINCT symbol) AS stocks,
+               COUNT(*) AS records,
+               MIN(date) AS min_date,
+               MAX(date) AS max_date
+        FROM stock_prices
+        GROUP BY GROUPING SETS ((exchange), ())
+    """)
+    
+    def _summary_rows(self):
+        """Summary rows from stock_price_stats, or one scan of stock_prices if it is not populated"""
+        rows = self.db.execute(self.SUMMARY_FROM_STATS_SQL).fetchall()
+        if any(row.is_total and row.records for row in rows):
+            return rows
+        
+        if self.db.execute(text("SELECT EXISTS (SELECT 1 FROM stock_prices)")).scalar():
+            logger.warning("stock_price_stats is empty; computing summary from stock_prices "
+                           "(run migrate_stock_prices.py --rebuild-stats)")
+            return self.db.execute(self.SUMMARY_FROM_PRICES_SQL).fetchall()
+        return rows
+    
     def get_analytics_summary(self) -> Dict[str, Any]:
         """Get overall analytics summary"""
         try:
-            # Total unique stocks
-            total_stocks = self.db.query(func.count(func.distinct(StockPrice.symbol))).scalar() or 0
-            
-            # Total records
-            total_records = self.db.query(func.count(StockPrice.id)).scalar() or 0
-            
-            # Latest update date
-            latest_record = self.db.query(StockPrice).order_by(StockPrice.date.desc()).first()
-            
-            # Stocks by exchange
-            exchange_counts = self.db.query(
-                StockPrice.exchange,
-                func.count(func.distinct(StockPrice.symbol)).label('count')
-            ).group_by(StockPrice.exchange).all()
+            try:
+                rows = self._summary_rows()
+            except ProgrammingError:
+                # stock_price_stats not created yet
+                self.db.rollback()
+                rows = self.db.execute(self.SUMMARY_FROM_PRICES_SQL).fetchall()
             
-            exchanges = {exchange: count for exchange, count in exchange_counts}
+            total = next((row for row in rows if row.is_total), None)
+            exchanges = {row.exchange: row.stocks for row in rows if not row.is_total}
             
-            # Date range
-            min_date = self.db.query(func.min(StockPrice.date)).scalar()
-            max_date = self.db.query(func.max(StockPrice.date)).scalar()
+            min_date = total.min_date if total else None
+            max_date = total.max_date if total else None
             
             return {
-                "total_stocks": total_stocks,
-                "total_records": total_records,
-                "latest_update": latest_record.date.isoformat() if latest_record else None,
+                "total_stocks": total.stocks if total else 0,
+                "total_records": int(total.records or 0) if total else 0,
+                "latest_update": max_date.isoformat() if max_date else None,
                 "exchanges": exchanges,
                 "date_range": {
                     "min_date": min_date.isoformat() if min_date else None,
@@ -51,8 +81,81 @@ class StockService:
             logger.error(f"Error getting analytics summary: {str(e)}")
             raise
     
+    # One index-ordered pass: rows come in (symbol, exchange, date DESC) order, the
+    # window gives the first/last close per series and DISTINCT ON keeps one row each
+    TOP_MOVERS_SQL = text("""
+        WITH moves AS (
+            SELECT DISTINCT ON (symbol, exchange)
+                   symbol,
+                   exchange,
+                   LAST_VALUE(close) OVER w AS start_price,
+                   FIRST_VALUE(close) OVER w AS end_price,
+                   FIRST_VALUE(volume) OVER w AS volume
+            FROM stock_prices
+            WHERE date BETWEEN :start_date AND :end_date
+              AND (CAST(:exchange AS VARCHAR) IS NULL OR exchange = :exchange)
+            WINDOW w AS (
+                PARTITION BY symbol, exchange ORDER BY date DESC
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+            )
+            ORDER BY symbol, exchange, date DESC
+        ),
+        ranked AS (
+            SELECT *,
+                   ROW_NUMBER() OVER (ORDER BY change_pct DESC) AS gain_rank,
+                   ROW_NUMBER() OVER (ORDER BY change_pct ASC) AS loss_rank
+            FROM (
+                SELECT *, (end_price - start_price) / start_price * 100 AS change_pct
+                FROM moves
+                WHERE start_price IS NOT NULL AND start_price <> 0 AND end_price IS NOT NULL
+            ) changes
+        )
+        SELECT symbol, exchange, start_price, end_price, volume, change_pct, gain_rank, loss_rank
+        FROM ranked
+        WHERE gain_rank <= :limit OR loss_rank <= :limit
+    """)
+    
+    def get_top_movers(self, days: int = 7, exchange: Optional[str] = None, limit: int = 10,
+                       end_date: Optional[date] = None) -> Dict[str, Any]:
+        """Top-N gainers and losers between end_date - days and end_date, in one query"""
+        end_date = end_date or datetime.now().date()
+        start_date = end_date - timedelta(days=days)
+        
+        rows = self.db.execute(self.TOP_MOVERS_SQL, {
+            "start_date": start_date,
+            "end_date": end_date,
+            "exchange": exchange,
+            "limit": limit
+        }).fetchall()
+        
+        def mover(r):
+            return {
+                "symbol": r.symbol,
+                "exchange": r.exchange,
+                "change": round(float(r.change_pct), 2),
+                "volume": r.volume,
+                "start_price": float(r.start_price),
+                "end_price": float(r.end_price)
+            }
+        
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "exchange": exchange,
+            "gainers": [mover(r) for r in sorted(rows, key=lambda r: r.gain_rank) if r.gain_rank <= limit],
+            "losers": [mover(r) for r in sorted(rows, key=lambda r: r.loss_rank) if r.loss_rank <= limit]
+        }
+    
     def get_top_gainers(self, days: int = 7) -> List[Dict[str, Any]]:
         """Get top gaining stocks in last N days"""
+        try:
+            return self.get_top_movers(days=days, limit=10)["gainers"]
+        except Exception as e:
+            logger.error(f"Error getting top gainers: {str(e)}")
+            raise
+    
+    def _get_top_gainers_legacy(self, days: int = 7) -> List[Dict[str, Any]]:
+        """Original min/max-date self-join implementation, kept for benchmarking"""
         try:
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days)
@@ -114,7 +217,7 @@ class StockService:
             
         except Exception as e:
             logger.error(f"Error getting top gainers: {str(e)}")
-            return []
+            raise
     
     def get_high_volume_stocks(self, days: int = 7) -> List[Dict[str, Any]]:
         """Get stocks with highest average volume in last N days"""
@@ -134,17 +237,15 @@ class StockService:
                 StockPrice.exchange
             ).order_by(desc('avg_volume')).limit(20).all()
             
-            # Get company names
+            # Get company names (in-process metadata cache, no per-row query)
             result = []
             for stock in volume_stocks:
-                metadata = self.db.query(StockMetadata).filter(
-                    StockMetadata.symbol == stock.symbol
-                ).first()
+                metadata = metadata_cache.get(self.db, stock.symbol, stock.exchange)
                 
                 result.append({
                     "symbol": stock.symbol,
                     "exchange": stock.exchange,
-                    "company_name": metadata.company_name if metadata else "Unknown",
+                    "company_name": metadata["company_name"] if metadata else "Unknown",
                     "avg_volume": int(stock.avg_volume) if stock.avg_volume else 0
                 })
             
@@ -152,4 +253,56 @@ class StockService:
             
         except Exception as e:
             logger.error(f"Error getting high volume stocks: {str(e)}")
-            return []
\ No newline at end of file
+            raise
+    
+    # Sort keys for the Spark-published rollups; each has a matching index (or is cheap on the PK)
+    AGGREGATION_SORTS = {
+        "avg_volume": "avg_volume DESC NULLS LAST",
+        "volatility": "price_range_ratio DESC NULLS LAST",
+        "avg_daily_return": "avg_daily_return DESC NULLS LAST",
+        "symbol": "symbol, exchange",
+    }
+    
+    def get_precomputed_aggregations(self, exchange: Optional[str] = None, sort: str = "avg_volume",
+                                     limit: int = 20) -> List[Dict[str, Any]]:
+        """Per-symbol rollups from stock_aggregations (published by the Spark processing job)"""
+        order_by = self.AGGREGATION_SORTS[sort]
+        rows = self.db.execute(text(f"""
+            SELECT *
+            FROM stock_aggregations
+            WHERE CAST(:exchange AS VARCHAR) IS NULL OR exchange = :exchange
+            ORDER BY {order_by}
+            LIMIT :limit
+        """), {"exchange": exchange, "limit": limit}).fetchall()
+        
+        return [self._snapshot_row(row) for row in rows]
+    
+    def get_indicator_snapshot(self, signal: Optional[str] = None, exchange: Optional[str] = None,
+                               limit: int = 50) -> List[Dict[str, Any]]:
+        """Latest indicators per symbol from stock_indicator_snapshot (published by the Spark analysis job)"""
+        rows = self.db.execute(text("""
+            SELECT *
+            FROM stock_indicator_snapshot
+            WHERE (CAST(:signal AS VARCHAR) IS NULL OR combined_signal = :signal)
+              AND (CAST(:exchange AS VARCHAR) IS NULL OR exchange = :exchange)
+            ORDER BY symbol, exchange
+            LIMIT :limit
+        """), {"signal": signal, "exchange": exchange, "limit": limit}).fetchall()
+        
+        return [self._snapshot_row(row) for row in rows]
+    
+    def get_symbol_indicators(self, symbol: str) -> List[Dict[str, Any]]:
+        """Latest indicators for one symbol (one row per exchange it trades on)"""
+        rows = self.db.execute(
+            text("SELECT * FROM stock_indicator_snapshot WHERE symbol = :symbol ORDER BY exchange"),
+            {"symbol": symbol}
+        ).fetchall()
+        
+        return [self._snapshot_row(row) for row in rows]
+    
+    @staticmethod
+    def _snapshot_row(row) -> Dict[str, Any]:
+        return {
+            key: value.isoformat() if isinstance(value, (date, datetime)) else value
+            for key, value in row._mapping.items()
+        }
@@ -0,0 +1,52 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Counters read by the backend API caches (backend/services/cache_service.py)
+HDFS_LISTING_VERSION_KEY = "hdfs:listing:version"
+ANALYTICS_VERSION_KEY = "analytics:version"
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis():
+    global _redis_client
+    with _redis_lock:
+        if _redis_client is None:
+            try:
+                import redis
+                from config import settings
+                _redis_client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=2,
+                    socket_timeout=2
+                )
+            except Exception as e:
+                logger.warning(f"Redis client unavailable: {e}")
+                return None
+        return _redis_client
+
+
+def bump_version(key: str) -> bool:
+    """Increment an invalidation counter; failures are logged, never raised"""
+    client = _get_redis()
+    if client is None:
+        return False
+
+    try:
+        client.incr(key)
+        logger.debug(f"Bumped {key}")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not bump {key}: {e}")
+        return False
+
+
+def invalidate_hdfs_listings() -> bool:
+    return bump_version(HDFS_LISTING_VERSION_KEY)
+
+
+def invalidate_analytics_cache() -> bool:
+    return bump_version(ANALYTICS_VERSION_KEY)
@@ -808,12 +808,17 @@ import os
 import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 import sqlalchemy
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
+from requests.adapters import HTTPAdapter
+
+from watermark_store import WatermarkStore
 
 # Configure logging
 logging.basicConfig(
@@ -822,8 +827,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Column layout of the per-exchange Parquet landing files (raw/<exchange>/<YYYYMMDD>/<exchange>.parquet)
+RAW_PARQUET_COLUMNS = [
+    'symbol', 'exchange', 'interval', 'date',
+    'open', 'high', 'low', 'close', 'adjusted_close', 'volume',
+    'download_timestamp'
+]
+# Low-cardinality columns written with Parquet dictionary encoding
+RAW_PARQUET_DICTIONARY_COLUMNS = ['symbol', 'exchange', 'interval']
+
+def raw_parquet_schema():
+    """Explicit Arrow schema for raw landing files (pyarrow is imported lazily)"""
+    import pyarrow as pa
+    
+    return pa.schema([
+        pa.field('symbol', pa.string(), nullable=False),
+        pa.field('exchange', pa.string(), nullable=False),
+        pa.field('interval', pa.string()),
+        pa.field('date', pa.date32(), nullable=False),
+        pa.field('open', pa.float64()),
+        pa.field('high', pa.float64()),
+        pa.field('low', pa.float64()),
+        pa.field('close', pa.float64()),
+        pa.field('adjusted_close', pa.float64()),
+        pa.field('volume', pa.int64()),
+        pa.field('download_timestamp', pa.timestamp('us'))
+    ])
+
+class TokenBucketRateLimiter:
+    """Thread-safe token bucket shared by all collector workers"""
+    
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate  # tokens added per second
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait_time = (1 - self.tokens) / self.rate
+            
+            time.sleep(wait_time)
+
 class EODDataCollector:
-    def __init__(self, api_key: str, db_url: str = None):
+    def __init__(self, api_key: str, db_url: str = None,
+                 requests_per_second: float = 1.0, burst: int = 5,
+                 max_connections: int = 10):
         self.api_key = api_key
         self.base_url = "https://api.eoddata.com"
         self.session = requests.Session()
@@ -831,6 +891,10 @@ class EODDataCollector:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Accept": "application/json"
         })
+        # Size the connection pool for concurrent workers sharing this session
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         
         # Initialize database connection if provided
         if db_url:
@@ -840,17 +904,13 @@ class EODDataCollector:
             self.engine = None
             self.SessionLocal = None
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.request_delay = 2.0  # 2 seconds between requests
+        # Rate limiting (shared across all worker threads)
+        self.rate_limiter = TokenBucketRateLimiter(rate=requests_per_second, capacity=burst)
         self.max_retries = 3
     
     def _rate_limit(self):
-        """Simple rate limiting"""
-        time_since_last = time.time() - self.last_request_time
-        if time_since_last < self.request_delay:
-            time.sleep(self.request_delay - time_since_last)
-        self.last_request_time = time.time()
+        """Wait for a token from the shared rate limiter"""
+        self.rate_limiter.acquire()
     
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make authenticated API request"""
@@ -862,9 +922,9 @@ class EODDataCollector:
         # Note: API key parameter is 'apiKey' (lowercase 'k')
         params['apiKey'] = self.api_key
         
-        self._rate_limit()
-        
         for attempt in range(self.max_retries):
+            self._rate_limit()
+            
             try:
                 logger.debug(f"Requesting: {url}")
                 
@@ -987,7 +1047,8 @@ class EODDataCollector:
         from_date: str = None,
         to_date: str = None,
         interval: str = "d",
-        limit_days: int = 30
+        limit_days: int = 30,
+        fallback_today: bool = True
     ) -> pd.DataFrame:
         """Get historical OHLCV data"""
         logger.info(f"Fetching {interval} data for {symbol}.{exchange}")
@@ -1080,6 +1141,8 @@ class EODDataCollector:
         
         else:
             logger.warning(f"No historical data returned for {symbol}.{exchange}")
+            if not fallback_today:
+                return pd.DataFrame()
             # Try to get today's data as fallback
             return self._get_today_data(symbol, exchange)
     
@@ -1118,16 +1181,119 @@ class EODDataCollector:
         
         return pd.DataFrame()
     
-    def save_to_database(self, df: pd.DataFrame, table_name: str = "stock_prices") -> bool:
-        """Save data to PostgreSQL database"""
+    def save_to_database(self, df: pd.DataFrame, table_name: str = "stock_prices",
+                         bulk: bool = True) -> bool:
+        """Save data to PostgreSQL database
+
+        By default the whole DataFrame is written with one batched upsert
+        (see bulk_upsert_to_database). Pass bulk=False to fall back to the
+        original row-by-row SELECT-then-INSERT loop.
+
+        A successful upsert returns True even when every row was already up
+        to date; the inserted/updated/unchanged counts are logged by
+        bulk_upsert_to_database.
+        """
         if df.empty or not self.engine:
             logger.warning("No data or no database connection")
             return False
         
+        if bulk:
+            return self.bulk_upsert_to_database(df, table_name) is not None
+        
+        return self._save_rows_individually(df, table_name) > 0
+    
+    def _prepare_db_rows(self, df: pd.DataFrame) -> List[tuple]:
+        """Convert a price DataFrame into (symbol, date, exchange, o, h, l, c, v) tuples"""
+        rows_df = df.copy()
+        rows_df['date'] = pd.to_datetime(rows_df['date']).dt.date
+        
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            if col not in rows_df.columns:
+                rows_df[col] = None
+        
+        # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+        rows_df = rows_df.drop_duplicates(subset=['symbol', 'date', 'exchange'], keep='last')
+        
+        rows = []
+        for record in rows_df[['symbol', 'date', 'exchange', 'open', 'high', 'low', 'close', 'volume']].itertuples(index=False):
+            rows.append((
+                str(record.symbol),
+                record.date,
+                str(record.exchange),
+                float(record.open) if pd.notna(record.open) else None,
+                float(record.high) if pd.notna(record.high) else None,
+                float(record.low) if pd.notna(record.low) else None,
+                float(record.close) if pd.notna(record.close) else None,
+                int(record.volume) if pd.notna(record.volume) else None
+            ))
+        return rows
+    
+    def bulk_upsert_to_database(self, df: pd.DataFrame, table_name: str = "stock_prices",
+                                page_size: int = 1000) -> Optional[Dict[str, int]]:
+        """Upsert a whole DataFrame with batched INSERT ... ON CONFLICT DO UPDATE
+        
+        Returns a dict with 'inserted', 'updated' and 'unchanged' counts, or
+        None if the write failed. Rows whose prices did not change are left
+        untouched so they are not rewritten on every cycle.
+        """
+        if df.empty or not self.engine:
+            logger.warning("No data or no database connection")
+            return None
+        
+        from psycopg2.extras import execute_values
+        
+        rows = self._prepare_db_rows(df)
+        if not rows:
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        
+        upsert_sql = f"""
+            INSERT INTO {table_name} (symbol, date, exchange, open, high, low, close, volume)
+            VALUES %s
+            ON CONFLICT (symbol, date, exchange) DO UPDATE SET
+                open = EXCLUDED.open,
+                high = EXCLUDED.high,
+                low = EXCLUDED.low,
+                close = EXCLUDED.close,
+                volume = EXCLUDED.volume
+            WHERE ({table_name}.open, {table_name}.high, {table_name}.low,
+                   {table_name}.close, {table_name}.volume)
+                IS DISTINCT FROM
+                  (EXCLUDED.open, EXCLUDED.high, EXCLUDED.low,
+                   EXCLUDED.close, EXCLUDED.volume)
+            RETURNING (xmax = 0) AS inserted
+        """
+        
+        raw_conn = self.engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor()
+            returned = execute_values(cursor, upsert_sql, rows, page_size=page_size, fetch=True)
+            raw_conn.commit()
+            cursor.close()
+        except Exception as e:
+            raw_conn.rollback()
+            logger.error(f"Bulk upsert failed: {str(e)}")
+            return None
+        finally:
+            raw_conn.close()
+        
+        inserted = sum(1 for row in returned if row[0])
+        updated = len(returned) - inserted
+        counts = {
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': len(rows) - inserted - updated
+        }
+        
+        logger.info(f"Upserted {len(rows)} records to database: "
+                    f"{counts['inserted']} inserted, {counts['updated']} updated, "
+                    f"{counts['unchanged']} unchanged")
+        return counts
+    
+    def _save_rows_individually(self, df: pd.DataFrame, table_name: str = "stock_prices") -> int:
+        """Legacy per-row SELECT-then-INSERT path, kept for benchmarking"""
         try:
             db_session = self.SessionLocal()
             saved_count = 0
-            
             for _, row in df.iterrows():
                 try:
                     # Check if record exists
@@ -1181,22 +1347,34 @@ class EODDataCollector:
             db_session.close()
             
             logger.info(f"Saved {saved_count} records to database")
-            return saved_count > 0
+            return saved_count
             
         except SQLAlchemyError as e:
             logger.error(f"Database error: {str(e)}")
-            return False
+            return 0
         except Exception as e:
             logger.error(f"Error saving to database: {str(e)}")
-            return False
+            return 0
 
 class DataManager:
-    def __init__(self, collector, base_dir: str = "/data"):
+    def __init__(self, collector, base_dir: str = "/data", max_workers: int = 4,
+                 incremental: bool = True, raw_format: str = "csv"):
         self.collector = collector
         self.base_dir = base_dir
+        self.max_workers = max(1, max_workers)
+        self.incremental = incremental
+        
+        if raw_format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported raw format: {raw_format}")
+        self.raw_format = raw_format
         
         # Create directories
         self._create_directories()
+        
+        # Last collected bar per (exchange, symbol) for delta collection
+        self.watermarks = WatermarkStore(os.path.join(self.base_dir, "state", "watermarks.json"))
+        if self.incremental and self.watermarks.is_empty() and getattr(self.collector, 'engine', None):
+            self.watermarks.seed_from_database(self.collector.engine)
     
     def _create_directories(self):
         """Create necessary directories"""
@@ -1205,14 +1383,20 @@ class DataManager:
             os.path.join(self.base_dir, "raw"),
             os.path.join(self.base_dir, "processed"),
             os.path.join(self.base_dir, "logs"),
-            os.path.join(self.base_dir, "reports")
+            os.path.join(self.base_dir, "reports"),
+            os.path.join(self.base_dir, "state")
         ]
         
         for directory in directories:
             os.makedirs(directory, exist_ok=True)
     
-    def save_data_csv(self, df: pd.DataFrame, symbol: str, exchange: str) -> Optional[str]:
-        """Save data to CSV file"""
+    def save_data_csv(self, df: pd.DataFrame, symbol: str, exchange: str,
+                      append: bool = False) -> Optional[str]:
+        """Save data to CSV file
+
+        With append=True, bars already written to today's file are kept and
+        the new bars are merged in (one row per date).
+        """
         if df.empty:
             return None
         
@@ -1231,6 +1415,11 @@ class DataManager:
             # CSV file path
             csv_file = os.path.join(dir_path, f"{symbol}.csv")
             
+            if append and os.path.exists(csv_file):
+                existing = pd.read_csv(csv_file, parse_dates=['date'])
+                df = pd.concat([existing, df], ignore_index=True)
+                df = df.drop_duplicates(subset=['date'], keep='last').sort_values('date')
+            
             # Save to CSV
             df.to_csv(csv_file, index=False)
             
@@ -1244,6 +1433,68 @@ class DataManager:
             logger.error(f"✗ Failed to save {symbol}: {str(e)}")
             return None
     
+    def save_exchange_parquet(self, frames: List[pd.DataFrame], exchange: str,
+                              append: bool = False) -> Optional[str]:
+        """Save all symbols of one exchange to a single Parquet file for today
+
+        Columns are cast to RAW_PARQUET_COLUMNS with an explicit schema, so
+        readers do not need schema inference.
+        """
+        if not frames:
+            return None
+        
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            date_str = datetime.now().strftime('%Y%m%d')
+            dir_path = os.path.join(self.base_dir, "raw", exchange, date_str)
+            os.makedirs(dir_path, exist_ok=True)
+            
+            parquet_file = os.path.join(dir_path, f"{exchange}.parquet")
+            
+            df = pd.concat(frames, ignore_index=True)
+            if append and os.path.exists(parquet_file):
+                existing = pd.read_parquet(parquet_file)
+                df = pd.concat([existing, df], ignore_index=True)
+            
+            for col in RAW_PARQUET_COLUMNS:
+                if col not in df.columns:
+                    df[col] = None
+            
+            df = df[RAW_PARQUET_COLUMNS].copy()
+            df['date'] = pd.to_datetime(df['date']).dt.date
+            df['download_timestamp'] = pd.to_datetime(df['download_timestamp'])
+            for col in ['open', 'high', 'low', 'close', 'adjusted_close']:
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+            df['volume'] = pd.to_numeric(df['volume'], errors='coerce').round().astype('Int64')
+            
+            df = df.drop_duplicates(subset=['symbol', 'date'], keep='last') \
+                .sort_values(['symbol', 'date']) \
+                .reset_index(drop=True)
+            
+            table = pa.Table.from_pandas(df, schema=raw_parquet_schema(), preserve_index=False)
+            
+            # Write next to the target and swap in, so readers never see a partial file
+            tmp_file = f"{parquet_file}.tmp"
+            pq.write_table(
+                table,
+                tmp_file,
+                compression='snappy',
+                use_dictionary=RAW_PARQUET_DICTIONARY_COLUMNS
+            )
+            os.replace(tmp_file, parquet_file)
+            
+            file_size = os.path.getsize(parquet_file)
+            logger.info(f"✓ Saved {df['symbol'].nunique()} symbols ({len(df)} rows) of {exchange} "
+                        f"to {parquet_file} ({file_size:,} bytes)")
+            
+            return parquet_file
+            
+        except Exception as e:
+            logger.error(f"✗ Failed to save Parquet for {exchange}: {str(e)}")
+            return None
+    
     def upload_exchange_to_hdfs(self, exchange_code: str):
         """Upload exchange data to HDFS immediately after collection"""
         try:
@@ -1263,6 +1514,85 @@ class DataManager:
             logger.error(f"❌ Failed to upload {exchange_code} to HDFS: {e}")
             return 0
     
+    def _collect_symbol(self, symbol_code: str, exchange_code: str,
+                        days_of_data: int) -> Dict[str, Any]:
+        """Fetch, save and store one symbol; safe to run from worker threads"""
+        outcome = {
+            'symbol': symbol_code,
+            'status': 'failed',
+            'file': None,
+            'frame': None,
+            'data_points': 0,
+            'db_success': False
+        }
+        
+        try:
+            watermark = self.watermarks.get(exchange_code, symbol_code) if self.incremental else None
+            
+            if watermark is not None and self.watermarks.is_current(exchange_code, symbol_code):
+                logger.info(f"  ↷ {symbol_code}: up to date (last bar {watermark})")
+                outcome['status'] = 'skipped'
+                return outcome
+            
+            from_date = None
+            if watermark is not None:
+                # Only request bars after the watermark, bounded by the usual window
+                window_start = (datetime.now() - timedelta(days=days_of_data)).date()
+                from_date = max(watermark + timedelta(days=1), window_start).strftime('%Y-%m-%d')
+            
+            # Get historical data
+            df = self.collector.get_historical_data(
+                symbol=symbol_code,
+                exchange=exchange_code,
+                from_date=from_date,
+                limit_days=days_of_data,
+                fallback_today=watermark is None
+            )
+            
+            if not df.empty and watermark is not None:
+                df = df[df['date'].dt.date > watermark]
+                if df.empty:
+                    logger.info(f"  ↷ {symbol_code}: no new bars since {watermark}")
+                    outcome['status'] = 'skipped'
+                    return outcome
+            
+            if not df.empty:
+                if self.raw_format == "parquet":
+                    # Written once per exchange by save_exchange_parquet
+                    saved_file = None
+                else:
+                    saved_file = self.save_data_csv(df, symbol_code, exchange_code,
+                                                    append=self.incremental)
+                
+                # Save to database if connected
+                db_success = False
+                if hasattr(self.collector, 'engine') and self.collector.engine:
+                    db_success = self.collector.save_to_database(df)
+                
+                if saved_file or self.raw_format == "parquet":
+                    outcome.update({
+                        'status': 'success',
+                        'file': saved_file,
+                        'frame': df if self.raw_format == "parquet" else None,
+                        'data_points': len(df),
+                        'db_success': db_success
+                    })
+                    if saved_file:
+                        self.watermarks.update(exchange_code, symbol_code, df['date'].max())
+                    
+                    logger.info(f"  ✓ {symbol_code}: {len(df)} records")
+                    if len(df) > 0:
+                        logger.info(f"    Date range: {df['date'].min().date()} to {df['date'].max().date()}")
+                else:
+                    logger.error(f"  ✗ {symbol_code}: Failed to save CSV")
+            else:
+                logger.warning(f"  ✗ {symbol_code}: No data retrieved")
+                
+        except Exception as e:
+            logger.error(f"Error processing {symbol_code}: {str(e)}")
+        
+        return outcome
+    
     def collect_and_upload_exchange(self, exchange_code: str, num_symbols: int = 20, 
                                    days_of_data: int = 30) -> Dict[str, Any]:
         """Collect data for exchange and upload to HDFS immediately"""
@@ -1275,6 +1605,7 @@ class DataManager:
             'exchange': exchange_code,
             'successful': [],
             'failed': [],
+            'skipped': [],
             'files': [],
             'database_success': 0,
             'database_failed': 0,
@@ -1291,58 +1622,58 @@ class DataManager:
             results['end_time'] = datetime.now().isoformat()
             return results
         
-        logger.info(f"Processing {len(symbols)} symbols...")
+        logger.info(f"Processing {len(symbols)} symbols with {self.max_workers} workers...")
         
-        for i, symbol_data in enumerate(symbols):
+        def collect(indexed_symbol):
+            i, symbol_data = indexed_symbol
             symbol_code = symbol_data.get('code', '')
             symbol_name = symbol_data.get('name', 'N/A')
-            
             logger.info(f"\n[{i+1}/{len(symbols)}] {symbol_code}: {symbol_name}")
-            
-            try:
-                # Get historical data
-                df = self.collector.get_historical_data(
-                    symbol=symbol_code,
-                    exchange=exchange_code,
-                    limit_days=days_of_data
-                )
+            return self._collect_symbol(symbol_code, exchange_code, days_of_data)
+        
+        # Requests are paced by the collector's shared token bucket, so workers
+        # only overlap network/database latency instead of sleeping between symbols
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix=f"collect-{exchange_code}") as executor:
+            outcomes = list(executor.map(collect, enumerate(symbols)))
+        
+        if self.raw_format == "parquet":
+            collected = [o for o in outcomes if o['status'] == 'success']
+            parquet_file = self.save_exchange_parquet(
+                [o['frame'] for o in collected], exchange_code, append=self.incremental
+            )
+            for outcome in collected:
+                if parquet_file:
+                    outcome['file'] = parquet_file
+                    self.watermarks.update(exchange_code, outcome['symbol'], outcome['frame']['date'].max())
+                else:
+                    outcome['status'] = 'failed'
+                outcome['frame'] = None
+        
+        # Merge in symbol order so the results dict matches the sequential run
+        for outcome in outcomes:
+            if outcome['status'] == 'success':
+                results['successful'].append(outcome['symbol'])
+                if outcome['file'] not in results['files']:
+                    results['files'].append(outcome['file'])
+                results['total_data_points'] += outcome['data_points']
                 
-                if not df.empty:
-                    # Save to CSV
-                    csv_file = self.save_data_csv(df, symbol_code, exchange_code)
-                    
-                    # Save to database if connected
-                    db_success = False
-                    if hasattr(self.collector, 'engine') and self.collector.engine:
-                        db_success = self.collector.save_to_database(df)
-                    
-                    if csv_file:
-                        results['successful'].append(symbol_code)
-                        results['files'].append(csv_file)
-                        results['total_data_points'] += len(df)
-                        
-                        if db_success:
-                            results['database_success'] += 1
-                        else:
-                            results['database_failed'] += 1
-                        
-                        logger.info(f"  ✓ {len(df)} records")
-                        if len(df) > 0:
-                            logger.info(f"    Date range: {df['date'].min().date()} to {df['date'].max().date()}")
-                    else:
-                        results['failed'].append(symbol_code)
-                        logger.error(f"  ✗ Failed to save CSV")
+                if outcome['db_success']:
+                    results['database_success'] += 1
                 else:
-                    results['failed'].append(symbol_code)
-                    logger.warning(f"  ✗ No data retrieved")
-                    
-            except Exception as e:
-                logger.error(f"Error processing {symbol_code}: {str(e)}")
-                results['failed'].append(symbol_code)
-            
-            # Rate limiting between symbols
-            if i < len(symbols) - 1:
-                time.sleep(2)  # 2 seconds between symbols
+                    results['database_failed'] += 1
+            elif outcome['status'] == 'skipped':
+                results['skipped'].append(outcome['symbol'])
+            else:
+                results['failed'].append(outcome['symbol'])
+        
+        if self.incremental:
+            self.watermarks.save()
+        
+        # New or changed prices in Postgres: drop cached analytics responses
+        if results['database_success']:
+            from cache_invalidation import invalidate_analytics_cache
+            invalidate_analytics_cache()
         
         # UPLOAD EXCHANGE DATA TO HDFS IMMEDIATELY
         if results['successful']:
@@ -1361,6 +1692,7 @@ class DataManager:
         logger.info(f"{'='*40}")
         logger.info(f"Successful symbols: {len(results['successful'])}")
         logger.info(f"Failed symbols: {len(results['failed'])}")
+        logger.info(f"Skipped (up to date): {len(results['skipped'])}")
         logger.info(f"Data points: {results['total_data_points']}")
         logger.info(f"Files uploaded to HDFS: {results['hdfs_upload_count']}")
         logger.info(f"Database success: {results['database_success']}")
@@ -1375,6 +1707,7 @@ class DataManager:
         all_results = {
             'total_successful': 0,
             'total_failed': 0,
+            'total_skipped': 0,
             'total_data_points': 0,
             'total_hdfs_uploads': 0,
             'exchanges': {},
@@ -1418,6 +1751,7 @@ class DataManager:
                 all_results['exchanges'][exchange_code] = results
                 all_results['total_successful'] += len(results['successful'])
                 all_results['total_failed'] += len(results['failed'])
+                all_results['total_skipped'] += len(results['skipped'])
                 all_results['total_data_points'] += results['total_data_points']
                 all_results['total_hdfs_uploads'] += results['hdfs_upload_count']
                 
@@ -1435,6 +1769,7 @@ class DataManager:
                     'exchange': exchange_code,
                     'successful': [],
                     'failed': [],
+                    'skipped': [],
                     'files': [],
                     'database_success': 0,
                     'database_failed': 0,
@@ -1464,6 +1799,11 @@ def main():
     data_dir = os.getenv('LOCAL_DATA_DIR', '/data')
     symbols_per_exchange = int(os.getenv('SYMBOLS_PER_EXCHANGE', '20'))
     days_of_data = int(os.getenv('DAYS_OF_DATA', '30'))
+    max_workers = int(os.getenv('COLLECTION_WORKERS', '4'))
+    requests_per_second = float(os.getenv('API_REQUESTS_PER_SECOND', '1.0'))
+    api_burst = int(os.getenv('API_BURST', '5'))
+    incremental = os.getenv('INCREMENTAL_COLLECTION', 'true').lower() in ('1', 'true', 'yes')
+    raw_format = os.getenv('RAW_FORMAT', 'csv').lower()
     max_exchanges = os.getenv('MAX_EXCHANGES')
     if max_exchanges:
         max_exchanges = int(max_exchanges)
@@ -1472,6 +1812,9 @@ def main():
     logger.info("EODData COLLECTOR - STARTING (ALL EXCHANGES)")
     logger.info(f"Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info(f"Config: {symbols_per_exchange} symbols/exchange, {days_of_data} days of data")
+    logger.info(f"Concurrency: {max_workers} workers, {requests_per_second} req/s (burst {api_burst})")
+    logger.info(f"Mode: {'incremental (watermarks)' if incremental else f'full {days_of_data}-day refresh'}")
+    logger.info(f"Raw landing format: {raw_format}")
     logger.info("NOTE: Each exchange will be uploaded to HDFS immediately after collection")
     if max_exchanges:
         logger.info(f"Max exchanges: {max_exchanges}")
@@ -1486,8 +1829,15 @@ def main():
     logger.info(f"Using API key: {api_key[:8]}...")
     
     # Initialize collector
-    collector = EODDataCollector(api_key=api_key, db_url=db_url)
-    manager = DataManager(collector, base_dir=data_dir)
+    collector = EODDataCollector(
+        api_key=api_key,
+        db_url=db_url,
+        requests_per_second=requests_per_second,
+        burst=api_burst,
+        max_connections=max_workers
+    )
+    manager = DataManager(collector, base_dir=data_dir, max_workers=max_workers,
+                          incremental=incremental, raw_format=raw_format)
     
     # Test API connection first
     logger.info("Testing API connection...")
@@ -1526,6 +1876,7 @@ def print_summary(all_results: Dict[str, Any]):
     logger.info(f"Total exchanges processed: {total_exchanges}")
     logger.info(f"Total successful symbols: {total_successful}")
     logger.info(f"Total failed symbols: {total_failed}")
+    logger.info(f"Total skipped (up to date): {all_results.get('total_skipped', 0)}")
     logger.info(f"Total data points: {all_results['total_data_points']}")
     logger.info(f"Total HDFS uploads: {all_results['total_hdfs_uploads']}")
     
@@ -1590,6 +1941,7 @@ def save_report(all_results: Dict[str, Any], base_dir: str = "/data"):
                 'exchange': exchange_code,
                 'successful_symbols': len(results['successful']),
                 'failed_symbols': len(results['failed']),
+                'skipped_symbols': len(results.get('skipped', [])),
                 'data_points': results['total_data_points'],
                 'hdfs_upload_count': results['hdfs_upload_count'],
                 'files': len(results['files']),
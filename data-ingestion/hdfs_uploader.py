@@ -1,8 +1,17 @@
 import os
+import io
+import json
+import math
 import logging
 import time
 import sys
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_invalidation import invalidate_hdfs_listings
+from upload_manifest import UploadManifest, csv_has_data
 
 # Configure logging
 logging.basicConfig(
@@ -11,8 +20,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Raw landing files: per-symbol CSV or per-exchange Parquet (RAW_FORMAT)
+RAW_FILE_EXTENSIONS = ('.csv', '.parquet')
+
+# Small-file compaction of raw/daily partitions
+MANIFEST_PREFIX = "_MANIFEST-"
+DEFAULT_COMPACT_TARGET_BYTES = 128 * 1024 * 1024  # one HDFS block
+
+
+def is_compacted_source(sources: Dict, name: str, length: int, modification_time: int) -> bool:
+    """True if name is the exact file a manifest's sources entry recorded
+
+    A file re-uploaded under the same name after compaction has a new
+    length/modificationTime and must be merged again, not deleted.
+    """
+    entry = sources.get(name)
+    return bool(entry) and entry.get('length') == length and entry.get('modificationTime') == modification_time
+
 class HDFSUploader:
-    def __init__(self, max_retries=5, retry_delay=10):
+    def __init__(self, max_retries=5, retry_delay=10, max_workers=None):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.client = None
@@ -20,6 +46,24 @@ class HDFSUploader:
         from config import settings
         self.settings = settings
         self.base_path = settings.HDFS_BASE_PATH
+        self.max_workers = max(1, max_workers or settings.HDFS_UPLOAD_WORKERS)
+        
+        # One pooled HTTP session shared by every WebHDFS call and upload worker
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # HDFS directories known to exist (created or seen during this process)
+        self._known_dirs = set()
+        self._dirs_lock = threading.Lock()
+        
+        # Files already uploaded with identical content are skipped
+        self.manifest = UploadManifest(
+            os.path.join(settings.LOCAL_DATA_DIR, "state", "hdfs_uploads.json")
+        )
         
         # Fixed WebHDFS URL for Hadoop 3.x
         # Hadoop 3.x WebHDFS runs on port 9870 (Web UI port)
@@ -39,7 +83,8 @@ class HDFSUploader:
                 self.client = InsecureClient(
                     self.webhdfs_url,
                     user=self.settings.HDFS_USER,
-                    timeout=60
+                    timeout=60,
+                    session=self.session
                 )
                 
                 # Test connection by listing root
@@ -85,6 +130,22 @@ class HDFSUploader:
                     logger.error("3. Can you access http://namenode:9870 from data-ingestion container?")
                     return False
     
+    def ensure_directory(self, hdfs_dir: str) -> bool:
+        """Create an HDFS directory once per process (MKDIRS is idempotent)"""
+        with self._dirs_lock:
+            if hdfs_dir in self._known_dirs:
+                return True
+        
+        try:
+            self.client.makedirs(hdfs_dir)
+        except Exception as e:
+            logger.error(f"Failed to create directory {hdfs_dir}: {str(e)}")
+            return False
+        
+        with self._dirs_lock:
+            self._known_dirs.add(hdfs_dir)
+        return True
+    
     def create_hdfs_structure(self):
         """Create HDFS directory structure"""
         if not self.client:
@@ -99,21 +160,12 @@ class HDFSUploader:
         ]
         
         for directory in directories:
-            try:
-                if not self.client.status(directory, strict=False):
-                    # Tạo thư mục với quyền 755
-                    self.client.makedirs(directory, permission=755)
-                    logger.info(f"Created HDFS directory: {directory}")
-                else:
-                    logger.debug(f"HDFS directory already exists: {directory}")
-            except Exception as e:
-                logger.error(f"Failed to create directory {directory}: {str(e)}")
-                # Thử tạo với superuser permission nếu cần
+            if not self.ensure_directory(directory):
                 return False
         
         return True
     
-    def upload_file(self, local_path: str, hdfs_path: str) -> bool:
+    def upload_file(self, local_path: str, hdfs_path: str, verify: bool = False) -> bool:
         """Upload a file to HDFS"""
         if not self.client:
             logger.error("Not connected to HDFS")
@@ -126,31 +178,128 @@ class HDFSUploader:
                 return False
             
             file_size = os.path.getsize(local_path)
-            logger.info(f"Uploading {local_path} ({file_size:,} bytes) to {hdfs_path}")
+            logger.debug(f"Uploading {local_path} ({file_size:,} bytes) to {hdfs_path}")
             
-            # Ensure parent directory exists in HDFS
-            hdfs_dir = os.path.dirname(hdfs_path)
-            if not self.client.status(hdfs_dir, strict=False):
-                logger.info(f"Creating HDFS directory: {hdfs_dir}")
-                self.client.makedirs(hdfs_dir)
+            # Ensure parent directory exists in HDFS (cached after the first call)
+            if not self.ensure_directory(os.path.dirname(hdfs_path)):
+                return False
             
-            # Upload file
+            # Upload file (raises on failure, so no extra status round trip is needed)
             self.client.upload(hdfs_path, local_path, overwrite=True)
             
-            # Verify upload
-            status = self.client.status(hdfs_path)
-            logger.info(f"✓ Successfully uploaded to HDFS. File size: {status['length']:,} bytes")
+            if verify:
+                status = self.client.status(hdfs_path)
+                logger.info(f"✓ Successfully uploaded to HDFS. File size: {status['length']:,} bytes")
             return True
             
         except Exception as e:
-            logger.error(f"✗ Upload failed: {str(e)}")
+            logger.error(f"✗ Upload failed for {local_path}: {str(e)}")
+            return False
+    
+    def _upload_and_record(self, local_path: str, hdfs_path: str) -> bool:
+        if not self.upload_file(local_path, hdfs_path):
+            self.manifest.forget(local_path)
             return False
+        self.manifest.record(local_path, hdfs_path)
+        return True
+    
+    def upload_files(self, files: List[Tuple[str, str]], force: bool = False) -> Dict[str, Any]:
+        """Upload (local_path, hdfs_path) pairs with a bounded worker pool
+        
+        Files whose size/mtime (or content hash) match the upload manifest
+        are skipped unless force=True. Each target directory is created once
+        up front, then files are uploaded in parallel over the shared session.
+        """
+        stats = {'uploaded': 0, 'skipped': 0, 'failed': 0, 'bytes': 0, 'seconds': 0.0}
+        if not files:
+            return stats
+        
+        start_time = time.perf_counter()
+        
+        if not force:
+            pending = [(l, h) for l, h in files if not self.manifest.is_unchanged(l, h)]
+            stats['skipped'] = len(files) - len(pending)
+            files = pending
+        
+        if not files:
+            stats['seconds'] = time.perf_counter() - start_time
+            logger.info(f"📊 All {stats['skipped']} files unchanged since last upload "
+                        f"({stats['seconds']:.2f}s)")
+            self.manifest.save()
+            return stats
+        
+        for hdfs_dir in sorted({os.path.dirname(hdfs_path) for _, hdfs_path in files}):
+            self.ensure_directory(hdfs_dir)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hdfs-upload") as executor:
+            futures = {
+                executor.submit(self._upload_and_record, local_path, hdfs_path): local_path
+                for local_path, hdfs_path in files
+            }
+            for future in as_completed(futures):
+                local_path = futures[future]
+                if future.result():
+                    stats['uploaded'] += 1
+                    stats['bytes'] += os.path.getsize(local_path)
+                else:
+                    stats['failed'] += 1
+        
+        self.manifest.save()
+        if stats['uploaded']:
+            invalidate_hdfs_listings()
+        
+        stats['seconds'] = time.perf_counter() - start_time
+        elapsed = max(stats['seconds'], 1e-9)
+        logger.info(f"📊 Uploaded {stats['uploaded']} files ({stats['bytes'] / 1024 / 1024:.2f} MB) "
+                    f"in {stats['seconds']:.2f}s with {self.max_workers} workers: "
+                    f"{stats['bytes'] / 1024 / 1024 / elapsed:.2f} MB/s, "
+                    f"{stats['uploaded'] / elapsed:.1f} files/s, "
+                    f"{stats['skipped']} unchanged, {stats['failed']} failed")
+        return stats
     
-    def upload_processed_files(self):
+    def collect_raw_files(self, exchange: str) -> List[Tuple[str, str]]:
+        """List (local_path, hdfs_path) pairs for an exchange's raw landing files"""
+        files = []
+        exchange_dir = os.path.join(self.settings.LOCAL_DATA_DIR, "raw", exchange)
+        if not os.path.isdir(exchange_dir):
+            return files
+        
+        for date_dir in sorted(os.listdir(exchange_dir)):
+            date_path = os.path.join(exchange_dir, date_dir)
+            if not os.path.isdir(date_path):
+                continue
+            
+            for file in sorted(os.listdir(date_path)):
+                if not file.endswith(RAW_FILE_EXTENSIONS):
+                    continue
+                local_path = os.path.join(date_path, file)
+                
+                # Check if file has data (size + first line after the header)
+                if file.endswith('.csv') and not csv_has_data(local_path):
+                    logger.warning(f"    Skipping empty file: {file}")
+                    continue
+                
+                files.append((local_path, f"{self.base_path}/raw/daily/{exchange}/{date_dir}/{file}"))
+        
+        return files
+    
+    def collect_report_files(self) -> List[Tuple[str, str]]:
+        """List (local_path, hdfs_path) pairs for collection reports"""
+        reports_dir = os.path.join(self.settings.LOCAL_DATA_DIR, "reports")
+        if not os.path.isdir(reports_dir):
+            return []
+        
+        return [
+            (os.path.join(reports_dir, file), f"{self.base_path}/reports/{file}")
+            for file in sorted(os.listdir(reports_dir))
+            if file.endswith(('.json', '.csv'))
+        ]
+    
+    def upload_processed_files(self, force: bool = False):
         """Upload all processed files to HDFS"""
         logger.info(f"Local data directory: {self.settings.LOCAL_DATA_DIR}")
         
-        if not self._connect():
+        if not self.client and not self._connect():
             logger.error("Cannot connect to HDFS")
             return 0
         
@@ -158,206 +307,297 @@ class HDFSUploader:
             logger.error("Failed to create HDFS structure")
             return 0
         
-        upload_count = 0
-        failed_count = 0
-        
-        # Upload raw data from all exchanges
+        # Raw data from all exchanges plus reports, in one parallel batch
+        files = []
         raw_dir = os.path.join(self.settings.LOCAL_DATA_DIR, "raw")
-        
         if os.path.exists(raw_dir):
             logger.info(f"📁 Scanning for files in {raw_dir}")
-            
-            for exchange in os.listdir(raw_dir):
-                exchange_dir = os.path.join(raw_dir, exchange)
-                if os.path.isdir(exchange_dir):
-                    logger.info(f"Found exchange: {exchange}")
-                    
-                    for date_dir in os.listdir(exchange_dir):
-                        date_path = os.path.join(exchange_dir, date_dir)
-                        if os.path.isdir(date_path):
-                            logger.info(f"  Processing date: {date_dir}")
-                            
-                            for file in os.listdir(date_path):
-                                if file.endswith('.csv'):
-                                    local_path = os.path.join(date_path, file)
-                                    
-                                    # Check if file has data
-                                    try:
-                                        import pandas as pd
-                                        df = pd.read_csv(local_path)
-                                        if df.empty:
-                                            logger.warning(f"    Skipping empty file: {file}")
-                                            continue
-                                    except:
-                                        pass
-                                    
-                                    # Create HDFS path
-                                    hdfs_path = f"{self.base_path}/raw/daily/{exchange}/{date_dir}/{file}"
-                                    
-                                    logger.info(f"    Uploading: {file}")
-                                    
-                                    if self.upload_file(local_path, hdfs_path):
-                                        upload_count += 1
-                                        logger.info(f"    ✓ Uploaded {file}")
-                                    else:
-                                        failed_count += 1
-                                        logger.error(f"    ✗ Failed to upload {file}")
-        
-        # Upload reports
-        reports_dir = os.path.join(self.settings.LOCAL_DATA_DIR, "reports")
-        if os.path.exists(reports_dir):
-            logger.info(f"📁 Scanning for reports in {reports_dir}")
-            
-            for file in os.listdir(reports_dir):
-                if file.endswith(('.json', '.csv')):
-                    local_path = os.path.join(reports_dir, file)
-                    hdfs_path = f"{self.base_path}/reports/{file}"
-                    
-                    logger.info(f"  Uploading report: {file}")
-                    
-                    if self.upload_file(local_path, hdfs_path):
-                        upload_count += 1
-                        logger.info(f"  ✓ Uploaded report {file}")
-                    else:
-                        failed_count += 1
-                        logger.error(f"  ✗ Failed to upload report {file}")
+            for exchange in sorted(os.listdir(raw_dir)):
+                if os.path.isdir(os.path.join(raw_dir, exchange)):
+                    exchange_files = self.collect_raw_files(exchange)
+                    logger.info(f"Found exchange: {exchange} ({len(exchange_files)} files)")
+                    files.extend(exchange_files)
         
-        logger.info(f"📊 Upload summary: {upload_count} successful, {failed_count} failed")
+        files.extend(self.collect_report_files())
+        
+        stats = self.upload_files(files, force=force)
+        logger.info(f"📊 Upload summary: {stats['uploaded']} successful, "
+                    f"{stats['skipped']} unchanged, {stats['failed']} failed")
         
         # List files in HDFS to verify
         try:
             logger.info(f"📁 Listing HDFS directory: {self.base_path}")
-            files = self.client.list(self.base_path, status=False)
+            listing = self.client.list(self.base_path, status=False)
             logger.info(f"Files in HDFS {self.base_path}:")
-            for file in files:
+            for file in listing:
                 logger.info(f"  - {file}")
         except Exception as e:
             logger.warning(f"Could not list HDFS directory: {e}")
         
-        return upload_count
+        return stats['uploaded']
+
+
+    # ========== COMPACTION ==========
+    #
+    # Partition layout after compaction (raw/daily/<exchange>/<date>/):
+    #   _compacted/<stamp>/part-00000.csv   merged data
+    #   _MANIFEST-<stamp>.json              commit record (latest stamp wins)
+    #   <symbol>.csv                        files uploaded after the last compaction
+    #
+    # Readers use the newest manifest's "files" plus any *.csv not listed in its
+    # "sources" with the same length and modificationTime. The manifest is created under a temporary name and renamed into
+    # place, so readers switch from the old file set to the new one atomically.
+    
+    def _latest_manifest(self, partition: str):
+        """Return (name, manifest dict) of the newest manifest in a partition"""
+        names = sorted(
+            name for name in self.client.list(partition)
+            if name.startswith(MANIFEST_PREFIX) and name.endswith('.json')
+        )
+        if not names:
+            return None, None
+        
+        with self.client.read(f"{partition}/{names[-1]}", encoding='utf-8') as reader:
+            return names[-1], json.load(reader)
+    
+    def compact_partition(self, exchange: str, date_dir: str,
+                          target_file_size: int = DEFAULT_COMPACT_TARGET_BYTES) -> int:
+        """Merge a partition's per-symbol CSVs into a few large files
+        
+        Returns the number of source files that were compacted.
+        """
+        import pandas as pd
+        
+        partition = f"{self.base_path}/raw/daily/{exchange}/{date_dir}"
+        manifest_name, manifest = self._latest_manifest(partition)
+        listed_sources = manifest.get('sources', {}) if manifest else {}
+        
+        csv_files = {
+            name: status for name, status in self.client.list(partition, status=True)
+            if name.endswith('.csv') and status.get('type') == 'FILE'
+        }
+        leftovers = [
+            name for name, status in csv_files.items()
+            if is_compacted_source(listed_sources, name, status.get('length', 0), status.get('modificationTime', 0))
+        ]
+        new_files = sorted(name for name in csv_files if name not in leftovers)
+        
+        if not new_files:
+            # Already compacted; finish any cleanup a previous run did not complete
+            for name in leftovers:
+                self.client.delete(f"{partition}/{name}")
+            return 0
+        if not manifest and len(new_files) < 2:
+            return 0
+        
+        inputs = [f"{partition}/{rel}" for rel in (manifest.get('files', []) if manifest else [])]
+        inputs += [f"{partition}/{name}" for name in new_files]
+        
+        frames = []
+        total_bytes = 0
+        for path in inputs:
+            with self.client.read(path) as reader:
+                content = reader.read()
+            total_bytes += len(content)
+            if content.strip():
+                frames.append(pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False))
+        
+        if not frames:
+            return 0
+        
+        merged = pd.concat(frames, ignore_index=True)
+        sort_cols = [c for c in ('symbol', 'date') if c in merged.columns]
+        if sort_cols:
+            merged = merged.sort_values(sort_cols).reset_index(drop=True)
+        
+        num_files = max(1, math.ceil(total_bytes / target_file_size))
+        rows_per_file = math.ceil(len(merged) / num_files)
+        
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        out_dir = f"_compacted/{stamp}"
+        files = []
+        for i in range(num_files):
+            chunk = merged.iloc[i * rows_per_file:(i + 1) * rows_per_file]
+            if chunk.empty:
+                continue
+            rel_path = f"{out_dir}/part-{i:05d}.csv"
+            self.client.write(f"{partition}/{rel_path}", data=chunk.to_csv(index=False),
+                              encoding='utf-8', overwrite=True)
+            files.append(rel_path)
+        
+        sources = dict(listed_sources)
+        for name in new_files:
+            sources[name] = {
+                'length': csv_files[name].get('length', 0),
+                'modificationTime': csv_files[name].get('modificationTime', 0)
+            }
+        
+        new_manifest = {
+            'version': 1,
+            'partition': f"{exchange}/{date_dir}",
+            'compacted_at': datetime.now().isoformat(),
+            'files': files,
+            'sources': sources,
+            'rows': int(len(merged)),
+            'bytes': int(total_bytes)
+        }
+        
+        # Commit: create under a temp name, then rename (atomic in HDFS)
+        final_name = f"{MANIFEST_PREFIX}{stamp}.json"
+        tmp_path = f"{partition}/_tmp{final_name}"
+        self.client.write(tmp_path, data=json.dumps(new_manifest, indent=2),
+                          encoding='utf-8', overwrite=True)
+        self.client.rename(tmp_path, f"{partition}/{final_name}")
+        
+        # Cleanup after commit: sources, previous manifest and its compacted files
+        for name in new_files + leftovers:
+            self.client.delete(f"{partition}/{name}")
+        if manifest:
+            for rel_path in manifest.get('files', []):
+                self.client.delete(f"{partition}/{os.path.dirname(rel_path)}", recursive=True)
+            self.client.delete(f"{partition}/{manifest_name}")
+        
+        logger.info(f"✓ Compacted {partition}: {len(inputs)} files "
+                    f"({total_bytes:,} bytes) -> {len(files)} files")
+        return len(new_files)
 
 
 # ========== CÁC HÀM ĐỘC LẬP ==========
 
-def upload_exchange_files(exchange_code: str) -> int:
+_shared_uploader = None
+_shared_uploader_lock = threading.Lock()
+
+def get_uploader(max_retries: int = 3, retry_delay: int = 5) -> Optional[HDFSUploader]:
+    """Process-wide connected uploader, so repeated calls reuse one session"""
+    global _shared_uploader
+    
+    with _shared_uploader_lock:
+        if _shared_uploader is None or _shared_uploader.client is None:
+            uploader = HDFSUploader(max_retries=max_retries, retry_delay=retry_delay)
+            
+            if not uploader._connect():
+                return None
+            
+            if not uploader.create_hdfs_structure():
+                logger.error("❌ Failed to create HDFS structure")
+                return None
+            
+            _shared_uploader = uploader
+        
+        return _shared_uploader
+
+
+def upload_exchange_files(exchange_code: str, force: bool = False) -> int:
     """Upload files for a specific exchange to HDFS"""
     logger.info(f"📤 Uploading files for exchange: {exchange_code}")
     
     try:
-        uploader = HDFSUploader(max_retries=3, retry_delay=5)
+        uploader = get_uploader()
         
-        if not uploader._connect():
+        if uploader is None:
             logger.error(f"❌ Cannot connect to HDFS for exchange {exchange_code}")
             return 0
         
-        if not uploader.create_hdfs_structure():
-            logger.error(f"❌ Failed to create HDFS structure for {exchange_code}")
-            return 0
-        
-        upload_count = 0
-        failed_count = 0
-        
-        # Upload raw data for this exchange
         raw_dir = os.path.join(uploader.settings.LOCAL_DATA_DIR, "raw", exchange_code)
-        
-        if os.path.exists(raw_dir):
-            logger.info(f"📁 Scanning for files in {raw_dir}")
-            
-            for date_dir in os.listdir(raw_dir):
-                date_path = os.path.join(raw_dir, date_dir)
-                if os.path.isdir(date_path):
-                    logger.info(f"  Processing date: {date_dir}")
-                    
-                    for file in os.listdir(date_path):
-                        if file.endswith('.csv'):
-                            local_path = os.path.join(date_path, file)
-                            
-                            # Check if file has data
-                            try:
-                                import pandas as pd
-                                df = pd.read_csv(local_path)
-                                if df.empty:
-                                    logger.warning(f"    Skipping empty file: {file}")
-                                    continue
-                            except:
-                                pass
-                            
-                            # Create HDFS path
-                            hdfs_path = f"{uploader.base_path}/raw/daily/{exchange_code}/{date_dir}/{file}"
-                            
-                            logger.info(f"    Uploading: {file}")
-                            
-                            if uploader.upload_file(local_path, hdfs_path):
-                                upload_count += 1
-                                logger.info(f"    ✓ Uploaded {file}")
-                            else:
-                                failed_count += 1
-                                logger.error(f"    ✗ Failed to upload {file}")
-        else:
+        if not os.path.exists(raw_dir):
             logger.warning(f"⚠️ No data directory found for exchange {exchange_code}: {raw_dir}")
+            return 0
         
-        logger.info(f"📊 Exchange {exchange_code} upload summary: {upload_count} successful, {failed_count} failed")
+        logger.info(f"📁 Scanning for files in {raw_dir}")
+        stats = uploader.upload_files(uploader.collect_raw_files(exchange_code), force=force)
         
-        return upload_count
+        logger.info(f"📊 Exchange {exchange_code} upload summary: "
+                    f"{stats['uploaded']} successful, {stats['skipped']} unchanged, {stats['failed']} failed")
+        
+        return stats['uploaded']
         
     except Exception as e:
         logger.error(f"❌ Error uploading exchange {exchange_code}: {str(e)}")
         return 0
 
 
-def upload_reports() -> int:
+def upload_reports(force: bool = False) -> int:
     """Upload report files to HDFS"""
     logger.info("📋 Uploading reports to HDFS...")
     
     try:
-        uploader = HDFSUploader(max_retries=3, retry_delay=5)
+        uploader = get_uploader()
         
-        if not uploader._connect():
+        if uploader is None:
             logger.error("❌ Cannot connect to HDFS for reports")
             return 0
         
-        upload_count = 0
+        stats = uploader.upload_files(uploader.collect_report_files(), force=force)
+        
+        logger.info(f"📋 Reports upload summary: {stats['uploaded']} files uploaded")
+        return stats['uploaded']
+        
+    except Exception as e:
+        logger.error(f"❌ Error uploading reports: {str(e)}")
+        return 0
+
+
+def compact_raw_files(exchange_code: str = None, older_than_days: int = 1,
+                      target_size_mb: int = 128) -> int:
+    """Compact raw/daily partitions older than N days (all exchanges by default)"""
+    logger.info("🗜️ Compacting raw files in HDFS...")
+    
+    try:
+        uploader = get_uploader()
+        
+        if uploader is None:
+            logger.error("❌ Cannot connect to HDFS for compaction")
+            return 0
+        
+        daily_root = f"{uploader.base_path}/raw/daily"
+        exchanges = [exchange_code] if exchange_code else uploader.client.list(daily_root)
+        # Only settled partitions: today's directory may still receive uploads
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime('%Y%m%d')
         
-        # Upload reports
-        reports_dir = os.path.join(uploader.settings.LOCAL_DATA_DIR, "reports")
-        if os.path.exists(reports_dir):
-            logger.info(f"📁 Scanning for reports in {reports_dir}")
+        compacted = 0
+        for exchange in exchanges:
+            exchange_path = f"{daily_root}/{exchange}"
+            if not uploader.client.status(exchange_path, strict=False):
+                logger.warning(f"⚠️ No HDFS data for exchange {exchange}")
+                continue
             
-            for file in os.listdir(reports_dir):
-                if file.endswith(('.json', '.csv')):
-                    local_path = os.path.join(reports_dir, file)
-                    hdfs_path = f"{uploader.base_path}/reports/{file}"
-                    
-                    logger.info(f"  Uploading report: {file}")
-                    
-                    if uploader.upload_file(local_path, hdfs_path):
-                        upload_count += 1
-                        logger.info(f"  ✓ Uploaded report {file}")
-                    else:
-                        logger.error(f"  ✗ Failed to upload report {file}")
+            for date_dir in sorted(uploader.client.list(exchange_path)):
+                if not date_dir.isdigit() or date_dir > cutoff:
+                    continue
+                try:
+                    compacted += uploader.compact_partition(
+                        exchange, date_dir, target_file_size=target_size_mb * 1024 * 1024
+                    )
+                except Exception as e:
+                    logger.error(f"  ✗ Failed to compact {exchange}/{date_dir}: {e}")
         
-        logger.info(f"📋 Reports upload summary: {upload_count} files uploaded")
-        return upload_count
+        logger.info(f"🗜️ Compaction summary: {compacted} source files compacted")
+        if compacted:
+            invalidate_hdfs_listings()
+        return compacted
         
     except Exception as e:
-        logger.error(f"❌ Error uploading reports: {str(e)}")
+        logger.error(f"❌ Error compacting raw files: {str(e)}")
         return 0
 
 
-def upload_to_hdfs():
+def upload_to_hdfs(force: bool = False):
     """Main upload function"""
     logger.info("=" * 60)
     logger.info("STARTING HDFS UPLOAD")
     logger.info("=" * 60)
     
     try:
-        uploader = HDFSUploader(max_retries=5, retry_delay=10)
-        count = uploader.upload_processed_files()
+        uploader = get_uploader(max_retries=5, retry_delay=10)
+        if uploader is None:
+            logger.error("❌ Cannot connect to HDFS")
+            return 0
+        count = uploader.upload_processed_files(force=force)
         
         if count > 0:
             logger.info(f"✅ HDFS upload completed successfully: {count} files uploaded")
         else:
-            logger.warning(f"⚠️ HDFS upload completed but no files were uploaded")
+            logger.warning(f"⚠️ HDFS upload completed but no files were uploaded (all unchanged or failed)")
         
         return count
         
@@ -370,31 +610,41 @@ def upload_to_hdfs():
 
 def main():
     """Main function with command line arguments"""
+    force = "--force" in sys.argv
+    if force:
+        sys.argv.remove("--force")
+    
     if len(sys.argv) > 1:
         if sys.argv[1] == "--exchange":
             if len(sys.argv) > 2:
                 exchange_code = sys.argv[2]
-                upload_exchange_files(exchange_code)
+                upload_exchange_files(exchange_code, force=force)
             else:
                 logger.error("Please provide exchange code: python hdfs_uploader.py --exchange NASDAQ")
         elif sys.argv[1] == "--reports":
-            upload_reports()
+            upload_reports(force=force)
         elif sys.argv[1] == "--all":
-            upload_to_hdfs()
+            upload_to_hdfs(force=force)
+        elif sys.argv[1] == "--compact":
+            exchange_code = sys.argv[2] if len(sys.argv) > 2 else None
+            compact_raw_files(exchange_code)
         elif sys.argv[1] == "--help":
             print("""
 Usage:
   python hdfs_uploader.py --exchange <exchange_code>  # Upload single exchange
   python hdfs_uploader.py --reports                   # Upload reports only
   python hdfs_uploader.py --all                       # Upload all files
+  python hdfs_uploader.py --compact [exchange_code]   # Compact small raw files (dates before today)
   python hdfs_uploader.py --help                      # Show this help
+
+  Add --force to re-upload files that are unchanged since the last upload
             """)
         else:
             logger.error(f"Unknown argument: {sys.argv[1]}")
             print("Use --help for usage information")
     else:
         # Mặc định upload tất cả
-        upload_to_hdfs()
+        upload_to_hdfs(force=force)
 
 
 if __name__ == "__main__":
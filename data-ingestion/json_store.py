@@ -0,0 +1,34 @@
+import os
+import json
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def load_json(path: str, description: str) -> Optional[Any]:
+    """Contents of a JSON state file, or None if it is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load {description} from {path}: {e}")
+        return None
+
+
+def save_json(path: str, data: Any, description: str) -> bool:
+    """Write to a temp file and os.replace it, so a crash never leaves a truncated file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(data, indent=2, sort_keys=True))
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to save {description} to {path}: {e}")
+        return False
@@ -42,6 +42,7 @@ def run_data_collection():
             logger.info("📊 STEP 3: Job summary:")
             logger.info(f"   - Successful symbols: {collection_results.get('total_successful', 0)}")
             logger.info(f"   - Failed symbols: {collection_results.get('total_failed', 0)}")
+            logger.info(f"   - Skipped (up to date): {collection_results.get('total_skipped', 0)}")
             logger.info(f"   - Total data points: {collection_results.get('total_data_points', 0)}")
             logger.info(f"   - HDFS uploads: {collection_results.get('total_hdfs_uploads', 0)}")
             logger.info(f"   - Reports uploaded: {report_count}")
@@ -65,6 +66,7 @@ def main():
     logger.info(f"  - Interval: {settings.COLLECTION_INTERVAL_HOURS} hours")
     logger.info(f"  - Symbols per exchange: {settings.SYMBOLS_PER_EXCHANGE}")
     logger.info(f"  - Days of data: {settings.DAYS_OF_DATA}")
+    logger.info(f"  - Workers: {settings.COLLECTION_WORKERS} ({settings.API_REQUESTS_PER_SECOND} req/s)")
     logger.info(f"  - Data directory: {settings.LOCAL_DATA_DIR}")
     logger.info("=" * 60)
     
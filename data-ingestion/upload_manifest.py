@@ -0,0 +1,110 @@
+import os
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+from json_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def csv_has_data(path: str) -> bool:
+    """True if a CSV has at least one row after the header (reads two lines at most)"""
+    try:
+        if os.path.getsize(path) == 0:
+            return False
+
+        with open(path, 'rb') as f:
+            f.readline()  # header
+            for line in f:
+                if line.strip():
+                    return True
+                break
+        return False
+    except OSError:
+        return False
+
+
+class UploadManifest:
+    """Size, mtime and content hash of every file uploaded to HDFS, persisted as a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        entries = load_json(self.path, "upload manifest")
+        if entries:
+            self.entries = entries
+            logger.info(f"Loaded {len(self.entries)} upload records from {self.path}")
+
+    def _stat(self, local_path: str) -> Optional[os.stat_result]:
+        try:
+            return os.stat(local_path)
+        except OSError:
+            return None
+
+    def is_unchanged(self, local_path: str, hdfs_path: str) -> bool:
+        """True if the file was already uploaded to hdfs_path with the same content
+
+        Size and mtime are compared first; the file is only hashed when the
+        size matches but the mtime moved (e.g. a rewrite with identical data).
+        """
+        with self.lock:
+            entry = self.entries.get(local_path)
+        if not entry or entry.get('hdfs_path') != hdfs_path:
+            return False
+
+        stat = self._stat(local_path)
+        if stat is None or stat.st_size != entry.get('size'):
+            return False
+        if stat.st_mtime_ns == entry.get('mtime_ns'):
+            return True
+
+        if file_checksum(local_path) != entry.get('sha256'):
+            return False
+
+        with self.lock:
+            entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def record(self, local_path: str, hdfs_path: str):
+        """Remember a successful upload"""
+        stat = self._stat(local_path)
+        if stat is None:
+            return
+
+        entry = {
+            'hdfs_path': hdfs_path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_checksum(local_path)
+        }
+        with self.lock:
+            self.entries[local_path] = entry
+
+    def forget(self, local_path: str):
+        with self.lock:
+            self.entries.pop(local_path, None)
+
+    def save(self):
+        with self.lock:
+            # Drop records for local files that no longer exist
+            for local_path in [p for p in self.entries if not os.path.exists(p)]:
+                del self.entries[local_path]
+            snapshot = {local_path: dict(entry) for local_path, entry in self.entries.items()}
+        save_json(self.path, snapshot, "upload manifest")
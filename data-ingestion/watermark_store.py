@@ -0,0 +1,87 @@
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from json_store import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+
+def last_expected_bar_date(today: date = None) -> date:
+    """Most recent completed weekday (today's EOD bar is not final yet)"""
+    day = (today or date.today()) - timedelta(days=1)
+    while day.weekday() >= 5:  # Saturday / Sunday
+        day -= timedelta(days=1)
+    return day
+
+
+class WatermarkStore:
+    """Last collected bar date per (exchange, symbol), persisted as a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.watermarks: Dict[str, Dict[str, str]] = {}
+        self._load()
+
+    def _load(self):
+        watermarks = load_json(self.path, "watermarks")
+        if watermarks:
+            self.watermarks = watermarks
+            total = sum(len(symbols) for symbols in self.watermarks.values())
+            logger.info(f"Loaded {total} watermarks from {self.path}")
+
+    def is_empty(self) -> bool:
+        return not any(self.watermarks.values())
+
+    def get(self, exchange: str, symbol: str) -> Optional[date]:
+        with self.lock:
+            value = self.watermarks.get(exchange, {}).get(symbol)
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+    def update(self, exchange: str, symbol: str, last_date: date):
+        """Advance the watermark; never moves backwards
+
+        Capped at last_expected_bar_date(): a bar for today is still partial,
+        so its date must stay after the watermark and be fetched again.
+        """
+        if isinstance(last_date, datetime):
+            last_date = last_date.date()
+        last_date = min(last_date, last_expected_bar_date())
+
+        with self.lock:
+            current = self.watermarks.get(exchange, {}).get(symbol)
+            if current is None or last_date.isoformat() > current:
+                self.watermarks.setdefault(exchange, {})[symbol] = last_date.isoformat()
+
+    def is_current(self, exchange: str, symbol: str, today: date = None) -> bool:
+        watermark = self.get(exchange, symbol)
+        return watermark is not None and watermark >= last_expected_bar_date(today)
+
+    def save(self):
+        with self.lock:
+            snapshot = {exchange: dict(symbols) for exchange, symbols in self.watermarks.items()}
+        save_json(self.path, snapshot, "watermarks")
+
+    def seed_from_database(self, engine, table_name: str = "stock_prices") -> int:
+        """Initialise watermarks from MAX(date) per (exchange, symbol) in Postgres"""
+        from sqlalchemy import text
+
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(text(f"""
+                    SELECT exchange, symbol, MAX(date) AS last_date
+                    FROM {table_name}
+                    GROUP BY exchange, symbol
+                """)).fetchall()
+        except Exception as e:
+            logger.warning(f"Could not seed watermarks from database: {e}")
+            return 0
+
+        for exchange, symbol, last_date in rows:
+            if exchange and symbol and last_date:
+                self.update(exchange, symbol, last_date)
+
+        logger.info(f"Seeded {len(rows)} watermarks from {table_name}")
+        return len(rows)
@@ -29,7 +29,8 @@ import {
   Grid,
   Tabs,
   Tab,
-  CircularProgress
+  CircularProgress,
+  Pagination
 } from '@mui/material';
 import {
   Folder as FolderIcon,
@@ -47,7 +48,8 @@ import {
 import { useQuery } from 'react-query';
 import axios from 'axios';
 import toast from 'react-hot-toast';
-import Papa from 'papaparse';
+
+const PREVIEW_PAGE_SIZE = 100;
 
 function HDFSBrowser() {
   const [currentPath, setCurrentPath] = useState('/stock_data');
@@ -59,6 +61,9 @@ function HDFSBrowser() {
   const [csvHeaders, setCsvHeaders] = useState([]);
   const [previewTab, setPreviewTab] = useState(0);
   const [isLoadingContent, setIsLoadingContent] = useState(false);
+  const [previewPage, setPreviewPage] = useState(1);
+  const [previewTotalPages, setPreviewTotalPages] = useState(0);
+  const [previewHasMore, setPreviewHasMore] = useState(false);
 
   // Fetch HDFS directory listing qua backend API
   const { data: files, isLoading, error, refetch } = useQuery(
@@ -94,9 +99,10 @@ function HDFSBrowser() {
     }
   );
 
-  // Fetch file content qua backend API
-  // Fetch file content qua backend API
-const fetchFileContent = async (filePath) => {
+  // Fetch one page of file content qua backend API (server-side paging).
+  // Page 1 is read from offset 0; only a later page needs the server's line
+  // index (one full pass over the file), which also yields total_pages.
+const fetchFileContent = async (filePath, page = 1) => {
   setIsLoadingContent(true);
   setFileContent('');
   setCsvData([]);
@@ -104,86 +110,38 @@ const fetchFileContent = async (filePath) => {
   
   try {
     const fileType = filePath.split('.').pop().toLowerCase();
-    console.log('🔍 Fetching file:', filePath, 'Type:', fileType);
+    const isCsv = fileType === 'csv';
+    console.log('🔍 Fetching file:', filePath, 'Type:', fileType, 'Page:', page);
     
     const response = await axios.get('/api/v1/hdfs/read', {
       params: { 
         file_path: filePath,
-        limit: 100 
+        page: page > 1 ? page : undefined,
+        limit: PREVIEW_PAGE_SIZE,
+        format: isCsv ? 'rows' : 'lines'
       }
     });
     
-    console.log('📦 File response:', response.data);
-    
-    // Lấy content - có thể là string hoặc array
-    let content = response.data.content || '';
-    
-    // Nếu content là array (list of objects), convert thành CSV string
-    if (Array.isArray(content)) {
-      console.log('📊 Content is array, converting...');
-      if (content.length > 0 && typeof content[0] === 'object') {
-        // Array of objects -> CSV
-        const headers = Object.keys(content[0]);
-        const csvRows = [
-          headers.join(','), // header row
-          ...content.map(row => headers.map(header => row[header]).join(','))
-        ];
-        content = csvRows.join('\n');
-        console.log('✅ Converted array to CSV');
-      } else {
-        // Array of strings
-        content = content.join('\n');
-      }
+    const data = response.data;
+    setPreviewPage(page);
+    if (data.total_pages) {
+      setPreviewTotalPages(data.total_pages);
     }
+    setPreviewHasMore(data.next_offset != null);
     
-    console.log('📝 Final content (first 200 chars):', content.substring(0, 200));
-    
-    if (fileType === 'csv') {
-      try {
-        console.log('📈 Parsing CSV...');
-        const parsed = Papa.parse(content, {
-          header: true,
-          skipEmptyLines: true,
-          preview: 100,
-          dynamicTyping: true,
-        });
-        
-        console.log('✅ CSV parse result:', {
-          data: parsed.data,
-          fields: parsed.meta?.fields,
-          errors: parsed.errors
-        });
-        
-        if (parsed.data && parsed.data.length > 0) {
-          setCsvData(parsed.data.slice(0, 50));
-          if (parsed.meta.fields) {
-            setCsvHeaders(parsed.meta.fields);
-          } else if (parsed.data[0]) {
-            setCsvHeaders(Object.keys(parsed.data[0]));
-          }
-          setFileContent(`CSV loaded: ${parsed.data.length} rows`);
-          console.log('🎉 CSV data set:', parsed.data.length, 'rows');
-        } else {
-          console.log('⚠️ No CSV data, showing as text');
-          setFileContent(content.slice(0, 50000));
-        }
-      } catch (parseError) {
-        console.error('❌ CSV parse failed:', parseError);
-        console.error('Parse error details:', parseError.message);
-        setFileContent(content.slice(0, 50000));
-      }
+    if (isCsv && data.rows && data.rows.length > 0) {
+      setCsvHeaders(data.header || Object.keys(data.rows[0]));
+      setCsvData(data.rows);
+      setFileContent(`CSV loaded: ${data.rows.length} rows`);
     } else {
-      console.log('📄 Showing as plain text');
-      setFileContent(content.slice(0, 50000));
+      setFileContent(data.content || (data.lines || []).join('\n'));
     }
   } catch (error) {
     console.error('💥 Error fetching file content:', error);
     console.error('Error response:', error.response);
-    console.error('Error message:', error.message);
     setFileContent(`Error: ${error.message}\n\nCheck console for details.`);
   } finally {
     setIsLoadingContent(false);
-    console.log('🏁 fetchFileContent completed');
   }
 };
 
@@ -211,7 +169,9 @@ const fetchFileContent = async (filePath) => {
       setSelectedFile(file);
       setViewFileDialog(true);
       setPreviewTab(0);
-      await fetchFileContent(file.path);
+      setPreviewTotalPages(0);
+      setPreviewHasMore(false);
+      await fetchFileContent(file.path, 1);
     } else {
       handleNavigate(file.path);
     }
@@ -265,6 +225,25 @@ const fetchFileContent = async (filePath) => {
   const directories = filteredFiles.filter(file => file.type === 'directory');
   const fileList = filteredFiles.filter(file => file.type === 'file');
 
+  const renderPreviewPagination = () => {
+    // Until a later page has been opened the total is unknown: offer the next page only
+    const pageCount = previewTotalPages || (previewHasMore ? previewPage + 1 : previewPage);
+    if (pageCount <= 1) return null;
+    return (
+      <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+        <Pagination
+          count={pageCount}
+          page={previewPage}
+          size="small"
+          siblingCount={2}
+          showFirstButton
+          showLastButton
+          onChange={(e, page) => fetchFileContent(selectedFile.path, page)}
+        />
+      </Box>
+    );
+  };
+
   const renderFilePreview = () => {
     if (isLoadingContent) {
       return (
@@ -281,7 +260,7 @@ const fetchFileContent = async (filePath) => {
       return (
         <Box sx={{ maxHeight: 400, overflow: 'auto' }}>
           <Typography variant="subtitle2" color="textSecondary" gutterBottom>
-            CSV Preview ({csvData.length} rows)
+            CSV Preview ({csvData.length} rows{previewTotalPages > 1 ? `, page ${previewPage} of ${previewTotalPages}` : ''})
           </Typography>
           <TableContainer component={Paper} variant="outlined" sx={{ maxHeight: 350 }}>
             <Table size="small" stickyHeader>
@@ -309,6 +288,7 @@ const fetchFileContent = async (filePath) => {
               </TableBody>
             </Table>
           </TableContainer>
+          {renderPreviewPagination()}
         </Box>
       );
     }
@@ -324,6 +304,7 @@ const fetchFileContent = async (filePath) => {
               {fileContent}
             </pre>
           </Paper>
+          {renderPreviewPagination()}
         </Box>
       );
     }
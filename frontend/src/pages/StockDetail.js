@@ -85,12 +85,23 @@ function StockDetail() {
           startDate.setMonth(endDate.getMonth() - 1);
       }
 
-      const response = await stockAPI.getStockPrices(symbol, {
+      const response = await stockAPI.getPriceHistory(symbol, {
         start_date: startDate.toISOString().split('T')[0],
         end_date: endDate.toISOString().split('T')[0],
-        limit: 100
+        limit: 400
       });
-      return response.data;
+
+      // Columnar payload (parallel arrays, oldest first) -> one object per row
+      const series = response.data.series[symbol.toUpperCase()];
+      if (!series) return [];
+      return series.date.map((date, i) => ({
+        date,
+        open: series.open[i],
+        high: series.high[i],
+        low: series.low[i],
+        close: series.close[i],
+        volume: series.volume[i],
+      }));
     }
   );
 
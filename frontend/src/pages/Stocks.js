@@ -1,4 +1,4 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useEffect } from 'react';
 import {
   Box,
   Paper,
@@ -32,53 +32,79 @@ import axios from 'axios';
 import { Link } from 'react-router-dom';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || '/api/v1';
+const SEARCH_DEBOUNCE_MS = 300;
 
 function Stocks() {
   const [searchTerm, setSearchTerm] = useState('');
+  const [filters, setFilters] = useState({ q: '', exchange: '', sector: '', industry: '' });
   const [page, setPage] = useState(0);
-  const [rowsPerPage, setRowsPerPage] = useState(10);
+  const [rowsPerPage, setRowsPerPage] = useState(25);
+  // cursors[n] is the keyset cursor that fetches page n (null = first page)
+  const [cursors, setCursors] = useState([null]);
+  const [total, setTotal] = useState(null);
 
-  const { data: stocks, isLoading, error } = useQuery('stocks', async () => {
-    console.log('Fetching stocks from:', `${API_BASE_URL}/stocks`);
-    try {
-      const response = await axios.get(`${API_BASE_URL}/stocks`);
-      console.log('Stocks data:', response.data);
-      return response.data;
-    } catch (err) {
-      console.error('Error fetching stocks:', err);
-      throw err;
-    }
-  });
+  const resetPaging = () => {
+    setPage(0);
+    setCursors([null]);
+    setTotal(null);
+  };
+
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setFilters((prev) => (prev.q === searchTerm.trim() ? prev : { ...prev, q: searchTerm.trim() }));
+      resetPaging();
+    }, SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  const filteredStocks = useMemo(() => {
-    if (!stocks) return [];
-    
-    return stocks.filter(stock => {
-      const searchLower = searchTerm.toLowerCase();
-      return (
-        stock.symbol.toLowerCase().includes(searchLower) ||
-        (stock.name && stock.name.toLowerCase().includes(searchLower)) ||
-        (stock.exchange && stock.exchange.toLowerCase().includes(searchLower)) ||
-        (stock.sector && stock.sector.toLowerCase().includes(searchLower)) ||
-        (stock.industry && stock.industry.toLowerCase().includes(searchLower))
-      );
-    });
-  }, [stocks, searchTerm]);
+  const handleFilterChange = (field) => (e) => {
+    setFilters((prev) => ({ ...prev, [field]: e.target.value.trim() }));
+    resetPaging();
+  };
 
-  const paginatedStocks = filteredStocks.slice(
-    page * rowsPerPage,
-    page * rowsPerPage + rowsPerPage
+  const { data, isLoading, isFetching, error } = useQuery(
+    ['stocks', filters, rowsPerPage, cursors[page]],
+    async () => {
+      const params = { limit: rowsPerPage, include_total: page === 0 };
+      Object.entries(filters).forEach(([key, value]) => {
+        if (value) params[key] = value;
+      });
+      if (cursors[page]) params.cursor = cursors[page];
+
+      const response = await axios.get(`${API_BASE_URL}/stocks`, { params });
+      return response.data;
+    },
+    { keepPreviousData: true, staleTime: 60000 }
   );
 
+  const stocks = data?.items || [];
+  useEffect(() => {
+    // The total is only requested with the first page; keep it while paging
+    if (data && data.total !== null && data.total !== undefined) setTotal(data.total);
+  }, [data]);
+
   const handleChangePage = (event, newPage) => {
+    if (newPage > page) {
+      if (!data?.next_cursor || isFetching) return;
+      setCursors((prev) => {
+        const next = prev.slice(0, newPage);
+        next[newPage] = data.next_cursor;
+        return next;
+      });
+    }
     setPage(newPage);
   };
 
   const handleChangeRowsPerPage = (event) => {
     setRowsPerPage(parseInt(event.target.value, 10));
-    setPage(0);
+    resetPaging();
   };
 
+  const hasFilters = Object.values(filters).some(Boolean);
+  const paginationCount = data?.next_cursor
+    ? (total !== null ? Math.max(total, (page + 1) * rowsPerPage + 1) : -1)
+    : page * rowsPerPage + stocks.length;
+
   if (isLoading) {
     return (
       <Box sx={{ width: '100%' }}>
@@ -98,7 +124,7 @@ function Stocks() {
     );
   }
 
-  if (!stocks || stocks.length === 0) {
+  if (stocks.length === 0 && page === 0 && !hasFilters && !isFetching) {
     return (
       <Paper sx={{ p: 4, textAlign: 'center' }}>
         <Typography variant="h6" gutterBottom>
@@ -131,35 +157,54 @@ function Stocks() {
 
       {/* Search and Stats */}
       <Paper sx={{ p: 2, mb: 3 }}>
+        {isFetching && <LinearProgress sx={{ mb: 1 }} />}
         <Box display="flex" justifyContent="space-between" alignItems="center" flexWrap="wrap" gap={2}>
           <Box display="flex" alignItems="center" gap={2} flex={1}>
             <SearchIcon color="action" />
             <TextField
-              placeholder="Search by symbol, name, exchange, sector, or industry..."
+              placeholder="Search by symbol or company name prefix..."
               variant="outlined"
               size="small"
               value={searchTerm}
-              onChange={(e) => {
-                setSearchTerm(e.target.value);
-                setPage(0); // Reset to first page when searching
-              }}
+              onChange={(e) => setSearchTerm(e.target.value)}
               sx={{ flexGrow: 1 }}
               InputProps={{
                 sx: { backgroundColor: 'background.paper' }
               }}
             />
+            <TextField
+              label="Exchange"
+              size="small"
+              onBlur={handleFilterChange('exchange')}
+              onKeyDown={(e) => e.key === 'Enter' && handleFilterChange('exchange')(e)}
+              sx={{ width: 120 }}
+            />
+            <TextField
+              label="Sector"
+              size="small"
+              onBlur={handleFilterChange('sector')}
+              onKeyDown={(e) => e.key === 'Enter' && handleFilterChange('sector')(e)}
+              sx={{ width: 160 }}
+            />
+            <TextField
+              label="Industry"
+              size="small"
+              onBlur={handleFilterChange('industry')}
+              onKeyDown={(e) => e.key === 'Enter' && handleFilterChange('industry')(e)}
+              sx={{ width: 160 }}
+            />
           </Box>
           <Box display="flex" gap={1}>
             <Chip
               icon={<FilterList />}
-              label={`Total: ${stocks.length}`}
+              label={`${hasFilters ? 'Matching' : 'Total'}: ${total !== null ? total.toLocaleString() : '?'}${data?.total_is_estimate ? ' (est.)' : ''}`}
               color="primary"
               variant="outlined"
             />
             <Chip
               icon={<Sort />}
-              label={`Showing: ${filteredStocks.length}`}
-              color={filteredStocks.length < stocks.length ? "secondary" : "default"}
+              label={`Page ${page + 1}: ${stocks.length}`}
+              color={hasFilters ? "secondary" : "default"}
               variant="outlined"
             />
           </Box>
@@ -193,10 +238,10 @@ function Stocks() {
               </TableRow>
             </TableHead>
             <TableBody>
-              {paginatedStocks.length > 0 ? (
-                paginatedStocks.map((stock) => (
+              {stocks.length > 0 ? (
+                stocks.map((stock) => (
                   <TableRow 
-                    key={stock.symbol}
+                    key={`${stock.exchange}:${stock.symbol}`}
                     hover
                     sx={{ 
                       '&:hover': { backgroundColor: 'action.hover' },
@@ -281,7 +326,7 @@ function Stocks() {
                       No stocks found
                     </Typography>
                     <Typography variant="body2" color="textSecondary">
-                      Try adjusting your search term
+                      Try adjusting your search term or filters
                     </Typography>
                   </TableCell>
                 </TableRow>
@@ -294,7 +339,7 @@ function Stocks() {
         <TablePagination
           rowsPerPageOptions={[10, 25, 50, 100]}
           component="div"
-          count={filteredStocks.length}
+          count={paginationCount}
           rowsPerPage={rowsPerPage}
           page={page}
           onPageChange={handleChangePage}
@@ -319,15 +364,15 @@ function Stocks() {
         <Box display="flex" flexWrap="wrap" gap={3}>
           <Box>
             <Typography variant="body2" color="textSecondary">
-              Total Stocks
+              {hasFilters ? 'Matching Stocks' : 'Total Stocks'}
             </Typography>
             <Typography variant="h5">
-              {stocks.length}
+              {total !== null ? total.toLocaleString() : '?'}
             </Typography>
           </Box>
           <Box>
             <Typography variant="body2" color="textSecondary">
-              Unique Exchanges
+              Exchanges (this page)
             </Typography>
             <Typography variant="h5">
               {[...new Set(stocks.map(s => s.exchange))].length}
@@ -335,7 +380,7 @@ function Stocks() {
           </Box>
           <Box>
             <Typography variant="body2" color="textSecondary">
-              Sectors
+              Sectors (this page)
             </Typography>
             <Typography variant="h5">
               {[...new Set(stocks.map(s => s.sector).filter(Boolean))].length}
@@ -343,10 +388,10 @@ function Stocks() {
           </Box>
           <Box>
             <Typography variant="body2" color="textSecondary">
-              Currently Filtered
+              Showing
             </Typography>
             <Typography variant="h5">
-              {filteredStocks.length}
+              {stocks.length > 0 ? `${page * rowsPerPage + 1}-${page * rowsPerPage + stocks.length}` : 0}
             </Typography>
           </Box>
         </Box>
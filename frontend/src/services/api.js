@@ -40,8 +40,8 @@ api.interceptors.response.use(
 
 // Stock APIs
 export const stockAPI = {
-  // Get all stocks
-  getStocks: () => api.get('/stocks'),
+  // Get a page of stocks; params: { exchange, sector, industry, q, cursor, limit, include_total }
+  getStocks: (params = {}) => api.get('/stocks', { params }),
   
   // Get stock by symbol
   getStock: (symbol) => api.get(`/stocks/${symbol}`),
@@ -49,6 +49,11 @@ export const stockAPI = {
   // Get stock prices
   getStockPrices: (symbol, params) => 
     api.get(`/stocks/${symbol}/prices`, { params }),
+
+  // Columnar OHLCV history for several symbols in one request
+  // params: { start_date, end_date, limit }
+  getPriceHistory: (symbols, params) =>
+    api.get('/stocks/history', { params: { ...params, symbols: [].concat(symbols).join(',') } }),
   
   // Get analytics summary
   getAnalyticsSummary: () => api.get('/analytics/summary'),
@@ -68,9 +73,9 @@ export const hdfsAPI = {
   listFiles: (path = '/stock_data') => 
     api.get('/hdfs/files', { params: { path } }),
   
-  // Read HDFS file
-  readFile: (filePath, limit = 100) => 
-    api.get('/hdfs/read', { params: { file_path: filePath, limit } }),
+  // Read one page of an HDFS file (page: 1-based page, or offset: byte cursor from next_offset)
+  readFile: (filePath, limit = 100, { page, offset, format = 'lines' } = {}) => 
+    api.get('/hdfs/read', { params: { file_path: filePath, limit, page, offset, format } }),
 };
 
 // Spark APIs
@@ -12,10 +12,21 @@ export SPARK_HOME=/opt/spark
 export PYSPARK_PYTHON=python3
 export PYSPARK_DRIVER_PYTHON=python3
 
+# Step 0: Compact small raw files from previous days
+echo ""
+echo "[STEP 0] Compacting raw files..."
+python /opt/spark-apps/compact_raw.py
+
+if [ $? -eq 0 ]; then
+    echo "✓ Raw file compaction completed"
+else
+    echo "⚠ Raw file compaction failed, continuing with uncompacted files"
+fi
+
 # Step 1: Run data processing
 echo ""
 echo "[STEP 1] Running data processing..."
-python /opt/spark-apps/data_processor.py
+python /opt/spark-apps/data_processor.py --incremental
 
 if [ $? -eq 0 ]; then
     echo "✓ Data processing completed"
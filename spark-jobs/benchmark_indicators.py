@@ -0,0 +1,275 @@
+"""
+Benchmark for the StockAnalyzer indicator/anomaly/signal stages.
+
+Generates a synthetic daily_stocks-shaped dataset, then runs the current
+single-pass window implementation and the previous one-withColumn-per-window
+implementation (kept below as legacy_*) over the same persisted input.
+For each it reports wall time, plan analysis time, the number of Exchange
+and Sort operators in the physical plan, and the stage count and shuffle
+bytes of the jobs it ran (from the status tracker and the Spark UI REST API).
+
+Usage:
+  python benchmark_indicators.py                                # 2000 symbols x 2500 days, local[*]
+  python benchmark_indicators.py --symbols 4000 --days 1250 --master spark://spark-master:7077
+  python benchmark_indicators.py --verify --output bench.json
+"""
+import argparse
+import json
+import time
+import urllib.request
+
+from pyspark import StorageLevel
+from pyspark.sql import SparkSession
+from pyspark.sql.functions import (abs, avg, coalesce, col, expr, floor, format_string, lag, lit, rand,
+                                   stddev, when)
+from pyspark.sql.window import Window
+
+from stock_analysis import StockAnalyzer
+
+
+def generate_data(spark, n_symbols, n_days, seed=42):
+    """Random OHLCV rows: n_symbols x n_days, one row per symbol per trading day"""
+    df = spark.range(n_symbols * n_days)
+    base = (col("id") % n_symbols) * 0.5 + 10
+    return df.select(
+        format_string("SYM%05d", (col("id") % n_symbols).cast("int")).alias("symbol"),
+        lit("BENCH").alias("exchange"),
+        expr("date_add(date'2000-01-03', cast(id div {} as int))".format(n_symbols)).alias("date"),
+        (base * (0.9 + rand(seed) * 0.2)).alias("open"),
+        (base * (1.0 + rand(seed + 1) * 0.1)).alias("high"),
+        (base * (0.9 + rand(seed + 2) * 0.1)).alias("low"),
+        (base * (0.9 + rand(seed + 3) * 0.2)).alias("close"),
+        floor(rand(seed + 4) * 1000000).cast("double").alias("volume"),
+        ((rand(seed + 5) - 0.5) * 10).alias("daily_return")
+    )
+
+
+def legacy_indicators(df):
+    """The previous calculate_technical_indicators, with avg_gain/avg_loss as columns"""
+    window_spec = Window.partitionBy("symbol").orderBy("date")
+
+    df = df.withColumn("ma_5", avg("close").over(window_spec.rowsBetween(-4, 0)))
+    df = df.withColumn("ma_10", avg("close").over(window_spec.rowsBetween(-9, 0)))
+    df = df.withColumn("ma_20", avg("close").over(window_spec.rowsBetween(-19, 0)))
+    df = df.withColumn("ma_50", avg("close").over(window_spec.rowsBetween(-49, 0)))
+
+    df = df.withColumn("price_change", col("close") - lag("close", 1).over(window_spec))
+    df = df.withColumn("gain", when(col("price_change") > 0, col("price_change")).otherwise(0))
+    df = df.withColumn("loss", when(col("price_change") < 0, -col("price_change")).otherwise(0))
+    df = df.withColumn("avg_gain", avg("gain").over(window_spec.rowsBetween(-13, 0)))
+    df = df.withColumn("avg_loss", avg("loss").over(window_spec.rowsBetween(-13, 0)))
+    df = df.withColumn("rs", when(col("avg_loss") == 0, 100).otherwise(col("avg_gain") / col("avg_loss")))
+    df = df.withColumn("rsi", 100 - (100 / (1 + col("rs"))))
+
+    df = df.withColumn("std_20", stddev("close").over(window_spec.rowsBetween(-19, 0)))
+    df = df.withColumn("bb_upper", col("ma_20") + (2 * col("std_20")))
+    df = df.withColumn("bb_lower", col("ma_20") - (2 * col("std_20")))
+    df = df.withColumn("bb_position", (col("close") - col("bb_lower")) / (col("bb_upper") - col("bb_lower")))
+
+    df = df.withColumn("ema_12", avg("close").over(window_spec.rowsBetween(-11, 0)))
+    df = df.withColumn("ema_26", avg("close").over(window_spec.rowsBetween(-25, 0)))
+    df = df.withColumn("macd", col("ema_12") - col("ema_26"))
+
+    df = df.withColumn("volume_ma_10", avg("volume").over(window_spec.rowsBetween(-9, 0)))
+    df = df.withColumn("volume_ratio", col("volume") / col("volume_ma_10"))
+    return df
+
+
+def legacy_anomalies(df):
+    window_spec = Window.partitionBy("symbol")
+    df = df.withColumn("volume_mean", avg("volume").over(window_spec))
+    df = df.withColumn("volume_std", stddev("volume").over(window_spec))
+    df = df.withColumn("volume_zscore", (col("volume") - col("volume_mean")) / col("volume_std"))
+    df = df.withColumn("is_volume_anomaly", abs(col("volume_zscore")) > 3)
+
+    price_window = Window.partitionBy("symbol").orderBy("date")
+    df = df.withColumn("price_change_pct",
+                       ((col("close") - lag("close", 1).over(price_window)) /
+                        lag("close", 1).over(price_window) * 100))
+    df = df.withColumn("price_change_abs", abs(col("price_change_pct")))
+    df = df.withColumn("is_price_anomaly", col("price_change_abs") > 10)
+
+    df = df.withColumn("prev_close", lag("close", 1).over(price_window))
+    df = df.withColumn("opening_gap_pct", ((col("open") - col("prev_close")) / col("prev_close") * 100))
+    df = df.withColumn("is_gap_anomaly", abs(col("opening_gap_pct")) > 5)
+
+    df = df.withColumn("anomaly_score",
+                       when(col("is_volume_anomaly"), 1).otherwise(0) +
+                       when(col("is_price_anomaly"), 1).otherwise(0) +
+                       when(col("is_gap_anomaly"), 1).otherwise(0))
+    df = df.withColumn("has_anomaly", col("anomaly_score") >= 2)
+    return df
+
+
+def legacy_signals(df):
+    window_spec = Window.partitionBy("symbol").orderBy("date")
+    df = df.withColumn("ma_crossover",
+                       when((col("ma_5") > col("ma_20")) &
+                            (lag("ma_5", 1).over(window_spec) <= lag("ma_20", 1).over(window_spec)),
+                            "BUY")
+                       .when((col("ma_5") < col("ma_20")) &
+                             (lag("ma_5", 1).over(window_spec) >= lag("ma_20", 1).over(window_spec)),
+                             "SELL")
+                       .otherwise("HOLD"))
+    df = df.withColumn("rsi_signal",
+                       when(col("rsi") < 30, "OVERSOLD")
+                       .when(col("rsi") > 70, "OVERBOUGHT")
+                       .otherwise("NEUTRAL"))
+    df = df.withColumn("bb_signal",
+                       when(col("close") < col("bb_lower"), "OVERSOLD")
+                       .when(col("close") > col("bb_upper"), "OVERBOUGHT")
+                       .otherwise("WITHIN_BANDS"))
+    df = df.withColumn("volume_signal",
+                       when(col("volume_ratio") > 2, "HIGH_VOLUME")
+                       .when(col("volume_ratio") < 0.5, "LOW_VOLUME")
+                       .otherwise("NORMAL_VOLUME"))
+    df = df.withColumn("combined_signal",
+                       when((col("ma_crossover") == "BUY") &
+                            (col("rsi_signal") == "OVERSOLD") &
+                            (col("bb_signal") == "OVERSOLD"),
+                            "STRONG_BUY")
+                       .when((col("ma_crossover") == "SELL") &
+                             (col("rsi_signal") == "OVERBOUGHT") &
+                             (col("bb_signal") == "OVERBOUGHT"),
+                             "STRONG_SELL")
+                       .when(col("ma_crossover") == "BUY", "BUY")
+                       .when(col("ma_crossover") == "SELL", "SELL")
+                       .otherwise("HOLD"))
+    return df
+
+
+def legacy_pipeline(df):
+    return legacy_signals(legacy_anomalies(legacy_indicators(df)))
+
+
+def single_pass_pipeline(analyzer, df):
+    return analyzer.generate_trading_signals(
+        analyzer.detect_anomalies(analyzer.calculate_technical_indicators(df))
+    )
+
+
+def stage_metrics(spark, job_group):
+    """(stage count, shuffle read bytes, shuffle write bytes) of a job group"""
+    sc = spark.sparkContext
+    tracker = sc.statusTracker()
+    stage_ids = sorted({
+        stage_id
+        for job_id in tracker.getJobIdsForGroup(job_group)
+        for stage_id in tracker.getJobInfo(job_id).stageIds
+    })
+
+    ui = sc.uiWebUrl
+    if not ui:
+        return len(stage_ids), None, None
+
+    shuffle_read = shuffle_write = 0
+    for stage_id in stage_ids:
+        url = f"{ui}/api/v1/applications/{sc.applicationId}/stages/{stage_id}"
+        try:
+            attempts = json.loads(urllib.request.urlopen(url, timeout=10).read())
+        except Exception:
+            # Stages skipped because their shuffle output was reused are not listed
+            continue
+        for attempt in attempts:
+            shuffle_read += attempt.get("shuffleReadBytes", 0)
+            shuffle_write += attempt.get("shuffleWriteBytes", 0)
+    return len(stage_ids), shuffle_read, shuffle_write
+
+
+def run_variant(spark, name, build, input_df):
+    start = time.perf_counter()
+    result = build(input_df)
+    plan = result._jdf.queryExecution().executedPlan().toString()
+    analysis_seconds = time.perf_counter() - start
+
+    sc = spark.sparkContext
+    sc.setJobGroup(name, f"indicator benchmark: {name}")
+    start = time.perf_counter()
+    result.write.format("noop").mode("overwrite").save()
+    wall_seconds = time.perf_counter() - start
+    sc.setLocalProperty("spark.jobGroup.id", None)
+
+    # The UI's stage data is filled in by the listener bus shortly after the job ends
+    time.sleep(2)
+    stages, shuffle_read, shuffle_write = stage_metrics(spark, name)
+
+    return result, {
+        "wall_s": round(wall_seconds, 2),
+        "analysis_s": round(analysis_seconds, 2),
+        "exchanges": plan.count("Exchange "),
+        "sorts": plan.count("Sort ["),
+        "windows": plan.count("Window ["),
+        "stages": stages,
+        "shuffle_read_bytes": shuffle_read,
+        "shuffle_write_bytes": shuffle_write,
+    }
+
+
+def verify(legacy, single_pass):
+    """Rows where any shared column differs (ignoring float noise below 1e-9)"""
+    keys = ["symbol", "date"]
+    shared = [c for c in legacy.columns if c in single_pass.columns and c not in keys]
+    left = legacy.select(*keys, *[col(c).alias(f"l_{c}") for c in shared])
+    right = single_pass.select(*keys, *[col(c).alias(f"r_{c}") for c in shared])
+
+    mismatch = lit(False)
+    for c in shared:
+        before, after = col(f"l_{c}"), col(f"r_{c}")
+        if dict(legacy.dtypes)[c] == "double":
+            differs = ~(coalesce(abs(before - after) < 1e-9, lit(False)) | (before.isNull() & after.isNull()))
+        else:
+            differs = ~before.eqNullSafe(after)
+        mismatch = mismatch | differs
+    return left.join(right, keys).filter(mismatch).count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indicator window stages")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--master", default="local[*]")
+    parser.add_argument("--shuffle-partitions", type=int, default=8)
+    parser.add_argument("--verify", action="store_true", help="Check both variants produce the same values")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    spark = SparkSession.builder \
+        .appName("IndicatorBenchmark") \
+        .master(args.master) \
+        .config("spark.sql.shuffle.partitions", str(args.shuffle_partitions)) \
+        .config("spark.sql.adaptive.enabled", "false") \
+        .getOrCreate()
+
+    try:
+        input_df = generate_data(spark, args.symbols, args.days).persist(StorageLevel.MEMORY_AND_DISK)
+        rows = input_df.count()
+        print(f"Synthetic input: {rows:,} rows ({args.symbols} symbols x {args.days} days)")
+
+        analyzer = StockAnalyzer(spark=spark)
+        legacy_df, legacy = run_variant(spark, "legacy", legacy_pipeline, input_df)
+        single_df, single = run_variant(spark, "single_pass",
+                                        lambda df: single_pass_pipeline(analyzer, df), input_df)
+
+        print("=" * 72)
+        print(f"{'metric':<22} {'legacy':>15} {'single pass':>15} {'ratio':>15}")
+        for metric in legacy:
+            before, after = legacy[metric], single[metric]
+            ratio = f"{before / after:.2f}x" if isinstance(before, (int, float)) and after else ""
+            print(f"{metric:<22} {str(before):>15} {str(after):>15} {ratio:>15}")
+
+        results = {"rows": rows, "legacy": legacy, "single_pass": single}
+        if args.verify:
+            results["mismatched_rows"] = verify(legacy_df, single_df)
+            print(f"Mismatched rows: {results['mismatched_rows']}")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.output}")
+
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import logging
+import os
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+
+# Counter read by the backend listing cache (backend/services/cache_service.py);
+# data-ingestion bumps the same key through its own cache_invalidation module
+HDFS_LISTING_VERSION_KEY = "hdfs:listing:version"
+
+
+def invalidate_hdfs_listings():
+    """Bump the HDFS listing version; failures are logged, never raised"""
+    if redis is None:
+        logger.warning("redis is not installed; cached HDFS listings expire by TTL only")
+        return False
+
+    try:
+        client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+        client.incr(HDFS_LISTING_VERSION_KEY)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not bump {HDFS_LISTING_VERSION_KEY}: {e}")
+        return False
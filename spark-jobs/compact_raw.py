@@ -0,0 +1,225 @@
+from pyspark.sql import SparkSession
+import argparse
+import json
+import logging
+import math
+from datetime import datetime, timedelta
+
+from cache_invalidation import invalidate_hdfs_listings
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MANIFEST_PREFIX = "_MANIFEST-"
+DEFAULT_TARGET_FILE_SIZE_MB = 128
+
+
+def is_compacted_source(sources, name, length, modification_time):
+    """True if name is the exact file a manifest's sources entry recorded
+
+    A file re-uploaded under the same name after compaction has a new
+    length/modificationTime and must be merged again, not deleted or skipped.
+    """
+    entry = sources.get(name)
+    return bool(entry) and entry.get("length") == length and entry.get("modificationTime") == modification_time
+
+
+class RawDataCompactor:
+    """Merge per-symbol raw CSVs of a raw/daily/<exchange>/<date> partition
+
+    Uses the same manifest protocol as `hdfs_uploader.py --compact`:
+    compacted files go to <partition>/_compacted/<stamp>/, then a
+    _MANIFEST-<stamp>.json commit record is renamed into place, then the
+    replaced files are deleted.
+    """
+
+    def __init__(self, target_file_size_mb=DEFAULT_TARGET_FILE_SIZE_MB):
+        self.spark = self._create_spark_session()
+        self.hdfs_base_path = "hdfs://namenode:9000/stock_data"
+        self.target_file_size = target_file_size_mb * 1024 * 1024
+
+        jvm = self.spark._jvm
+        self.Path = jvm.org.apache.hadoop.fs.Path
+        self.fs = self.Path(self.hdfs_base_path).getFileSystem(
+            self.spark._jsc.hadoopConfiguration()
+        )
+
+    def _create_spark_session(self):
+        """Create Spark session with HDFS support"""
+        return SparkSession.builder \
+            .appName("RawDataCompactor") \
+            .master("spark://spark-master:7077") \
+            .config("spark.executor.memory", "1g") \
+            .config("spark.driver.memory", "1g") \
+            .config("spark.executor.cores", "1") \
+            .config("spark.cores.max", "2") \
+            .config("spark.hadoop.fs.defaultFS", "hdfs://namenode:9000") \
+            .getOrCreate()
+
+    def _list(self, path):
+        if not self.fs.exists(self.Path(path)):
+            return []
+        return list(self.fs.listStatus(self.Path(path)))
+
+    def _read_text(self, path):
+        return self.spark.sparkContext.wholeTextFiles(path).collect()[0][1]
+
+    def _write_text(self, path, content):
+        stream = self.fs.create(self.Path(path), True)
+        try:
+            stream.write(bytearray(content.encode("utf-8")))
+        finally:
+            stream.close()
+
+    def _latest_manifest(self, partition):
+        names = sorted(
+            status.getPath().getName() for status in self._list(partition)
+            if status.getPath().getName().startswith(MANIFEST_PREFIX)
+            and status.getPath().getName().endswith(".json")
+        )
+        if not names:
+            return None, None
+        return names[-1], json.loads(self._read_text(f"{partition}/{names[-1]}"))
+
+    def compact_partition(self, partition):
+        """Compact one partition; returns the number of source files replaced"""
+        manifest_name, manifest = self._latest_manifest(partition)
+        listed_sources = manifest.get("sources", {}) if manifest else {}
+
+        csv_files = {
+            status.getPath().getName(): status for status in self._list(partition)
+            if status.isFile() and status.getPath().getName().endswith(".csv")
+        }
+        leftovers = [
+            name for name, status in csv_files.items()
+            if is_compacted_source(listed_sources, name, status.getLen(), status.getModificationTime())
+        ]
+        new_files = sorted(name for name in csv_files if name not in leftovers)
+
+        if not new_files:
+            for name in leftovers:
+                self.fs.delete(self.Path(f"{partition}/{name}"), False)
+            if leftovers:
+                invalidate_hdfs_listings()
+            return 0
+        if not manifest and len(new_files) < 2:
+            return 0
+
+        inputs = [f"{partition}/{rel}" for rel in (manifest.get("files", []) if manifest else [])]
+        inputs += [f"{partition}/{name}" for name in new_files]
+
+        total_bytes = sum(self.fs.getFileStatus(self.Path(p)).getLen() for p in inputs)
+        num_files = max(1, int(math.ceil(total_bytes / float(self.target_file_size))))
+
+        # Values are kept as strings so the compacted files are byte-for-byte faithful
+        df = self.spark.read \
+            .option("header", "true") \
+            .csv(inputs)
+
+        sort_cols = [c for c in ("symbol", "date") if c in df.columns]
+        df = df.repartition(num_files)
+        if sort_cols:
+            df = df.sortWithinPartitions(*sort_cols)
+
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        out_dir = f"_compacted/{stamp}"
+        df.write \
+            .mode("overwrite") \
+            .option("header", "true") \
+            .csv(f"{partition}/{out_dir}")
+
+        files = sorted(
+            f"{out_dir}/{status.getPath().getName()}"
+            for status in self._list(f"{partition}/{out_dir}")
+            if status.getPath().getName().startswith("part-")
+        )
+
+        sources = dict(listed_sources)
+        for name in new_files:
+            sources[name] = {
+                "length": csv_files[name].getLen(),
+                "modificationTime": csv_files[name].getModificationTime()
+            }
+
+        new_manifest = {
+            "version": 1,
+            "partition": "/".join(partition.rstrip("/").split("/")[-2:]),
+            "compacted_at": datetime.now().isoformat(),
+            "files": files,
+            "sources": sources,
+            "bytes": int(total_bytes)
+        }
+
+        # Commit: create under a temp name, then rename (atomic in HDFS)
+        final_name = f"{MANIFEST_PREFIX}{stamp}.json"
+        tmp_path = f"{partition}/_tmp{final_name}"
+        self._write_text(tmp_path, json.dumps(new_manifest, indent=2))
+        if not self.fs.rename(self.Path(tmp_path), self.Path(f"{partition}/{final_name}")):
+            raise RuntimeError(f"Failed to commit manifest for {partition}")
+
+        # Cleanup after commit
+        for name in new_files + leftovers:
+            self.fs.delete(self.Path(f"{partition}/{name}"), False)
+        if manifest:
+            for rel_path in manifest.get("files", []):
+                self.fs.delete(self.Path(f"{partition}/{rel_path.rsplit('/', 1)[0]}"), True)
+            self.fs.delete(self.Path(f"{partition}/{manifest_name}"), False)
+
+        # Cached /hdfs/files and /hdfs/explore listings name the deleted files
+        invalidate_hdfs_listings()
+
+        logger.info(f"Compacted {partition}: {len(inputs)} files ({total_bytes:,} bytes) -> {len(files)} files")
+        return len(new_files)
+
+    def run(self, exchange=None, older_than_days=1):
+        """Compact every settled partition (dates before today by default)"""
+        daily_root = f"{self.hdfs_base_path}/raw/daily"
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y%m%d")
+
+        exchanges = [exchange] if exchange else [
+            status.getPath().getName() for status in self._list(daily_root) if status.isDirectory()
+        ]
+
+        compacted = 0
+        try:
+            for exchange_code in exchanges:
+                for status in self._list(f"{daily_root}/{exchange_code}"):
+                    date_dir = status.getPath().getName()
+                    if not status.isDirectory() or not date_dir.isdigit() or date_dir > cutoff:
+                        continue
+                    try:
+                        compacted += self.compact_partition(f"{daily_root}/{exchange_code}/{date_dir}")
+                    except Exception as e:
+                        logger.error(f"Failed to compact {exchange_code}/{date_dir}: {str(e)}")
+
+            logger.info(f"Compaction completed: {compacted} source files compacted")
+            return True
+
+        except Exception as e:
+            logger.error(f"Compaction failed: {str(e)}")
+            return False
+
+        finally:
+            self.spark.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact small raw/daily files in HDFS")
+    parser.add_argument("--exchange", default=None)
+    parser.add_argument("--older-than-days", type=int, default=1)
+    parser.add_argument("--target-file-size-mb", type=int, default=DEFAULT_TARGET_FILE_SIZE_MB)
+    args = parser.parse_args()
+
+    compactor = RawDataCompactor(target_file_size_mb=args.target_file_size_mb)
+    success = compactor.run(exchange=args.exchange, older_than_days=args.older_than_days)
+
+    if success:
+        print("\n✓ Raw data compaction completed successfully")
+        exit(0)
+    else:
+        print("\n✗ Raw data compaction failed")
+        exit(1)
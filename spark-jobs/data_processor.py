@@ -2,10 +2,18 @@ from pyspark.sql import SparkSession
 from pyspark.sql.functions import *
 from pyspark.sql.types import *
 from pyspark.sql.window import Window
+import argparse
 import logging
+import json
 import os
 from datetime import datetime
 
+from pg_publisher import publish_table, AGGREGATION_COLUMNS
+from pipeline_utils import StageTimer, PersistTracker
+from compact_raw import is_compacted_source
+from table_writer import (TableWriter, read_table, table_format_of, TABLE_FORMATS, DEFAULT_TABLE_FORMAT,
+                          DEFAULT_COMPRESSION, DEFAULT_TARGET_FILE_SIZE_MB)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -13,10 +21,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Declared types for the raw CSV columns written by data-ingestion (EODData
+# fields plus the collector's metadata). The column order differs between
+# exchanges (e.g. CC adds adjusted_close), so each partition's header decides
+# the order and this map the types; unknown columns are read as strings.
+# volume is read as double because some feeds write it with a decimal part.
+RAW_CSV_TYPES = {
+    "exchangeCode": StringType(),
+    "symbolCode": StringType(),
+    "interval": StringType(),
+    "date": DateType(),
+    "open": DoubleType(),
+    "high": DoubleType(),
+    "low": DoubleType(),
+    "close": DoubleType(),
+    "adjusted_close": DoubleType(),
+    "volume": DoubleType(),
+    "symbol": StringType(),
+    "exchange": StringType(),
+    "download_timestamp": StringType()
+}
+
+
+def raw_csv_schema(columns):
+    """Schema for a raw CSV layout, in header order"""
+    return StructType([StructField(name, RAW_CSV_TYPES.get(name, StringType()), True) for name in columns])
+
+
+def _partition_date(value):
+    """Accept YYYY-MM-DD or YYYYMMDD, return the YYYYMMDD directory name"""
+    if value is None:
+        return None
+    return str(value).replace("-", "")
+
+
 class StockDataProcessor:
-    def __init__(self):
+    def __init__(self, verbose=False, table_format=DEFAULT_TABLE_FORMAT, write_csv=False,
+                 compression=DEFAULT_COMPRESSION, target_file_size_mb=DEFAULT_TARGET_FILE_SIZE_MB):
         self.spark = self._create_spark_session()
         self.hdfs_base_path = "hdfs://namenode:9000/stock_data"
+        # Debug actions (count/show) each rescan the input; only run them on request
+        self.verbose = verbose
+        self.writer = TableWriter(
+            self.spark,
+            table_format=table_format,
+            compression=compression,
+            target_file_size_mb=target_file_size_mb,
+            write_csv=write_csv
+        )
     
     def _create_spark_session(self):
         """Create Spark session with HDFS support"""
@@ -31,22 +83,179 @@ class StockDataProcessor:
             .config("spark.hadoop.fs.defaultFS", "hdfs://namenode:9000") \
             .getOrCreate()
     
-    def read_raw_data(self):
+    def _glob_status(self, pattern):
+        jvm = self.spark._jvm
+        hadoop_path = jvm.org.apache.hadoop.fs.Path(pattern)
+        statuses = hadoop_path.getFileSystem(self.spark._jsc.hadoopConfiguration()).globStatus(hadoop_path)
+        return list(statuses or [])
+    
+    def _glob(self, pattern):
+        return [status.getPath() for status in self._glob_status(pattern)]
+    
+    def _raw_partitions(self, path, exchanges=None, start_date=None, end_date=None):
+        """Partition directory patterns under raw/daily (<exchange>/<YYYYMMDD>) to read
+
+        Without filters this is the single wildcard pattern; with filters the
+        matching directories are listed so nothing else is ever opened.
+        """
+        if not exchanges and start_date is None and end_date is None:
+            return [f"{path}/*/*"]
+        
+        start, end = _partition_date(start_date), _partition_date(end_date)
+        partitions = []
+        for exchange in (exchanges or ["*"]):
+            for partition in self._glob(f"{path}/{exchange}/*"):
+                name = partition.getName()
+                if (start and name < start) or (end and name > end):
+                    continue
+                partitions.append(partition.toString())
+        
+        logger.info(f"Partition pruning: {len(partitions)} partitions match "
+                    f"exchanges={exchanges or 'all'} dates={start or '-'}..{end or '-'}")
+        return partitions
+    
+    def _read_header(self, path):
+        """First line of an HDFS file (one small read, no Spark job)"""
+        jvm = self.spark._jvm
+        hadoop_path = jvm.org.apache.hadoop.fs.Path(path)
+        stream = hadoop_path.getFileSystem(self.spark._jsc.hadoopConfiguration()).open(hadoop_path)
+        reader = jvm.java.io.BufferedReader(jvm.java.io.InputStreamReader(stream, "UTF-8"))
         try:
-            path = f"{self.hdfs_base_path}/raw/daily"
-            logger.info(f"Reading data from: {path}")
+            return reader.readLine()
+        finally:
+            reader.close()
+    
+    def _read_raw_csv(self, csv_paths):
+        """Read raw CSVs with declared schemas instead of inferSchema (no extra pass)
 
-            df = self.spark.read \
+        Files in one directory share a layout, so one header per directory
+        picks the schema; directories are then read grouped by layout.
+        """
+        headers = {}
+        by_directory = {}
+        for csv_path in csv_paths:
+            directory = csv_path.rsplit("/", 1)[0]
+            by_directory.setdefault(directory, []).append(csv_path)
+            # Empty files (e.g. empty Spark part files) have no header; try the next one
+            if not headers.get(directory):
+                headers[directory] = (self._read_header(csv_path) or "").strip()
+        
+        by_layout = {}
+        for directory, paths in by_directory.items():
+            if headers[directory]:
+                by_layout.setdefault(headers[directory], []).extend(paths)
+        
+        frames = []
+        for header, paths in by_layout.items():
+            columns = [c.strip() for c in header.split(",")]
+            frame = self.spark.read \
                 .option("header", "true") \
-                .option("inferSchema", "true") \
-                .csv(f"{path}/*/*/*.csv")
+                .schema(raw_csv_schema(columns)) \
+                .csv(paths)
+            frames.append(self._normalize_raw_columns(frame))
+        
+        if len(by_layout) > 1:
+            logger.info(f"Raw CSV layouts: {len(by_layout)}")
+        return frames
+    
+    def _resolve_raw_csv_paths(self, path, partitions=None):
+        """List the raw CSV files to read, honouring compaction manifests
 
-            df.printSchema()
+        For compacted partitions (see compact_raw.py) the newest
+        _MANIFEST-*.json names the compacted files and the per-symbol
+        sources they replaced. Sources still awaiting deletion are skipped,
+        so a partition is never read half-compacted; a source re-uploaded
+        since (different length or mtime) is read like any new file.
+        """
+        patterns = partitions if partitions is not None else [f"{path}/*/*"]
+        
+        def glob(suffix):
+            return [p for pattern in patterns for p in self._glob(f"{pattern}/{suffix}")]
+        
+        # Newest manifest per partition directory
+        manifests = {}
+        for manifest_path in glob("_MANIFEST-*.json"):
+            partition = manifest_path.getParent().toString()
+            if partition not in manifests or manifest_path.getName() > manifests[partition]:
+                manifests[partition] = manifest_path.getName()
+        
+        manifest_contents = {}
+        if manifests:
+            manifest_files = ",".join(f"{partition}/{name}" for partition, name in manifests.items())
+            for file_path, content in self.spark.sparkContext.wholeTextFiles(manifest_files).collect():
+                partition = file_path.rsplit("/", 1)[0]
+                manifest_contents[partition] = json.loads(content)
+        
+        paths = []
+        for partition, manifest in manifest_contents.items():
+            paths.extend(f"{partition}/{rel}" for rel in manifest.get("files", []))
+        
+        for status in [s for pattern in patterns for s in self._glob_status(f"{pattern}/*.csv")]:
+            csv_path = status.getPath()
+            manifest = manifest_contents.get(csv_path.getParent().toString())
+            if manifest and is_compacted_source(manifest.get("sources", {}), csv_path.getName(),
+                                                status.getLen(), status.getModificationTime()):
+                continue
+            paths.append(csv_path.toString())
+        
+        if manifest_contents:
+            logger.info(f"Using compaction manifests for {len(manifest_contents)} partitions")
+        return paths
+    
+    def _normalize_raw_columns(self, df):
+        """Project raw data onto the columns shared by the CSV and Parquet layouts"""
+        return df.select(
+            col("symbol").cast(StringType()).alias("symbol"),
+            col("exchange").cast(StringType()).alias("exchange"),
+            col("date").cast(DateType()).alias("date"),
+            col("open").cast(DoubleType()).alias("open"),
+            col("high").cast(DoubleType()).alias("high"),
+            col("low").cast(DoubleType()).alias("low"),
+            col("close").cast(DoubleType()).alias("close"),
+            col("volume").cast(LongType()).alias("volume")
+        )
+    
+    def read_raw_data(self, exchanges=None, start_date=None, end_date=None, partitions=None):
+        """Read raw landing files, optionally only some exchanges and a date range
 
-            count = df.count()
-            logger.info(f"Total records read: {count}")
+        start_date/end_date bound the raw/daily/<exchange>/<YYYYMMDD>
+        directory names (inclusive), so pruned partitions are never listed.
+        An explicit list of partition directories overrides the filters.
+        """
+        try:
+            path = f"{self.hdfs_base_path}/raw/daily"
+            logger.info(f"Reading data from: {path}")
+            
+            if partitions is None:
+                partitions = self._raw_partitions(path, exchanges, start_date, end_date)
+            if not partitions:
+                logger.warning(f"No raw partitions under {path} match the filters")
+                return None
+
+            frames = []
+            
+            # Per-exchange Parquet landing files carry their own schema
+            parquet_paths = [p.toString() for pattern in partitions for p in self._glob(f"{pattern}/*.parquet")]
+            if parquet_paths:
+                logger.info(f"Reading {len(parquet_paths)} Parquet landing files under {path}")
+                frames.append(self._normalize_raw_columns(self.spark.read.parquet(*parquet_paths)))
+            
+            csv_paths = self._resolve_raw_csv_paths(path, partitions)
+            if csv_paths:
+                logger.info(f"Reading {len(csv_paths)} CSV landing files under {path}")
+                frames.extend(self._read_raw_csv(csv_paths))
+            
+            if not frames:
+                logger.warning(f"No raw files found under {path}")
+                return None
+            
+            df = frames[0]
+            for frame in frames[1:]:
+                df = df.unionByName(frame)
 
-            if count > 0:
+            if self.verbose:
+                df.printSchema()
+                logger.info(f"Total records read: {df.count()}")
                 df.show(5, truncate=False)
 
             return df
@@ -113,8 +322,9 @@ class StockDataProcessor:
             processed_df = processed_df.withColumn("month", month(col("date")))
             processed_df = processed_df.withColumn("day", dayofmonth(col("date")))
             
-            logger.info("Processed data schema:")
-            processed_df.printSchema()
+            if self.verbose:
+                logger.info("Processed data schema:")
+                processed_df.printSchema()
             
             return processed_df
             
@@ -173,8 +383,9 @@ class StockDataProcessor:
                     col("price_volatility") / col("avg_price") * 100
                 )
             
-            logger.info("Aggregation results:")
-            agg_df.show(10, truncate=False)
+            if self.verbose:
+                logger.info("Aggregation results:")
+                agg_df.show(10, truncate=False)
             
             return agg_df
             
@@ -182,85 +393,235 @@ class StockDataProcessor:
             logger.error(f"Error calculating aggregations: {str(e)}")
             return None
     
-    def save_processed_data(self, df, table_name):
-        """Save processed data to HDFS as Parquet"""
+    def save_processed_data(self, df, table_name, dynamic_overwrite=False):
+        """Save processed data to HDFS in the configured table format
+
+        With dynamic_overwrite, only the year/month partitions present in df
+        are replaced; all other partitions are left untouched.
+        """
         if df is None:
             return False
         
         try:
             output_path = f"{self.hdfs_base_path}/processed/{table_name}"
-            
-            # Write as Parquet with partitioning
-            if "year" in df.columns and "month" in df.columns:
-                df.write \
-                    .mode("overwrite") \
-                    .partitionBy("year", "month") \
-                    .parquet(output_path)
-            else:
-                df.write \
-                    .mode("overwrite") \
-                    .parquet(output_path)
-            
+            self.writer.write(df, output_path, dynamic_overwrite=dynamic_overwrite)
             logger.info(f"Successfully saved data to: {output_path}")
-            
-            # Also save as CSV for compatibility
-            csv_path = f"{self.hdfs_base_path}/processed/{table_name}_csv"
-            df.write \
-                .mode("overwrite") \
-                .option("header", "true") \
-                .csv(csv_path)
-            
-            logger.info(f"Also saved as CSV to: {csv_path}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to save data: {str(e)}")
             return False
     
-    def run_processing_pipeline(self):
-        """Run complete processing pipeline"""
+    def _state_path(self):
+        return f"{self.hdfs_base_path}/processed/_state/processed_partitions.json"
+    
+    def _raw_partition_fingerprints(self, path):
+        """Fingerprint of every raw/daily/<exchange>/<date> directory
+
+        File count, total bytes and the directory mtime (which changes when
+        files are added, replaced or compacted): one glob plus one content
+        summary per partition, no file contents are read.
+        """
+        jvm = self.spark._jvm
+        conf = self.spark._jsc.hadoopConfiguration()
+        root = jvm.org.apache.hadoop.fs.Path(path)
+        fs = root.getFileSystem(conf)
+        prefix = fs.makeQualified(root).toString().rstrip("/") + "/"
+        
+        fingerprints = {}
+        for status in fs.globStatus(jvm.org.apache.hadoop.fs.Path(f"{path}/*/*")) or []:
+            if not status.isDirectory():
+                continue
+            summary = fs.getContentSummary(status.getPath())
+            key = status.getPath().toString()[len(prefix):]
+            fingerprints[key] = f"{summary.getFileCount()}:{summary.getLength()}:{status.getModificationTime()}"
+        return fingerprints
+    
+    def _load_processed_state(self):
+        """Processed-partitions manifest, or None if there is none yet"""
+        jvm = self.spark._jvm
+        state_path = jvm.org.apache.hadoop.fs.Path(self._state_path())
+        fs = state_path.getFileSystem(self.spark._jsc.hadoopConfiguration())
+        if not fs.exists(state_path):
+            return None
+        
+        content = self.spark.sparkContext.wholeTextFiles(self._state_path()).collect()[0][1]
+        return json.loads(content).get("partitions", {})
+    
+    def _save_processed_state(self, partitions):
+        """Write the manifest under a temp name, then rename over the old one"""
+        jvm = self.spark._jvm
+        Path = jvm.org.apache.hadoop.fs.Path
+        state_path = Path(self._state_path())
+        tmp_path = Path(f"{self._state_path()}.tmp")
+        fs = state_path.getFileSystem(self.spark._jsc.hadoopConfiguration())
+        
+        content = json.dumps({
+            "updated_at": datetime.now().isoformat(),
+            "partitions": partitions
+        }, indent=2, sort_keys=True)
+        
+        stream = fs.create(tmp_path, True)
+        try:
+            stream.write(bytearray(content.encode("utf-8")))
+        finally:
+            stream.close()
+        
+        fs.delete(state_path, False)
+        if not fs.rename(tmp_path, state_path):
+            raise RuntimeError(f"Failed to commit {self._state_path()}")
+    
+    def _read_incremental(self, raw_path, changed):
+        """Raw rows for every year/month touched by the changed partitions
+
+        A raw/daily/<exchange>/<date> directory holds bars up to its date
+        (the collector backfills recent history), so all rows of month M live
+        in directories dated M-01 or later. Reading from the earliest affected
+        month onwards and keeping only affected months reproduces exactly the
+        rows a full run would write to those partitions.
+        """
+        changed_df = self.read_raw_data(partitions=[f"{raw_path}/{key}" for key in changed])
+        if changed_df is None:
+            return None, []
+        
+        months = sorted(
+            (row.y, row.m)
+            for row in changed_df
+                .select(year("date").alias("y"), month("date").alias("m"))
+                .where(col("y").isNotNull())
+                .distinct()
+                .collect()
+        )
+        if not months:
+            return None, []
+        
+        first_year, first_month = months[0]
+        raw_df = self.read_raw_data(start_date=f"{first_year:04d}{first_month:02d}01")
+        if raw_df is None:
+            return None, months
+        
+        month_keys = [y * 100 + m for y, m in months]
+        raw_df = raw_df.filter((year("date") * 100 + month("date")).isin(month_keys))
+        return raw_df, months
+    
+    def run_processing_pipeline(self, incremental=False):
+        """Run complete processing pipeline
+
+        incremental=True processes only raw partitions that are new or changed
+        since the last run (per the processed-partitions manifest) and
+        replaces just the affected year/month partitions of daily_stocks.
+        """
         logger.info("=" * 60)
         logger.info("STARTING SPARK PROCESSING PIPELINE")
         logger.info(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info(f"Mode: {'incremental' if incremental else 'full'}")
         logger.info("=" * 60)
         
+        timer = StageTimer("PROCESSING PIPELINE")
+        cache = PersistTracker()
+        
         try:
-            # Step 1: Read raw data
+            raw_path = f"{self.hdfs_base_path}/raw/daily"
+            with timer.stage("fingerprint raw partitions"):
+                fingerprints = self._raw_partition_fingerprints(raw_path)
+            
+            changed = None
+            if incremental:
+                state = self._load_processed_state()
+                existing_format = table_format_of(self.spark, f"{self.hdfs_base_path}/processed/daily_stocks")
+                if state is None:
+                    logger.info("No processed-partitions manifest yet, running a full pass")
+                    incremental = False
+                elif existing_format != self.writer.table_format:
+                    logger.info(f"daily_stocks is stored as {existing_format}, not {self.writer.table_format}; "
+                                f"running a full pass")
+                    incremental = False
+                else:
+                    changed = sorted(key for key, fp in fingerprints.items() if state.get(key) != fp)
+                    logger.info(f"{len(changed)} of {len(fingerprints)} raw partitions are new or changed")
+                    if not changed:
+                        logger.info("Nothing to process")
+                        return True
+            
+            # Step 1: Read raw data (lazy: only files are listed here)
             logger.info("\n[STEP 1] Reading raw data from HDFS...")
-            raw_df = self.read_raw_data()
+            with timer.stage("read raw"):
+                if incremental:
+                    raw_df, months = self._read_incremental(raw_path, changed)
+                    if raw_df is None:
+                        logger.info("Changed partitions hold no rows; recording them as processed")
+                        self._save_processed_state(fingerprints)
+                        return True
+                    logger.info(f"Reprocessing {len(months)} month partitions: "
+                                f"{', '.join(f'{y}-{m:02d}' for y, m in months)}")
+                else:
+                    raw_df = self.read_raw_data()
             
-            if raw_df is None or raw_df.count() == 0:
+            if raw_df is None:
                 logger.error("No data to process")
                 return False
             
-            # Step 2: Process data
+            # Step 2: Process data. processed_df feeds the table write (and
+            # CSV copy, if enabled) and, in full mode, the aggregations, so it is persisted
+            # once here instead of being recomputed from raw CSV for each
             logger.info("\n[STEP 2] Processing data...")
-            processed_df = self.process_data(raw_df)
+            with timer.stage("process + persist"):
+                processed_df = self.process_data(raw_df)
+                if processed_df is None:
+                    logger.error("Data processing failed")
+                    return False
+                processed_df, processed_rows = cache.persist(processed_df, "processed_df")
             
-            if processed_df is None:
-                logger.error("Data processing failed")
+            if processed_rows == 0:
+                logger.error("No data to process")
                 return False
             
-            # Step 3: Calculate aggregations
-            logger.info("\n[STEP 3] Calculating aggregations...")
-            agg_df = self.calculate_aggregations(processed_df)
+            # Step 3: Save daily data (only the affected months when incremental)
+            logger.info("\n[STEP 3] Saving processed data...")
+            with timer.stage("save daily_stocks"):
+                daily_success = self.save_processed_data(
+                    processed_df, 
+                    "daily_stocks",
+                    dynamic_overwrite=incremental
+                )
             
-            # Step 4: Save processed data
-            logger.info("\n[STEP 4] Saving processed data...")
+            if incremental and not daily_success:
+                # processed_df only holds the reprocessed months; aggregating it
+                # would replace the full-history snapshot with partial numbers
+                logger.error("Failed to save processed data; keeping the previous aggregations")
+                return False
             
-            # Save daily data
-            daily_success = self.save_processed_data(
-                processed_df, 
-                "daily_stocks"
-            )
+            # Step 4: Calculate aggregations; they span all history, so an
+            # incremental run recomputes them from the processed table
+            logger.info("\n[STEP 4] Calculating aggregations...")
+            with timer.stage("aggregations + persist"):
+                if incremental:
+                    cache.unpersist("processed_df")
+                    agg_input = read_table(self.spark, f"{self.hdfs_base_path}/processed/daily_stocks")
+                else:
+                    agg_input = processed_df
+                agg_df = self.calculate_aggregations(agg_input)
+                if agg_df is not None:
+                    # Written twice and published: compute once
+                    agg_df, _ = cache.persist(agg_df, "agg_df")
+                cache.unpersist("processed_df")
             
-            # Save aggregations
-            agg_success = self.save_processed_data(
-                agg_df, 
-                "stock_aggregations"
-            )
+            with timer.stage("save stock_aggregations"):
+                agg_success = self.save_processed_data(
+                    agg_df, 
+                    "stock_aggregations"
+                )
+            
+            # Step 5: Publish aggregations to Postgres for the analytics API
+            logger.info("\n[STEP 5] Publishing aggregations to Postgres...")
+            with timer.stage("publish to postgres"):
+                if publish_table(agg_df, "stock_aggregations", AGGREGATION_COLUMNS) is None:
+                    logger.warning("Aggregations not published; API keeps serving the previous snapshot")
             
             if daily_success and agg_success:
+                # Every partition seen now is reflected in daily_stocks
+                self._save_processed_state(fingerprints)
+                
                 logger.info("\n" + "=" * 60)
                 logger.info("PROCESSING PIPELINE COMPLETED SUCCESSFULLY")
                 logger.info("=" * 60)
@@ -276,6 +637,8 @@ class StockDataProcessor:
             return False
         
         finally:
+            cache.unpersist_all()
+            timer.log_summary()
             # Stop Spark session
             self.spark.stop()
     
@@ -284,8 +647,28 @@ class StockDataProcessor:
         self.spark.stop()
 
 if __name__ == "__main__":
-    processor = StockDataProcessor()
-    success = processor.run_processing_pipeline()
+    parser = argparse.ArgumentParser(description="Process raw stock data on HDFS")
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print schemas, row counts and sample rows (extra passes over the data)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process new or changed raw partitions")
+    parser.add_argument("--table-format", choices=TABLE_FORMATS, default=DEFAULT_TABLE_FORMAT,
+                        help="parquet, or txn for Parquet behind a transaction log (atomic readers)")
+    parser.add_argument("--compression", choices=["snappy", "zstd", "gzip", "none"], default=DEFAULT_COMPRESSION,
+                        help="Parquet codec (zstd needs Hadoop's native zstd codec)")
+    parser.add_argument("--target-file-size-mb", type=int, default=DEFAULT_TARGET_FILE_SIZE_MB)
+    parser.add_argument("--csv", action="store_true",
+                        help="Also write a CSV copy of each table under <table>_csv")
+    args = parser.parse_args()
+    
+    processor = StockDataProcessor(
+        verbose=args.verbose or os.getenv("SPARK_JOB_VERBOSE") == "1",
+        table_format=args.table_format,
+        write_csv=args.csv or os.getenv("SPARK_WRITE_CSV") == "1",
+        compression=args.compression,
+        target_file_size_mb=args.target_file_size_mb
+    )
+    success = processor.run_processing_pipeline(incremental=args.incremental)
     
     if success:
         print("\n✓ Spark processing completed successfully")
@@ -0,0 +1,67 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from pyspark import StorageLevel
+
+logger = logging.getLogger(__name__)
+
+# Storage level for DataFrames reused across pipeline stages. MEMORY_AND_DISK
+# spills partitions that do not fit instead of recomputing them from source.
+PERSIST_LEVEL = getattr(StorageLevel, os.getenv("SPARK_PERSIST_LEVEL", "MEMORY_AND_DISK"))
+
+
+class StageTimer:
+    """Wall-clock time per pipeline stage, logged as each stage ends and as a summary"""
+
+    def __init__(self, job_name):
+        self.job_name = job_name
+        self.timings = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self.timings.append((name, elapsed))
+            logger.info(f"[TIMING] {name}: {elapsed:.2f}s")
+
+    def log_summary(self):
+        if not self.timings:
+            return
+        total = sum(elapsed for _, elapsed in self.timings)
+        logger.info("=" * 60)
+        logger.info(f"{self.job_name} STAGE TIMINGS")
+        for name, elapsed in self.timings:
+            share = elapsed / total * 100 if total else 0.0
+            logger.info(f"  {name:<32} {elapsed:8.2f}s  {share:5.1f}%")
+        logger.info(f"  {'total':<32} {total:8.2f}s")
+        logger.info("=" * 60)
+
+
+class PersistTracker:
+    """Persist shared intermediates explicitly and release them all at the end"""
+
+    def __init__(self, level=PERSIST_LEVEL):
+        self.level = level
+        self.persisted = {}
+
+    def persist(self, df, name):
+        """Persist df and materialize it; returns (df, row count)"""
+        df = df.persist(self.level)
+        self.persisted[name] = df
+        rows = df.count()
+        logger.info(f"Persisted {name} ({rows} rows, {self.level})")
+        return df, rows
+
+    def unpersist(self, name):
+        df = self.persisted.pop(name, None)
+        if df is not None:
+            df.unpersist()
+
+    def unpersist_all(self):
+        for name in list(self.persisted):
+            self.unpersist(name)
@@ -9,6 +9,10 @@ import logging
 from datetime import datetime
 import json
 
+from pg_publisher import publish_table, INDICATOR_SNAPSHOT_COLUMNS
+from pipeline_utils import StageTimer, PersistTracker
+from table_writer import read_table
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -16,10 +20,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+def _symbol_window():
+    """The one ordering for every per-symbol window; frames over it share a single sort"""
+    return Window.partitionBy("symbol").orderBy("date")
+
+
+def _rows(start, end):
+    return _symbol_window().rowsBetween(start, end)
+
+
 class StockAnalyzer:
-    def __init__(self):
-        self.spark = self._create_spark_session()
+    def __init__(self, spark=None):
+        self.spark = spark or self._create_spark_session()
         self.hdfs_base_path = "hdfs://namenode:9000/stock_data"
+        self.cache = PersistTracker()
     
     def _create_spark_session(self):
         """Create Spark session for analysis"""
@@ -38,72 +53,98 @@ class StockAnalyzer:
             
             logger.info(f"Loading processed data from: {path}")
             
-            # Try Parquet first, then CSV
+            # Try the table (Parquet or transaction log) first, then the CSV copy
             try:
-                df = self.spark.read.parquet(path)
+                df = read_table(self.spark, path)
             except:
                 df = self.spark.read \
                     .option("header", "true") \
                     .csv(f"{path}_csv")
             
-            if df.count() == 0:
-                logger.warning("No processed data found")
-                return None
-            
             # Convert numeric columns
             numeric_cols = ["open", "high", "low", "close", "volume", "daily_return"]
             for col_name in numeric_cols:
                 if col_name in df.columns:
                     df = df.withColumn(col_name, col(col_name).cast(DoubleType()))
             
-            logger.info(f"Loaded {df.count()} records")
+            # Persisted: the indicator windows and the final materialization
+            # both read it; the single count doubles as the emptiness check
+            df, rows = self.cache.persist(df, "processed_data")
+            if rows == 0:
+                logger.warning("No processed data found")
+                self.cache.unpersist("processed_data")
+                return None
+            
+            logger.info(f"Loaded {rows} records")
             return df
             
         except Exception as e:
             logger.error(f"Failed to load data: {str(e)}")
             return None
     
+    def _window_columns(self, df):
+        """Every ordered-window input of the indicator, anomaly and signal stages
+
+        All frames share one (symbol, date) window, so Spark computes them with
+        a single shuffle and sort: prev_close in a first Window operator, the
+        rest in a second one that reuses its ordering. Lagged moving averages
+        are expressed as shifted frames (lag(ma_5) == avg over rows -5..-1)
+        instead of windows over window results.
+        """
+        df = df.select("*", lag("close", 1).over(_symbol_window()).alias("prev_close"))
+        
+        price_change = col("close") - col("prev_close")
+        gain = when(price_change > 0, price_change).otherwise(0)
+        loss = when(price_change < 0, -price_change).otherwise(0)
+        history = _rows(Window.unboundedPreceding, Window.unboundedFollowing)
+        
+        return df.select(
+            "*",
+            # Moving averages
+            avg("close").over(_rows(-4, 0)).alias("ma_5"),
+            avg("close").over(_rows(-9, 0)).alias("ma_10"),
+            avg("close").over(_rows(-19, 0)).alias("ma_20"),
+            avg("close").over(_rows(-49, 0)).alias("ma_50"),
+            avg("close").over(_rows(-5, -1)).alias("prev_ma_5"),
+            avg("close").over(_rows(-20, -1)).alias("prev_ma_20"),
+            # RSI inputs: average gain and loss over 14 periods
+            price_change.alias("price_change"),
+            gain.alias("gain"),
+            loss.alias("loss"),
+            avg(gain).over(_rows(-13, 0)).alias("avg_gain"),
+            avg(loss).over(_rows(-13, 0)).alias("avg_loss"),
+            # Bollinger Bands and MACD (simplified)
+            stddev("close").over(_rows(-19, 0)).alias("std_20"),
+            avg("close").over(_rows(-11, 0)).alias("ema_12"),
+            avg("close").over(_rows(-25, 0)).alias("ema_26"),
+            # Volume
+            avg("volume").over(_rows(-9, 0)).alias("volume_ma_10"),
+            avg("volume").over(history).alias("volume_mean"),
+            stddev("volume").over(history).alias("volume_std")
+        )
+    
     def calculate_technical_indicators(self, df):
         """Calculate technical indicators"""
         if df is None:
             return None
         
         try:
-            # Create window for each symbol
-            window_spec = Window.partitionBy("symbol").orderBy("date")
-            
-            # Moving averages
-            df = df.withColumn("ma_5", avg("close").over(window_spec.rowsBetween(-4, 0)))
-            df = df.withColumn("ma_10", avg("close").over(window_spec.rowsBetween(-9, 0)))
-            df = df.withColumn("ma_20", avg("close").over(window_spec.rowsBetween(-19, 0)))
-            df = df.withColumn("ma_50", avg("close").over(window_spec.rowsBetween(-49, 0)))
-            
-            # RSI calculation (simplified)
-            df = df.withColumn("price_change", col("close") - lag("close", 1).over(window_spec))
-            df = df.withColumn("gain", when(col("price_change") > 0, col("price_change")).otherwise(0))
-            df = df.withColumn("loss", when(col("price_change") < 0, -col("price_change")).otherwise(0))
-            
-            # Average gain and loss over 14 periods
-            avg_gain = avg("gain").over(window_spec.rowsBetween(-13, 0))
-            avg_loss = avg("loss").over(window_spec.rowsBetween(-13, 0))
-            
-            df = df.withColumn("rs", when(col("avg_loss") == 0, 100).otherwise(col("avg_gain") / col("avg_loss")))
-            df = df.withColumn("rsi", 100 - (100 / (1 + col("rs"))))
-            
-            # Bollinger Bands
-            df = df.withColumn("std_20", stddev("close").over(window_spec.rowsBetween(-19, 0)))
-            df = df.withColumn("bb_upper", col("ma_20") + (2 * col("std_20")))
-            df = df.withColumn("bb_lower", col("ma_20") - (2 * col("std_20")))
-            df = df.withColumn("bb_position", (col("close") - col("bb_lower")) / (col("bb_upper") - col("bb_lower")))
-            
-            # MACD (simplified)
-            df = df.withColumn("ema_12", avg("close").over(window_spec.rowsBetween(-11, 0)))
-            df = df.withColumn("ema_26", avg("close").over(window_spec.rowsBetween(-25, 0)))
-            df = df.withColumn("macd", col("ema_12") - col("ema_26"))
-            
-            # Volume indicators
-            df = df.withColumn("volume_ma_10", avg("volume").over(window_spec.rowsBetween(-9, 0)))
-            df = df.withColumn("volume_ratio", col("volume") / col("volume_ma_10"))
+            df = self._window_columns(df)
+            
+            rs = when(col("avg_loss") == 0, 100).otherwise(col("avg_gain") / col("avg_loss"))
+            bb_upper = col("ma_20") + (2 * col("std_20"))
+            bb_lower = col("ma_20") - (2 * col("std_20"))
+            
+            df = df.select(
+                "*",
+                rs.alias("rs"),
+                (100 - (100 / (1 + rs))).alias("rsi"),
+                bb_upper.alias("bb_upper"),
+                bb_lower.alias("bb_lower"),
+                ((col("close") - bb_lower) / (bb_upper - bb_lower)).alias("bb_position"),
+                (col("ema_12") - col("ema_26")).alias("macd"),
+                (col("volume") / col("volume_ma_10")).alias("volume_ratio")
+            )
             
             logger.info("Technical indicators calculated")
             return df
@@ -118,38 +159,38 @@ class StockAnalyzer:
             return None
         
         try:
-            window_spec = Window.partitionBy("symbol")
+            if "prev_close" not in df.columns:
+                df = self._window_columns(df)
             
             # Volume anomalies (z-score > 3)
-            df = df.withColumn("volume_mean", avg("volume").over(window_spec))
-            df = df.withColumn("volume_std", stddev("volume").over(window_spec))
-            df = df.withColumn("volume_zscore", 
-                              (col("volume") - col("volume_mean")) / col("volume_std"))
-            df = df.withColumn("is_volume_anomaly", 
-                              abs(col("volume_zscore")) > 3)
+            volume_zscore = (col("volume") - col("volume_mean")) / col("volume_std")
+            is_volume_anomaly = abs(volume_zscore) > 3
             
             # Price anomalies
-            price_window = Window.partitionBy("symbol").orderBy("date")
-            df = df.withColumn("price_change_pct", 
-                              ((col("close") - lag("close", 1).over(price_window)) / 
-                               lag("close", 1).over(price_window) * 100))
-            
-            df = df.withColumn("price_change_abs", abs(col("price_change_pct")))
-            df = df.withColumn("is_price_anomaly", col("price_change_abs") > 10)
+            price_change_pct = (col("close") - col("prev_close")) / col("prev_close") * 100
+            is_price_anomaly = abs(price_change_pct) > 10
             
             # Gap anomalies (opening gap)
-            df = df.withColumn("prev_close", lag("close", 1).over(price_window))
-            df = df.withColumn("opening_gap_pct", 
-                              ((col("open") - col("prev_close")) / col("prev_close") * 100))
-            df = df.withColumn("is_gap_anomaly", abs(col("opening_gap_pct")) > 5)
+            opening_gap_pct = (col("open") - col("prev_close")) / col("prev_close") * 100
+            is_gap_anomaly = abs(opening_gap_pct) > 5
             
             # Combined anomaly score
-            df = df.withColumn("anomaly_score",
-                              when(col("is_volume_anomaly"), 1).otherwise(0) +
-                              when(col("is_price_anomaly"), 1).otherwise(0) +
-                              when(col("is_gap_anomaly"), 1).otherwise(0))
-            
-            df = df.withColumn("has_anomaly", col("anomaly_score") >= 2)
+            anomaly_score = when(is_volume_anomaly, 1).otherwise(0) + \
+                when(is_price_anomaly, 1).otherwise(0) + \
+                when(is_gap_anomaly, 1).otherwise(0)
+            
+            df = df.select(
+                "*",
+                volume_zscore.alias("volume_zscore"),
+                is_volume_anomaly.alias("is_volume_anomaly"),
+                price_change_pct.alias("price_change_pct"),
+                abs(price_change_pct).alias("price_change_abs"),
+                is_price_anomaly.alias("is_price_anomaly"),
+                opening_gap_pct.alias("opening_gap_pct"),
+                is_gap_anomaly.alias("is_gap_anomaly"),
+                anomaly_score.alias("anomaly_score"),
+                (anomaly_score >= 2).alias("has_anomaly")
+            )
             
             logger.info(f"Anomaly detection completed")
             return df
@@ -244,49 +285,50 @@ class StockAnalyzer:
             return None
         
         try:
+            if "prev_ma_5" not in df.columns:
+                df = self._window_columns(df)
+            
             # Simple moving average crossover strategy
-            df = df.withColumn("ma_crossover",
-                              when((col("ma_5") > col("ma_20")) & 
-                                   (lag("ma_5", 1).over(Window.partitionBy("symbol").orderBy("date")) <= 
-                                    lag("ma_20", 1).over(Window.partitionBy("symbol").orderBy("date"))),
-                                   "BUY")
-                              .when((col("ma_5") < col("ma_20")) & 
-                                    (lag("ma_5", 1).over(Window.partitionBy("symbol").orderBy("date")) >= 
-                                     lag("ma_20", 1).over(Window.partitionBy("symbol").orderBy("date"))),
-                                    "SELL")
-                              .otherwise("HOLD"))
+            ma_crossover = when((col("ma_5") > col("ma_20")) & (col("prev_ma_5") <= col("prev_ma_20")), "BUY") \
+                .when((col("ma_5") < col("ma_20")) & (col("prev_ma_5") >= col("prev_ma_20")), "SELL") \
+                .otherwise("HOLD")
             
             # RSI signals
-            df = df.withColumn("rsi_signal",
-                              when(col("rsi") < 30, "OVERSOLD")
-                              .when(col("rsi") > 70, "OVERBOUGHT")
-                              .otherwise("NEUTRAL"))
+            rsi_signal = when(col("rsi") < 30, "OVERSOLD") \
+                .when(col("rsi") > 70, "OVERBOUGHT") \
+                .otherwise("NEUTRAL")
             
             # Bollinger Band signals
-            df = df.withColumn("bb_signal",
-                              when(col("close") < col("bb_lower"), "OVERSOLD")
-                              .when(col("close") > col("bb_upper"), "OVERBOUGHT")
-                              .otherwise("WITHIN_BANDS"))
+            bb_signal = when(col("close") < col("bb_lower"), "OVERSOLD") \
+                .when(col("close") > col("bb_upper"), "OVERBOUGHT") \
+                .otherwise("WITHIN_BANDS")
             
             # Volume spike signal
-            df = df.withColumn("volume_signal",
-                              when(col("volume_ratio") > 2, "HIGH_VOLUME")
-                              .when(col("volume_ratio") < 0.5, "LOW_VOLUME")
-                              .otherwise("NORMAL_VOLUME"))
+            volume_signal = when(col("volume_ratio") > 2, "HIGH_VOLUME") \
+                .when(col("volume_ratio") < 0.5, "LOW_VOLUME") \
+                .otherwise("NORMAL_VOLUME")
             
             # Combined signal
-            df = df.withColumn("combined_signal",
-                              when((col("ma_crossover") == "BUY") & 
-                                   (col("rsi_signal") == "OVERSOLD") &
-                                   (col("bb_signal") == "OVERSOLD"),
-                                   "STRONG_BUY")
-                              .when((col("ma_crossover") == "SELL") & 
-                                    (col("rsi_signal") == "OVERBOUGHT") &
-                                    (col("bb_signal") == "OVERBOUGHT"),
-                                    "STRONG_SELL")
-                              .when(col("ma_crossover") == "BUY", "BUY")
-                              .when(col("ma_crossover") == "SELL", "SELL")
-                              .otherwise("HOLD"))
+            combined_signal = when((ma_crossover == "BUY") &
+                                   (rsi_signal == "OVERSOLD") &
+                                   (bb_signal == "OVERSOLD"),
+                                   "STRONG_BUY") \
+                .when((ma_crossover == "SELL") &
+                      (rsi_signal == "OVERBOUGHT") &
+                      (bb_signal == "OVERBOUGHT"),
+                      "STRONG_SELL") \
+                .when(ma_crossover == "BUY", "BUY") \
+                .when(ma_crossover == "SELL", "SELL") \
+                .otherwise("HOLD")
+            
+            df = df.select(
+                "*",
+                ma_crossover.alias("ma_crossover"),
+                rsi_signal.alias("rsi_signal"),
+                bb_signal.alias("bb_signal"),
+                volume_signal.alias("volume_signal"),
+                combined_signal.alias("combined_signal")
+            ).drop("prev_ma_5", "prev_ma_20")
             
             logger.info("Trading signals generated")
             return df
@@ -315,6 +357,23 @@ class StockAnalyzer:
             logger.error(f"Failed to save analysis results: {str(e)}")
             return False
     
+    def publish_indicator_snapshot(self, df):
+        """Publish the latest indicator row per (symbol, exchange) to Postgres"""
+        if df is None:
+            return False
+        
+        try:
+            latest_window = Window.partitionBy("symbol", "exchange").orderBy(col("date").desc())
+            latest_df = df.withColumn("_rn", row_number().over(latest_window)) \
+                .filter(col("_rn") == 1) \
+                .drop("_rn")
+            
+            return publish_table(latest_df, "stock_indicator_snapshot", INDICATOR_SNAPSHOT_COLUMNS) is not None
+            
+        except Exception as e:
+            logger.error(f"Failed to publish indicator snapshot: {str(e)}")
+            return False
+    
     def generate_insights_report(self, df):
         """Generate insights report from analyzed data"""
         if df is None:
@@ -405,12 +464,15 @@ class StockAnalyzer:
         logger.info(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info("=" * 60)
         
+        timer = StageTimer("ANALYSIS PIPELINE")
+        
         try:
             # Step 1: Load data
             logger.info("\n[STEP 1] Loading processed data...")
-            df = self.load_processed_data()
+            with timer.stage("load + persist"):
+                df = self.load_processed_data()
             
-            if df is None or df.count() == 0:
+            if df is None:
                 logger.error("No data to analyze")
                 return False
             
@@ -426,13 +488,27 @@ class StockAnalyzer:
             logger.info("\n[STEP 4] Generating trading signals...")
             df = self.generate_trading_signals(df)
             
+            # Steps 2-4 only build the plan; materialize it once, since the CSV
+            # write, the Postgres snapshot and the insights all read the result
+            with timer.stage("indicators/anomalies/signals + persist"):
+                df, _ = self.cache.persist(df, "signals")
+                self.cache.unpersist("processed_data")
+            
             # Step 5: Save analysis results
             logger.info("\n[STEP 5] Saving analysis results...")
-            self.save_analysis_results(df, "technical_analysis")
+            with timer.stage("save technical_analysis"):
+                self.save_analysis_results(df, "technical_analysis")
+            
+            # Step 5b: Publish latest indicators for the analytics API
+            logger.info("\n[STEP 5b] Publishing indicator snapshot to Postgres...")
+            with timer.stage("publish to postgres"):
+                if not self.publish_indicator_snapshot(df):
+                    logger.warning("Indicator snapshot not published; API keeps serving the previous snapshot")
             
             # Step 6: Generate insights
             logger.info("\n[STEP 6] Generating insights report...")
-            insights = self.generate_insights_report(df)
+            with timer.stage("insights report"):
+                insights = self.generate_insights_report(df)
             
             # Print insights summary
             if insights:
@@ -463,6 +539,8 @@ class StockAnalyzer:
             return False
         
         finally:
+            self.cache.unpersist_all()
+            timer.log_summary()
             self.spark.stop()
 
 if __name__ == "__main__":
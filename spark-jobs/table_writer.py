@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+from datetime import datetime
+from functools import reduce
+
+logger = logging.getLogger(__name__)
+
+# parquet: year/month-partitioned Parquet directly under the table path.
+# txn: the same Parquet files under <table>/_data/<stamp>/, made visible by a
+#      <table>/_txn_log/<version>.json commit that lists every live file.
+TABLE_FORMATS = ("parquet", "txn")
+DEFAULT_TABLE_FORMAT = os.getenv("SPARK_TABLE_FORMAT", "parquet")
+DEFAULT_COMPRESSION = os.getenv("SPARK_PARQUET_COMPRESSION", "snappy")
+DEFAULT_TARGET_FILE_SIZE_MB = int(os.getenv("SPARK_TARGET_FILE_SIZE_MB", "128"))
+
+# Spark's per-row size estimate (schema defaultSize) is uncompressed; encoded
+# and compressed Parquet of these rows is typically several times smaller
+PARQUET_SIZE_RATIO = 4
+
+TXN_LOG_DIR = "_txn_log"
+TXN_DATA_DIR = "_data"
+# Commits (and their data files) kept for readers still on an older snapshot
+TXN_RETAIN_VERSIONS = 2
+
+
+def _fs(spark, path):
+    jvm = spark._jvm
+    return jvm.org.apache.hadoop.fs.Path(path).getFileSystem(spark._jsc.hadoopConfiguration())
+
+
+def _list(spark, path):
+    fs = _fs(spark, path)
+    hadoop_path = spark._jvm.org.apache.hadoop.fs.Path(path)
+    if not fs.exists(hadoop_path):
+        return []
+    return list(fs.listStatus(hadoop_path))
+
+
+def _log_versions(spark, path):
+    """Committed versions in <table>/_txn_log, ascending"""
+    return sorted(
+        int(status.getPath().getName()[:-len(".json")])
+        for status in _list(spark, f"{path}/{TXN_LOG_DIR}")
+        if status.getPath().getName().endswith(".json") and status.getPath().getName()[:-len(".json")].isdigit()
+    )
+
+
+def _commit_path(path, version):
+    return f"{path}/{TXN_LOG_DIR}/{version:020d}.json"
+
+
+def _read_commit(spark, path, version):
+    return json.loads(spark.sparkContext.wholeTextFiles(_commit_path(path, version)).collect()[0][1])
+
+
+def latest_commit(spark, path):
+    """(version, commit) of the newest transaction-log entry, or (-1, None)"""
+    versions = _log_versions(spark, path)
+    if not versions:
+        return -1, None
+    return versions[-1], _read_commit(spark, path, versions[-1])
+
+
+def table_format_of(spark, path):
+    """Format of the table at path ("txn" or "parquet"), or None if there is none"""
+    if _log_versions(spark, path):
+        return "txn"
+    if any(not status.getPath().getName().startswith(("_", ".")) for status in _list(spark, path)):
+        return "parquet"
+    return None
+
+
+def read_table(spark, path):
+    """Read a table written by TableWriter in either format
+
+    For txn tables only the files of the latest commit are read, so a reader
+    never sees a write that has not been committed.
+    """
+    version, commit = latest_commit(spark, path)
+    if commit is None:
+        return spark.read.parquet(path)
+
+    if not commit["files"]:
+        raise ValueError(f"{path} has no data files at version {version}")
+
+    # Partition discovery needs one base directory per group of files
+    by_data_dir = {}
+    for entry in commit["files"]:
+        data_dir = "/".join(entry["path"].split("/")[:2])
+        by_data_dir.setdefault(data_dir, []).append(f"{path}/{entry['path']}")
+
+    logger.info(f"Reading {path} at version {version} ({len(commit['files'])} files)")
+    frames = [
+        spark.read.option("basePath", f"{path}/{data_dir}").parquet(*files)
+        for data_dir, files in sorted(by_data_dir.items())
+    ]
+    return reduce(lambda left, right: left.unionByName(right), frames)
+
+
+class TableWriter:
+    """Output stage for processed datasets
+
+    Writes the table in its configured format (Snappy or ZSTD Parquet,
+    laid out in files of roughly target_file_size_mb) and a CSV copy under
+    <table>_csv only when write_csv is set.
+    """
+
+    def __init__(self, spark, table_format=DEFAULT_TABLE_FORMAT, compression=DEFAULT_COMPRESSION,
+                 target_file_size_mb=DEFAULT_TARGET_FILE_SIZE_MB, write_csv=False):
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"Unknown table format: {table_format}")
+        self.spark = spark
+        self.table_format = table_format
+        self.compression = compression
+        self.target_file_size = target_file_size_mb * 1024 * 1024
+        self.write_csv = write_csv
+        self.Path = spark._jvm.org.apache.hadoop.fs.Path
+
+    def _records_per_file(self, df):
+        row_bytes = max(1, df._jdf.schema().defaultSize())
+        return max(1, int(self.target_file_size * PARQUET_SIZE_RATIO / row_bytes))
+
+    def _layout(self, df, partition_cols):
+        """One task per output partition, rows sorted for better encoding
+
+        Each year/month is then written by a single task, which
+        maxRecordsPerFile splits into target-sized files instead of every
+        task leaving a small file in every partition.
+        """
+        df = df.repartition(*partition_cols) if partition_cols else df.coalesce(1)
+        sort_cols = [c for c in ("symbol", "date") if c in df.columns]
+        if sort_cols:
+            df = df.sortWithinPartitions(*sort_cols)
+        return df
+
+    def _writer(self, df, partition_cols, dynamic_overwrite):
+        writer = df.write \
+            .mode("overwrite") \
+            .option("maxRecordsPerFile", self._records_per_file(df))
+        if partition_cols:
+            writer = writer \
+                .option("partitionOverwriteMode", "dynamic" if dynamic_overwrite else "static") \
+                .partitionBy(*partition_cols)
+        return writer
+
+    def write(self, df, output_path, dynamic_overwrite=False):
+        """Write df to output_path (and <output_path>_csv if enabled)
+
+        With dynamic_overwrite, only the year/month partitions present in df
+        are replaced; all other partitions are left untouched.
+        """
+        partition_cols = ["year", "month"] if "year" in df.columns and "month" in df.columns else []
+        df = self._layout(df, partition_cols)
+
+        if self.table_format == "txn":
+            version = self._write_txn(df, output_path, partition_cols, dynamic_overwrite)
+            logger.info(f"Committed version {version} of {output_path} ({self.compression})")
+        else:
+            self._writer(df, partition_cols, dynamic_overwrite) \
+                .option("compression", self.compression) \
+                .parquet(output_path)
+            logger.info(f"Saved Parquet ({self.compression}) to: {output_path}")
+
+        if self.write_csv:
+            # Same partitioning, so dynamic overwrite cannot drop months that
+            # were not reprocessed
+            csv_path = f"{output_path}_csv"
+            self._writer(df, partition_cols, dynamic_overwrite) \
+                .option("header", "true") \
+                .csv(csv_path)
+            logger.info(f"Also saved as CSV to: {csv_path}")
+
+    def _data_files(self, path, data_dir):
+        """Entries for the part files under <path>/<data_dir>"""
+        fs = _fs(self.spark, path)
+        root = f"{path}/{data_dir}"
+        prefix = fs.makeQualified(self.Path(root)).toString().rstrip("/") + "/"
+
+        entries = []
+        files = fs.listFiles(self.Path(root), True)
+        while files.hasNext():
+            status = files.next()
+            if not status.getPath().getName().startswith("part-"):
+                continue
+            relative = status.getPath().toString()[len(prefix):]
+            entries.append({
+                "path": f"{data_dir}/{relative}",
+                "partition": relative.rsplit("/", 1)[0] if "/" in relative else "",
+                "bytes": status.getLen()
+            })
+        return sorted(entries, key=lambda entry: entry["path"])
+
+    def _write_txn(self, df, path, partition_cols, dynamic_overwrite):
+        """Write new data files, then commit a log entry listing all live files
+
+        The commit record is created under a temp name and renamed into place
+        (atomic in HDFS; the rename fails if another writer took the version).
+        """
+        fs = _fs(self.spark, path)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        data_dir = f"{TXN_DATA_DIR}/{stamp}"
+
+        self._writer(df, partition_cols, False) \
+            .option("compression", self.compression) \
+            .parquet(f"{path}/{data_dir}")
+        added = self._data_files(path, data_dir)
+
+        version, previous = latest_commit(self.spark, path)
+        previous_files = previous["files"] if previous else []
+        if dynamic_overwrite:
+            replaced = {entry["partition"] for entry in added}
+            kept = [entry for entry in previous_files if entry["partition"] not in replaced]
+        else:
+            kept = []
+
+        commit = {
+            "version": version + 1,
+            "committed_at": datetime.now().isoformat(),
+            "format": "parquet",
+            "compression": self.compression,
+            "partition_columns": partition_cols,
+            "added": len(added),
+            "removed": len(previous_files) - len(kept),
+            "files": kept + added
+        }
+
+        final_path = self.Path(_commit_path(path, commit["version"]))
+        tmp_path = self.Path(f"{path}/{TXN_LOG_DIR}/_tmp-{stamp}.json")
+        stream = fs.create(tmp_path, True)
+        try:
+            stream.write(bytearray(json.dumps(commit, indent=2).encode("utf-8")))
+        finally:
+            stream.close()
+        if not fs.rename(tmp_path, final_path):
+            fs.delete(tmp_path, False)
+            raise RuntimeError(f"Failed to commit version {commit['version']} of {path}")
+
+        self._vacuum(fs, path, commit["version"], stamp)
+        return commit["version"]
+
+    def _vacuum(self, fs, path, version, stamp):
+        """Drop log entries and data directories no retained version refers to"""
+        retained = [v for v in _log_versions(self.spark, path) if v > version - TXN_RETAIN_VERSIONS]
+        live_dirs = {
+            entry["path"].split("/")[1]
+            for v in retained
+            for entry in _read_commit(self.spark, path, v)["files"]
+        }
+
+        for v in _log_versions(self.spark, path):
+            if v not in retained:
+                fs.delete(self.Path(_commit_path(path, v)), False)
+
+        for status in _list(self.spark, f"{path}/{TXN_DATA_DIR}"):
+            name = status.getPath().getName()
+            # Newer stamps belong to a write that has not committed yet
+            if name not in live_dirs and name < stamp:
+                fs.delete(status.getPath(), True)
+
+        # Leftovers of a plain-Parquet layout at the same path
+        if version == 0:
+            for status in _list(self.spark, path):
+                if not status.getPath().getName().startswith(("_", ".")):
+                    fs.delete(status.getPath(), True)